@@ -0,0 +1,90 @@
+"""
+Benchmark: local IVF index vs brute-force cosine search over review embeddings.
+
+Usage:
+    python benchmarks/bench_ann_index.py                    # 100k synthetic 768-d vectors
+    python benchmarks/bench_ann_index.py --rows 20000 --probes 1 4 16
+
+Synthetic embeddings are drawn around a few thousand topic centres (real
+review embeddings are clustered too; uniform random vectors are a worst case
+for any ANN index). Recall@k is measured against exact brute-force results.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from ann_index import IVFIndex, _normalize  # noqa: E402
+from embeddings import EMBEDDING_DIMENSIONS  # noqa: E402
+
+
+def clustered_embeddings(rows, topics=2000, noise=1.5, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((topics, EMBEDDING_DIMENSIONS), dtype=np.float32)
+    vectors = centres[rng.integers(0, topics, rows)]
+    vectors += noise * rng.standard_normal((rows, EMBEDDING_DIMENSIONS), dtype=np.float32)
+    return np.arange(1, rows + 1), _normalize(vectors)
+
+
+def brute_force(matrix, chunk_ids, query, k):
+    scores = matrix @ query
+    top = np.argpartition(-scores, k - 1)[:k]
+    return chunk_ids[top[np.argsort(-scores[top])]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the local ANN index")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    chunk_ids, matrix = clustered_embeddings(args.rows)
+    rng = np.random.default_rng(1)
+    queries = _normalize(matrix[rng.integers(0, args.rows, args.queries)]
+                         + 0.6 / np.sqrt(EMBEDDING_DIMENSIONS)
+                         * rng.standard_normal((args.queries, EMBEDDING_DIMENSIONS), dtype=np.float32))
+
+    start = time.perf_counter()
+    index = IVFIndex()
+    index.add(chunk_ids[:-1000], matrix[:-1000])
+    build_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    index.add(chunk_ids[-1000:], matrix[-1000:])
+    add_seconds = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.npz")
+        start = time.perf_counter()
+        index.save(path)
+        save_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        index = IVFIndex.load(path)
+        load_seconds = time.perf_counter() - start
+
+    print(f"{args.rows:,} vectors, {index.n_lists} lists")
+    print(f"  build {build_seconds:.2f}s | add 1,000 {add_seconds * 1000:.0f} ms | "
+          f"save {save_seconds:.2f}s | load {load_seconds:.2f}s\n")
+
+    start = time.perf_counter()
+    exact = [brute_force(matrix, chunk_ids, q, args.k) for q in queries]
+    brute_ms = (time.perf_counter() - start) * 1000 / args.queries
+    print(f"  brute force        : {brute_ms:7.2f} ms/query  recall@{args.k} 1.000")
+
+    for n_probe in args.probes:
+        start = time.perf_counter()
+        found = [index.search(q, args.k, n_probe=n_probe)[0] for q in queries]
+        ann_ms = (time.perf_counter() - start) * 1000 / args.queries
+        recall = np.mean([len(np.intersect1d(f, e)) / args.k for f, e in zip(found, exact)])
+        print(f"  IVF n_probe={n_probe:<4}   : {ann_ms:7.2f} ms/query  recall@{args.k} {recall:.3f}"
+              f"  ({brute_ms / max(ann_ms, 1e-9):.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
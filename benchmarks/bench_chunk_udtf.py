@@ -0,0 +1,111 @@
+"""
+Benchmark: Day 17 chunking in this process vs inside Snowflake with the chunking UDTF.
+
+Usage:
+    python benchmarks/bench_chunk_udtf.py                 # Snowpark local testing, no account needed
+    python benchmarks/bench_chunk_udtf.py --live --rows 100000
+
+Local testing runs the UDTF handler in-process, so it checks that both paths
+produce the same chunks and measures the handler itself. --live uses the
+connection in .streamlit/secrets.toml and times the full table-to-table paths
+(local: fetch + chunk + write_pandas, UDTF: one INSERT ... SELECT) on scratch
+tables that are dropped afterwards.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_chunking import synthetic_reviews  # noqa: E402
+from chunk_store import chunk_locally  # noqa: E402
+from chunk_udtf import chunk_in_warehouse, register_chunk_udtf  # noqa: E402
+from chunking import chunk_documents  # noqa: E402
+
+
+def bench_local_testing(docs, strategy, chunk_size, overlap):
+    from snowflake.snowpark import Session
+    from snowflake.snowpark.functions import col, lit
+
+    session = Session.builder.config("local_testing", True).create()
+    try:
+        chunker = register_chunk_udtf(session, upload_dependencies=False)
+        sp_docs = session.create_dataframe(docs[['DOC_ID', 'FILE_NAME', 'EXTRACTED_TEXT']])
+
+        start = time.perf_counter()
+        expected = chunk_documents(docs, strategy, chunk_size, overlap)
+        local_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        udtf_chunks = sp_docs.join_table_function(
+            chunker(col("EXTRACTED_TEXT"), lit(strategy), lit(chunk_size), lit(overlap))
+        ).to_pandas()
+        udtf_seconds = time.perf_counter() - start
+    finally:
+        session.close()
+
+    udtf_chunks = udtf_chunks.sort_values(['DOC_ID', 'CHUNK_OFFSET'])
+    assert udtf_chunks['CHUNK_TEXT'].tolist() == expected['CHUNK_TEXT'].tolist(), "UDTF output differs"
+    return len(expected), local_seconds, udtf_seconds
+
+
+def bench_live(docs, strategy, chunk_size, overlap, database, schema, secrets):
+    from ingest_documents import create_session
+
+    session = create_session(secrets)
+    source, target = "BENCH_UDTF_SOURCE", "BENCH_UDTF_CHUNKS"
+    try:
+        session.write_pandas(docs, table_name=source, database=database, schema=schema,
+                             auto_create_table=True, overwrite=True)
+        source_table = f"{database}.{schema}.{source}"
+
+        start = time.perf_counter()
+        local_count = chunk_locally(session, source_table, database, schema, target,
+                                    strategy, chunk_size, overlap)
+        local_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        udtf_count = chunk_in_warehouse(session, source_table, f"{database}.{schema}.{target}",
+                                        strategy, chunk_size, overlap)
+        udtf_seconds = time.perf_counter() - start
+
+        assert local_count == udtf_count, f"chunk counts differ: {local_count} vs {udtf_count}"
+        return local_count, local_seconds, udtf_seconds
+    finally:
+        for table in (source, target):
+            session.sql(f"DROP TABLE IF EXISTS {database}.{schema}.{table}").collect()
+        session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark local vs UDTF chunking")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--strategy", default="word_window",
+                        choices=["full_review", "word_window", "token_window"])
+    parser.add_argument("--chunk-size", type=int, default=200)
+    parser.add_argument("--overlap", type=int, default=50)
+    parser.add_argument("--live", action="store_true", help="Run against a real Snowflake account")
+    parser.add_argument("--database", default="RAG_DB")
+    parser.add_argument("--schema", default="RAG_SCHEMA")
+    parser.add_argument("--secrets", default=".streamlit/secrets.toml")
+    args = parser.parse_args()
+
+    docs = synthetic_reviews(args.rows)
+    if args.live:
+        chunks, local_seconds, udtf_seconds = bench_live(
+            docs, args.strategy, args.chunk_size, args.overlap, args.database, args.schema, args.secrets)
+        mode = "live account"
+    else:
+        chunks, local_seconds, udtf_seconds = bench_local_testing(
+            docs, args.strategy, args.chunk_size, args.overlap)
+        mode = "Snowpark local testing"
+
+    print(f"{args.rows:,} reviews -> {chunks:,} chunks ({args.strategy}, {mode})")
+    print(f"  local path : {local_seconds:8.2f}s  ({args.rows / max(local_seconds, 1e-9):,.0f} docs/sec)")
+    print(f"  UDTF path  : {udtf_seconds:8.2f}s  ({args.rows / max(udtf_seconds, 1e-9):,.0f} docs/sec)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Micro-benchmark: Day 17 chunking, legacy iterrows() loop vs the columnar chunker.
+
+Usage:
+    python benchmarks/bench_chunking.py                  # 1M synthetic reviews
+    python benchmarks/bench_chunking.py --rows 100000 --legacy-rows 100000
+
+The legacy loop is slow, so by default it runs on a subset and its time is
+extrapolated. Chunk boundaries are checked to be identical on that subset.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chunking import whole_document_chunks, word_window_chunks  # noqa: E402
+
+VOCABULARY = np.array(
+    "the gloves jacket helmet goggles boots warm cold snow ski board fit size great "
+    "terrible comfortable durable zipper seam stitching waterproof breathable order "
+    "shipping arrived quality price value recommend would again return broke after "
+    "season lift trail powder thermal layer lining strap buckle wind chill hands".split()
+)
+
+
+def synthetic_reviews(rows, seed=0):
+    """Reviews of ~150 words on average, with a long tail above 200 words."""
+    rng = np.random.default_rng(seed)
+    lengths = np.clip(rng.lognormal(mean=5.0, sigma=0.35, size=rows).astype(int), 5, 1200)
+    words = rng.integers(0, len(VOCABULARY), size=int(lengths.sum()))
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    texts = [" ".join(VOCABULARY[words[offsets[i]:offsets[i + 1]]]) for i in range(rows)]
+    return pd.DataFrame({
+        'DOC_ID': np.arange(1, rows + 1),
+        'FILE_NAME': [f"review-{i:07d}.txt" for i in range(1, rows + 1)],
+        'EXTRACTED_TEXT': texts,
+        'WORD_COUNT': lengths,
+    })
+
+
+def legacy_chunks(df, chunk_size=None, overlap=0):
+    """
+    The original Day 17 iterrows() loop, kept here as the baseline.
+
+    Only the window range differs from the original: it stops once a window
+    reaches the end of the review, matching chunking.iter_word_chunks, so the
+    two outputs can be compared row for row.
+    """
+    chunks = []
+    if chunk_size is None:
+        for idx, row in df.iterrows():
+            chunks.append({
+                'doc_id': row['DOC_ID'],
+                'file_name': row['FILE_NAME'],
+                'chunk_id': idx + 1,
+                'chunk_text': row['EXTRACTED_TEXT'],
+                'chunk_size': row['WORD_COUNT'],
+                'chunk_type': 'full_review'
+            })
+    else:
+        chunk_id = 1
+        for idx, row in df.iterrows():
+            text = row['EXTRACTED_TEXT']
+            words = text.split()
+            if len(words) <= chunk_size:
+                chunks.append({'doc_id': row['DOC_ID'], 'file_name': row['FILE_NAME'],
+                               'chunk_id': chunk_id, 'chunk_text': text,
+                               'chunk_size': len(words), 'chunk_type': 'full_review'})
+                chunk_id += 1
+            else:
+                for i in range(0, len(words) - overlap, chunk_size - overlap):
+                    chunk_words = words[i:i + chunk_size]
+                    chunks.append({'doc_id': row['DOC_ID'], 'file_name': row['FILE_NAME'],
+                                   'chunk_id': chunk_id, 'chunk_text': ' '.join(chunk_words),
+                                   'chunk_size': len(chunk_words), 'chunk_type': 'chunked_review'})
+                    chunk_id += 1
+    # The page converted the dicts to a DataFrame before writing
+    df_out = pd.DataFrame(chunks)[['chunk_id', 'doc_id', 'file_name', 'chunk_text', 'chunk_size', 'chunk_type']]
+    df_out.columns = ['CHUNK_ID', 'DOC_ID', 'FILE_NAME', 'CHUNK_TEXT', 'CHUNK_SIZE', 'CHUNK_TYPE']
+    return df_out
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Day 17 chunking")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--legacy-rows", type=int, default=50_000,
+                        help="Rows to run the slow legacy loop on (time is extrapolated)")
+    parser.add_argument("--chunk-size", type=int, default=200)
+    parser.add_argument("--overlap", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"Generating {args.rows:,} synthetic reviews...")
+    df, seconds = timed(synthetic_reviews, args.rows)
+    print(f"  done in {seconds:.1f}s, {df['WORD_COUNT'].sum():,} words\n")
+
+    subset = df.iloc[:min(args.legacy_rows, args.rows)]
+    scale = len(df) / len(subset)
+
+    for label, new_fn, params in [
+        ("one chunk per review", whole_document_chunks, ()),
+        (f"word windows {args.chunk_size}/{args.overlap}", word_window_chunks, (args.chunk_size, args.overlap)),
+    ]:
+        legacy, legacy_seconds = timed(legacy_chunks, subset, *(params or (None,)))
+        expected, _ = timed(new_fn, subset, *params)
+        pd.testing.assert_frame_equal(
+            legacy.reset_index(drop=True), expected.reset_index(drop=True), check_dtype=False
+        )
+
+        result, new_seconds = timed(new_fn, df, *params)
+        legacy_full = legacy_seconds * scale
+        print(f"{label}: {len(result):,} chunks")
+        print(f"  legacy iterrows : {legacy_full:8.2f}s"
+              f"{' (extrapolated)' if scale > 1 else ''}")
+        print(f"  columnar        : {new_seconds:8.2f}s  ({legacy_full / max(new_seconds, 1e-9):.1f}x faster)")
+        print(f"  output memory   : {result.memory_usage(deep=True).sum() / 1_048_576:,.0f} MB\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Compare local (pypdf in the app process) and pushdown (stage + PARSE_DOCUMENT)
+PDF extraction on the same set of files.
+
+Usage:
+    python benchmarks/bench_extraction.py pdfs.zip
+    python benchmarks/bench_extraction.py ./pdfs --local-only
+
+Pushdown mode needs a Snowflake connection in .streamlit/secrets.toml and
+writes into a scratch table that is dropped afterwards.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from doc_extract import build_record, create_documents_table  # noqa: E402
+from ingest_documents import create_session, iter_source  # noqa: E402
+from stage_extract import (  # noqa: E402
+    ensure_document_stage, extract_staged_documents, new_batch_prefix, upload_to_stage
+)
+
+
+def report(label, docs, total_bytes, seconds):
+    seconds = max(seconds, 1e-9)
+    print(f"{label:<28} {docs:>6} docs  {seconds:>8.2f}s  "
+          f"{docs / seconds:>8.1f} docs/sec  {total_bytes / 1_048_576 / seconds:>7.2f} MB/sec")
+
+
+def bench_local(files):
+    start = time.perf_counter()
+    docs = sum(1 for name, data in files if build_record(name, data))
+    return docs, time.perf_counter() - start
+
+
+def bench_pushdown(session, files, database, schema):
+    table = "BENCH_EXTRACTED_DOCUMENTS"
+    create_documents_table(session, database, schema, table)
+    session.sql(f"TRUNCATE TABLE {database}.{schema}.{table}").collect()
+    stage_name = ensure_document_stage(session, database, schema)
+    prefix = new_batch_prefix()
+
+    try:
+        start = time.perf_counter()
+        for name, data in files:
+            upload_to_stage(session, stage_name, prefix, name, data)
+        upload_seconds = time.perf_counter() - start
+
+        docs = extract_staged_documents(
+            session, f"{database}.{schema}.{table}", stage_name, prefix,
+            [{'file_name': name, 'file_size': len(data)} for name, data in files]
+        )
+        return docs, upload_seconds, time.perf_counter() - start
+    finally:
+        session.sql(f"DROP TABLE IF EXISTS {database}.{schema}.{table}").collect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("source", help="Zip/tar archive or directory containing PDFs")
+    parser.add_argument("--database", default="RAG_DB")
+    parser.add_argument("--schema", default="RAG_SCHEMA")
+    parser.add_argument("--secrets", default=".streamlit/secrets.toml")
+    parser.add_argument("--local-only", action="store_true")
+    args = parser.parse_args()
+
+    files = [(name, data) for name, data in iter_source(args.source)
+             if name.lower().endswith(".pdf")]
+    total_bytes = sum(len(data) for _, data in files)
+    print(f"{len(files)} PDF(s), {total_bytes / 1_048_576:.1f} MB\n")
+
+    docs, seconds = bench_local(files)
+    report("local (pypdf)", docs, total_bytes, seconds)
+
+    if not args.local_only:
+        session = create_session(args.secrets)
+        try:
+            docs, upload_seconds, seconds = bench_pushdown(session, files, args.database, args.schema)
+            report("pushdown: upload only", len(files), total_bytes, upload_seconds)
+            report("pushdown (PARSE_DOCUMENT)", docs, total_bytes, seconds)
+        finally:
+            session.close()
+
+
+if __name__ == "__main__":
+    main()
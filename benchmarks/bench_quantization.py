@@ -0,0 +1,71 @@
+"""
+Benchmark: int8 and binary quantized search (with float32 re-ranking) vs the float32 baseline.
+
+Usage:
+    python benchmarks/bench_quantization.py
+    python benchmarks/bench_quantization.py --rows 200000 --candidates 100 400
+
+Uses the clustered synthetic embeddings and query set of bench_ann_index.py.
+Recall@k is measured against exact float32 brute force on the same queries.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_ann_index import brute_force, clustered_embeddings  # noqa: E402
+from ann_index import _normalize  # noqa: E402
+from embeddings import EMBEDDING_DIMENSIONS, EmbeddingMatrix  # noqa: E402
+from quantization import QuantizedIndex  # noqa: E402
+
+
+def run(label, search, queries, exact, k, nbytes, baseline_ms=None):
+    start = time.perf_counter()
+    found = [search(q) for q in queries]
+    ms = (time.perf_counter() - start) * 1000 / len(queries)
+    recall = np.mean([len(np.intersect1d(f, e)) / k for f, e in zip(found, exact)])
+    speedup = f"  ({baseline_ms / max(ms, 1e-9):.1f}x)" if baseline_ms else ""
+    print(f"  {label:<30}: {nbytes / 1_048_576:8.1f} MB  {ms:7.2f} ms/query  recall@{k} {recall:.3f}{speedup}")
+    return ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark quantized embedding search")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[50, 200, 1000])
+    args = parser.parse_args()
+
+    chunk_ids, matrix = clustered_embeddings(args.rows)
+    rng = np.random.default_rng(1)
+    queries = _normalize(matrix[rng.integers(0, args.rows, args.queries)]
+                         + 0.6 / np.sqrt(EMBEDDING_DIMENSIONS)
+                         * rng.standard_normal((args.queries, EMBEDDING_DIMENSIONS), dtype=np.float32))
+    exact = [brute_force(matrix, chunk_ids, q, args.k) for q in queries]
+    embeddings = EmbeddingMatrix(chunk_ids, matrix)
+
+    print(f"{args.rows:,} vectors x {EMBEDDING_DIMENSIONS} dims")
+    baseline_ms = run("float32 brute force", lambda q: brute_force(matrix, chunk_ids, q, args.k),
+                      queries, exact, args.k, embeddings.nbytes)
+
+    for method in ("int8", "binary"):
+        start = time.perf_counter()
+        index = QuantizedIndex(embeddings, method=method, rerank=False)
+        print(f"\n  {method}: encoded in {time.perf_counter() - start:.2f}s")
+        run(f"{method} codes only", lambda q: index.search(q, args.k)[0],
+            queries, exact, args.k, index.nbytes, baseline_ms)
+        index.rerank = True
+        for candidates in args.candidates:
+            run(f"{method} + re-rank top {candidates}",
+                lambda q: index.search(q, args.k, candidates=candidates)[0],
+                queries, exact, args.k, index.nbytes, baseline_ms)
+
+
+if __name__ == "__main__":
+    main()
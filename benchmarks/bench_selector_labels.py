@@ -0,0 +1,70 @@
+"""
+Micro-benchmark: labelling every option of the Day 16/17 "View Full ... Text" selectors.
+
+Usage:
+    python benchmarks/bench_selector_labels.py
+    python benchmarks/bench_selector_labels.py --rows 10000 100000 --scan-rows 5000
+
+st.selectbox calls format_func once per option. The old lambda filtered the
+whole DataFrame for every option (O(n²)); the pages now build an id -> label
+dict once and look labels up in O(1). The scan is slow, so above --scan-rows
+its time is extrapolated quadratically.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def sample_chunks(rows):
+    return pd.DataFrame({
+        'CHUNK_ID': np.arange(1, rows + 1),
+        'FILE_NAME': [f"review-{i:07d}.txt" for i in range(1, rows + 1)],
+    })
+
+
+def scan_labels(df):
+    """The original format_func: a boolean mask over the frame per option."""
+    options = df['CHUNK_ID'].tolist()
+    format_func = lambda x: f"Chunk #{x} - {df[df['CHUNK_ID']==x]['FILE_NAME'].values[0]}"  # noqa: E731
+    return [format_func(x) for x in options]
+
+
+def dict_labels(df):
+    """The current format_func: one dict built up front, O(1) per option."""
+    chunk_labels = dict(zip(df['CHUNK_ID'].tolist(), df['FILE_NAME'].tolist()))
+    format_func = lambda x: f"Chunk #{x} - {chunk_labels[x]}"  # noqa: E731
+    return [format_func(x) for x in chunk_labels]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark selector label rendering")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--scan-rows", type=int, default=5_000,
+                        help="Largest size to run the O(n²) scan on (time is extrapolated)")
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        df = sample_chunks(rows)
+        scan_n = min(rows, args.scan_rows)
+        expected, scan_seconds = timed(scan_labels, df.iloc[:scan_n])
+        labels, dict_seconds = timed(dict_labels, df)
+        assert labels[:scan_n] == expected, "labels differ"
+
+        scan_full = scan_seconds * (rows / scan_n) ** 2
+        print(f"{rows:,} options")
+        print(f"  DataFrame scan per option : {scan_full:8.2f}s"
+              f"{' (extrapolated)' if scan_n < rows else ''}")
+        print(f"  prebuilt id -> label dict : {dict_seconds:8.4f}s  "
+              f"({scan_full / max(dict_seconds, 1e-9):,.0f}x faster)\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Benchmark: saving Day 18 embeddings, per-row SQL literals vs the bulk Arrow/ARRAY loader.
+
+Usage:
+    python benchmarks/bench_vector_load.py                      # client-side encoding, 10k and 100k vectors
+    python benchmarks/bench_vector_load.py --live --rows 10000  # also load into Snowflake
+
+Offline, it measures what each path has to build and send: the old loop
+formats 768 floats into a ~10 KB INSERT statement per row, the bulk loader
+encodes float32 arrays to Parquet once per chunk. --live uses the connection
+in .streamlit/secrets.toml and times both paths end to end on a scratch table
+(the per-row path only on --live-rows rows, extrapolated).
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from embeddings import EMBEDDING_DIMENSIONS, embedding_frame, ensure_embedding_table, write_embeddings  # noqa: E402
+
+
+def sample_embeddings(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((rows, EMBEDDING_DIMENSIONS), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.arange(1, rows + 1), vectors
+
+
+def literal_statements(full_table, chunk_ids, vectors):
+    """The original Day 18 save loop: one INSERT with a stringified vector per row."""
+    for chunk_id, emb_list in zip(chunk_ids, vectors.tolist()):
+        emb_array = "[" + ",".join([str(float(x)) for x in emb_list]) + "]"
+        yield f"""
+        INSERT INTO {full_table} (CHUNK_ID, EMBEDDING)
+        SELECT {chunk_id}, {emb_array}::VECTOR(FLOAT, 768)
+        """
+
+
+def bench_encoding(chunk_ids, vectors, chunk_rows):
+    start = time.perf_counter()
+    sql_bytes = sum(len(sql) for sql in literal_statements("DB.SCHEMA.T", chunk_ids, vectors))
+    literal_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parquet_bytes = 0
+    for i in range(0, len(chunk_ids), chunk_rows):
+        # write_pandas serialises each chunk to Parquet before the PUT
+        buffer = io.BytesIO()
+        embedding_frame(chunk_ids[i:i + chunk_rows], vectors[i:i + chunk_rows]).to_parquet(buffer)
+        parquet_bytes += buffer.tell()
+    bulk_seconds = time.perf_counter() - start
+
+    return {
+        'literal': (literal_seconds, sql_bytes, len(chunk_ids)),
+        'bulk': (bulk_seconds, parquet_bytes, -(-len(chunk_ids) // chunk_rows) * 2),
+    }
+
+
+def bench_live(chunk_ids, vectors, chunk_rows, live_rows, database, schema, secrets):
+    from ingest_documents import create_session
+
+    session = create_session(secrets)
+    table = "BENCH_VECTOR_LOAD"
+    full_table = f"{database}.{schema}.{table}"
+    try:
+        ensure_embedding_table(session, full_table, replace=True)
+        subset = min(live_rows, len(chunk_ids))
+        start = time.perf_counter()
+        for sql in literal_statements(full_table, chunk_ids[:subset], vectors[:subset]):
+            session.sql(sql).collect()
+        literal_seconds = (time.perf_counter() - start) * len(chunk_ids) / subset
+
+        ensure_embedding_table(session, full_table, replace=True)
+        stats = write_embeddings(session, chunk_ids, vectors, database, schema, table, chunk_rows=chunk_rows)
+        loaded = session.sql(f"SELECT COUNT(*) FROM {full_table}").collect()[0][0]
+        assert loaded == len(chunk_ids), f"loaded {loaded} of {len(chunk_ids)} vectors"
+        return literal_seconds, stats['seconds'], subset < len(chunk_ids)
+    finally:
+        session.sql(f"DROP TABLE IF EXISTS {full_table}").collect()
+        session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Day 18 embedding saves")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--chunk-rows", type=int, default=50_000)
+    parser.add_argument("--live", action="store_true", help="Also load into a real Snowflake account")
+    parser.add_argument("--live-rows", type=int, default=500,
+                        help="Rows to run the per-row INSERT path on live (time is extrapolated)")
+    parser.add_argument("--database", default="RAG_DB")
+    parser.add_argument("--schema", default="RAG_SCHEMA")
+    parser.add_argument("--secrets", default=".streamlit/secrets.toml")
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        chunk_ids, vectors = sample_embeddings(rows)
+        encoding = bench_encoding(chunk_ids, vectors, args.chunk_rows)
+
+        print(f"{rows:,} vectors x {EMBEDDING_DIMENSIONS} dims")
+        for label, (seconds, size, statements) in [
+            ("per-row SQL literals", encoding['literal']),
+            ("bulk Parquet/ARRAY  ", encoding['bulk']),
+        ]:
+            print(f"  {label}: encode {seconds:7.2f}s  payload {size / 1_048_576:8.1f} MB  "
+                  f"statements {statements:,}")
+
+        if args.live:
+            literal_seconds, bulk_seconds, extrapolated = bench_live(
+                chunk_ids, vectors, args.chunk_rows, args.live_rows, args.database, args.schema, args.secrets)
+            print(f"  live per-row INSERT : {literal_seconds:8.1f}s{' (extrapolated)' if extrapolated else ''}")
+            print(f"  live bulk load      : {bulk_seconds:8.1f}s  ({rows / max(bulk_seconds, 1e-9):,.0f} rows/sec, "
+                  f"{literal_seconds / max(bulk_seconds, 1e-9):,.0f}x faster)")
+        print()
+
+
+if __name__ == "__main__":
+    main()
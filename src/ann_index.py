@@ -0,0 +1,317 @@
+"""
+In-process approximate nearest neighbour index over REVIEW_EMBEDDINGS.
+
+IVFIndex is an inverted-file (IVF-Flat) index in pure NumPy: a spherical
+k-means coarse quantizer splits the normalised vectors into `n_lists` cells
+and a query only scores the vectors of its `n_probe` closest cells. Scores
+are cosine similarities, like VECTOR_COSINE_SIMILARITY.
+
+open_index() builds the index from the embedding table once, saves it to
+disk, and on later calls loads it and only adds rows created since the last
+refresh, so Days 20-22 can retrieve in milliseconds without a service round
+trip. Re-embedded chunks replace their old vectors, chunks that left the
+table are removed, and the centroids are retrained once the index has grown
+to RETRAIN_GROWTH times the size it was trained on.
+"""
+import os
+import time
+
+import numpy as np
+
+from concurrent_runner import session_lock
+from embedding_client import ConcurrentEmbedder
+from embeddings import EMBEDDING_DIMENSIONS, EMBEDDING_MODEL, embedding_chunk_ids, load_embeddings
+from search_filters import filter_sql
+from vector_store import sync_vector_store
+
+INDEX_DIR = ".vector_index"
+RETRAIN_GROWTH = 4
+CHUNK_COLUMNS = ("CHUNK_ID", "CHUNK_TEXT", "FILE_NAME", "CHUNK_TYPE")
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, EMBEDDING_DIMENSIONS)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class IVFIndex:
+    """IVF-Flat cosine index with incremental add/remove, search(query_vector, k) and npz persistence."""
+
+    def __init__(self, n_lists=None, n_probe=8, seed=0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.seed = seed
+        self.centroids = np.empty((0, EMBEDDING_DIMENSIONS), dtype=np.float32)
+        self.list_ids = []
+        self.list_vectors = []
+        self.trained_rows = 0
+        self.watermark = ""
+
+    def __len__(self):
+        return sum(len(ids) for ids in self.list_ids)
+
+    @property
+    def chunk_ids(self):
+        if not self.list_ids:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(self.list_ids)
+
+    def _assign(self, vectors, block=16384):
+        cells = np.empty(len(vectors), dtype=np.int64)
+        for i in range(0, len(vectors), block):
+            cells[i:i + block] = np.argmax(vectors[i:i + block] @ self.centroids.T, axis=1)
+        return cells
+
+    def train(self, vectors, iterations=10, sample_per_list=256):
+        """Fit the coarse quantizer (spherical k-means on a sample of the vectors)."""
+        vectors = _normalize(vectors)
+        self.trained_rows = len(vectors)
+        n_lists = self.n_lists or int(np.clip(np.sqrt(len(vectors)), 1, 4096))
+        n_lists = min(n_lists, len(vectors))
+        rng = np.random.default_rng(self.seed)
+
+        sample = vectors[rng.choice(len(vectors), min(len(vectors), n_lists * sample_per_list), replace=False)]
+        self.centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            cells = self._assign(sample)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, cells, sample)
+            empty = ~np.bincount(cells, minlength=n_lists).astype(bool)
+            # Re-seed empty cells with random sample points
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            self.centroids = _normalize(sums)
+
+        self.n_lists = n_lists
+        self.list_ids = [np.empty(0, dtype=np.int64) for _ in range(n_lists)]
+        self.list_vectors = [np.empty((0, EMBEDDING_DIMENSIONS), dtype=np.float32) for _ in range(n_lists)]
+
+    def add(self, chunk_ids, vectors):
+        """Add vectors to their nearest cells; an id already in the index is replaced. Returns the number added."""
+        chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+        vectors = _normalize(vectors)
+        if len(self.centroids) == 0:
+            self.train(vectors)
+
+        self.remove(chunk_ids)
+        cells = self._assign(vectors)
+        for cell in np.unique(cells):
+            members = cells == cell
+            self.list_ids[cell] = np.concatenate([self.list_ids[cell], chunk_ids[members]])
+            self.list_vectors[cell] = np.concatenate([self.list_vectors[cell], vectors[members]])
+        return len(chunk_ids)
+
+    def remove(self, chunk_ids):
+        """Drop the vectors of `chunk_ids` from their cells. Returns the number removed."""
+        removed = 0
+        for cell, ids in enumerate(self.list_ids):
+            keep = ~np.isin(ids, chunk_ids)
+            if not keep.all():
+                removed += int((~keep).sum())
+                self.list_ids[cell] = ids[keep]
+                self.list_vectors[cell] = self.list_vectors[cell][keep]
+        return removed
+
+    def needs_retrain(self, growth=RETRAIN_GROWTH):
+        """True once the index holds `growth` times the vectors its centroids were trained on."""
+        return len(self) > growth * max(self.trained_rows, 1)
+
+    def retrain(self):
+        """Retrain the centroids on the current vectors and reassign every vector to its new cell."""
+        chunk_ids = self.chunk_ids
+        vectors = np.concatenate(self.list_vectors)
+        self.n_lists = None
+        self.train(vectors)
+        self.add(chunk_ids, vectors)
+
+    def search(self, query_vector, k=5, n_probe=None, allowed=None):
+        """
+        Return (chunk_ids, scores) of the `k` most similar vectors, best first.
+
+        With `allowed` (an array of chunk ids), every cell is scanned exactly
+        but only those ids are scored, so a selective filter still gets `k`
+        hits instead of whatever survives among the probed cells.
+        """
+        if len(self) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        query = _normalize(query_vector)[0]
+        if allowed is not None:
+            ids, vectors = [], []
+            for cell_ids, cell_vectors in zip(self.list_ids, self.list_vectors):
+                members = np.isin(cell_ids, allowed)
+                ids.append(cell_ids[members])
+                vectors.append(cell_vectors[members])
+            ids = np.concatenate(ids)
+        else:
+            n_probe = min(n_probe or self.n_probe, len(self.centroids))
+            cells = np.argpartition(-(self.centroids @ query), n_probe - 1)[:n_probe]
+            ids = np.concatenate([self.list_ids[c] for c in cells])
+            vectors = [self.list_vectors[c] for c in cells]
+
+        if len(ids) == 0:
+            return ids, np.empty(0, dtype=np.float32)
+        scores = np.concatenate(vectors) @ query
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return ids[top], scores[top]
+
+    def save(self, path):
+        sizes = np.array([len(ids) for ids in self.list_ids], dtype=np.int64)
+        np.savez(path,
+                 centroids=self.centroids,
+                 ids=self.chunk_ids,
+                 vectors=(np.concatenate(self.list_vectors) if self.list_vectors
+                          else np.empty((0, EMBEDDING_DIMENSIONS), dtype=np.float32)),
+                 offsets=np.concatenate([[0], np.cumsum(sizes)]),
+                 params=np.array([self.n_probe, self.seed, self.trained_rows], dtype=np.int64),
+                 watermark=np.array(self.watermark))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            n_probe, seed, trained_rows = data['params'].tolist()
+            index = cls(n_lists=len(data['centroids']), n_probe=n_probe, seed=seed)
+            index.centroids = data['centroids']
+            offsets = data['offsets']
+            ids, vectors = data['ids'], data['vectors']
+            index.list_ids = [ids[a:b] for a, b in zip(offsets[:-1], offsets[1:])]
+            index.list_vectors = [vectors[a:b] for a, b in zip(offsets[:-1], offsets[1:])]
+            index.watermark = str(data['watermark'])
+        index.trained_rows = trained_rows
+        return index
+
+
+def index_path(full_embedding_table, index_dir=INDEX_DIR):
+    return os.path.join(index_dir, f"{full_embedding_table.replace('.', '_').upper()}.npz")
+
+
+def open_index(session, full_embedding_table, path=None, n_probe=8, store=None):
+    """
+    Load the index for `full_embedding_table` from disk (building it on first use)
+    and add embeddings created since its last refresh.
+
+    The table's MAX(CREATED_TIMESTAMP) is the refresh watermark; rows created
+    after it are added, replacing older vectors of the same CHUNK_ID. If the
+    row counts then disagree, ids that are no longer in the table are removed.
+    The centroids are retrained once the index outgrows its training set
+    (IVFIndex.needs_retrain). With a vector_store.VectorStore, builds read the
+    memory-mapped store (synced first) instead of re-querying every vector.
+    Returns (index, rows_added).
+    """
+    path = path or index_path(full_embedding_table)
+    watermark, table_rows = session.sql(f"""
+    SELECT TO_VARCHAR(MAX(CREATED_TIMESTAMP), 'YYYY-MM-DD HH24:MI:SS.FF9'), COUNT(*)
+    FROM {full_embedding_table}
+    """).collect()[0]
+    watermark = watermark or ""
+
+    index = IVFIndex.load(path) if os.path.exists(path) else None
+    if index is None:
+        if store is not None:
+            embeddings = sync_vector_store(session, full_embedding_table, store)[0].load()
+        else:
+            embeddings = load_embeddings(session, full_embedding_table)
+        index = IVFIndex(n_probe=n_probe)
+        added = index.add(embeddings.chunk_ids, embeddings.matrix) if len(embeddings) else 0
+    else:
+        added = 0
+        if watermark > index.watermark:
+            embeddings = load_embeddings(session, full_embedding_table, where=f"""
+            WHERE CREATED_TIMESTAMP > '{index.watermark or "1970-01-01"}'::TIMESTAMP_NTZ
+              AND CREATED_TIMESTAMP <= '{watermark}'::TIMESTAMP_NTZ
+            """)
+            added = index.add(embeddings.chunk_ids, embeddings.matrix) if len(embeddings) else 0
+        removed = 0
+        if table_rows != len(index):
+            removed = index.remove(np.setdiff1d(index.chunk_ids, embedding_chunk_ids(session, full_embedding_table)))
+        if not added and not removed and watermark == index.watermark:
+            return index, 0
+        if index.needs_retrain():
+            index.retrain()
+
+    index.watermark = watermark
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    index.save(path)
+    return index, added
+
+
+def embed_query(session, query, model=None):
+    """Embed one query with EMBED_TEXT_768 (retried with backoff if it is throttled)."""
+    from snowflake.cortex import embed_text_768
+
+    embedder = ConcurrentEmbedder(lambda text: embed_text_768(model=model or EMBEDDING_MODEL, text=text,
+                                                              session=session),
+                                  max_in_flight=1, lock=session_lock(session))
+    return embedder.embed([query])[0]
+
+
+def fetch_chunks(session, full_chunk_table, chunk_ids, columns=CHUNK_COLUMNS):
+    """Fetch `columns` of the given chunks; returns {CHUNK_ID: row dict}."""
+    rows = {}
+    if len(chunk_ids):
+        for row in session.sql(f"""
+        SELECT CHUNK_ID, {", ".join(c for c in columns if c != "CHUNK_ID")}
+        FROM {full_chunk_table}
+        WHERE CHUNK_ID IN ({", ".join(str(int(c)) for c in chunk_ids)})
+        """).collect():
+            rows[int(row['CHUNK_ID'])] = row.as_dict()
+    return rows
+
+
+def filtered_chunk_ids(session, full_chunk_table, filter):
+    """Ids of the chunks whose attributes pass `filter` (search_filters syntax), as an int64 array."""
+    ids = session.sql(f"""
+    SELECT CHUNK_ID
+    FROM {full_chunk_table}
+    WHERE {filter_sql(filter)}
+    """).to_pandas()['CHUNK_ID']
+    return ids.to_numpy(dtype=np.int64)
+
+
+def search_chunks(session, index, full_chunk_table, query, k=5, model=None,
+                  columns=CHUNK_COLUMNS, filter=None):
+    """
+    Retrieve the `k` chunks most similar to `query` through the local index.
+
+    The query is embedded with one EMBED_TEXT_768 call and only the hits'
+    `columns` are fetched from `full_chunk_table`. With a `filter`, the ids
+    that pass it are selected first and the index scores only those, so the
+    top `k` are exact within the filter. Hits whose chunk has left the table
+    since the index was refreshed are skipped and the search is widened until
+    `k` live chunks are found. Returns (results, timings): result dicts carry
+    CHUNK_ID, the requested columns and score (like Cortex Search results);
+    timings are embed/search/fetch milliseconds.
+    """
+    timings = {}
+    start = time.perf_counter()
+    query_vector = embed_query(session, query, model)
+    timings['embed_ms'] = (time.perf_counter() - start) * 1000
+
+    if filter:
+        start = time.perf_counter()
+        allowed = filtered_chunk_ids(session, full_chunk_table, filter)
+        timings['filter_ms'] = (time.perf_counter() - start) * 1000
+    else:
+        allowed = None
+
+    timings['search_ms'] = timings['fetch_ms'] = 0.0
+    rows, fetched, wanted = {}, set(), k
+    while True:
+        start = time.perf_counter()
+        chunk_ids, scores = index.search(query_vector, wanted, allowed=allowed)
+        timings['search_ms'] += (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        new_ids = [int(c) for c in chunk_ids if int(c) not in fetched]
+        rows.update(fetch_chunks(session, full_chunk_table, new_ids, columns))
+        fetched.update(new_ids)
+        timings['fetch_ms'] += (time.perf_counter() - start) * 1000
+
+        live = sum(int(c) in rows for c in chunk_ids)
+        if live >= k or len(chunk_ids) < wanted:
+            break
+        wanted *= 2
+
+    results = [dict(rows[int(c)], score=float(s)) for c, s in zip(chunk_ids, scores) if int(c) in rows]
+    return results[:k], timings
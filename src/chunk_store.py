@@ -0,0 +1,314 @@
+"""
+Incremental loads into REVIEW_CHUNKS.
+
+Each chunk row remembers the hash of the document text (plus chunking
+settings) it was produced from. An incremental run fetches only documents
+whose current hash has no chunks yet, re-chunks just those and MERGEs the
+result on (DOC_ID, CHUNK_OFFSET), so unchanged chunks keep their rows and
+CHUNK_IDs and Day 18 does not need to re-embed them; chunks of documents
+deleted from the source are pruned in the same transaction. Full rebuilds
+(chunk_locally here, chunk_udtf.chunk_in_warehouse) and Day 17's interactive
+save (identify_chunks + write_chunks) write the same IDs and hashes, so the
+first sync after any of them has nothing to do.
+"""
+import hashlib
+
+from chunking import assign_chunk_ids, chunk_documents
+
+CHUNK_TABLE_COLUMNS = ['CHUNK_ID', 'DOC_ID', 'FILE_NAME', 'CHUNK_TEXT', 'CHUNK_SIZE', 'CHUNK_TYPE',
+                       'CHUNK_OFFSET', 'TEXT_HASH', 'SOURCE_HASH']
+
+
+def ensure_chunk_table(session, full_chunk_table):
+    """Create REVIEW_CHUNKS if needed and add the incremental-load columns to older tables."""
+    session.sql(f"""
+    CREATE TABLE IF NOT EXISTS {full_chunk_table} (
+        CHUNK_ID NUMBER,
+        DOC_ID NUMBER,
+        FILE_NAME VARCHAR,
+        CHUNK_TEXT VARCHAR,
+        CHUNK_SIZE NUMBER,
+        CHUNK_TYPE VARCHAR,
+        CREATED_TIMESTAMP TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP(),
+        CHUNK_OFFSET NUMBER,
+        TEXT_HASH VARCHAR,
+        SOURCE_HASH VARCHAR
+    )
+    """).collect()
+    for column, data_type in [('CHUNK_OFFSET', 'NUMBER'), ('TEXT_HASH', 'VARCHAR'), ('SOURCE_HASH', 'VARCHAR')]:
+        session.sql(f"ALTER TABLE {full_chunk_table} ADD COLUMN IF NOT EXISTS {column} {data_type}").collect()
+
+
+def settings_key(strategy, chunk_size, overlap):
+    """Chunking settings folded into SOURCE_HASH, so changing them re-chunks every document."""
+    return f"|{strategy}|{chunk_size}|{overlap}"
+
+
+def source_hash_sql(text_column, key):
+    """SQL expression for SOURCE_HASH: the document text hashed together with the settings key."""
+    return f"SHA2({text_column} || '{key}', 256)"
+
+
+def source_hash(text, key):
+    """SOURCE_HASH of one document, computed locally - matches source_hash_sql."""
+    return hashlib.sha256((text + key).encode('utf-8')).hexdigest()
+
+
+def fetch_changed_documents(session, source_table, full_chunk_table, key):
+    """Documents that are new, or whose text or chunking settings changed since the last run."""
+    return session.sql(f"""
+    SELECT
+        d.DOC_ID,
+        d.FILE_NAME,
+        d.EXTRACTED_TEXT,
+        d.WORD_COUNT,
+        {source_hash_sql('d.EXTRACTED_TEXT', key)} AS SOURCE_HASH
+    FROM {source_table} d
+    WHERE NOT EXISTS (
+        SELECT 1 FROM {full_chunk_table} c
+        WHERE c.DOC_ID = d.DOC_ID
+          AND c.SOURCE_HASH = {source_hash_sql('d.EXTRACTED_TEXT', key)}
+    )
+    ORDER BY d.FILE_NAME
+    """).to_pandas()
+
+
+def merge_chunks(session, chunks, database, schema, chunk_table, source_table=None):
+    """
+    MERGE chunks into the chunk table on (DOC_ID, CHUNK_OFFSET).
+
+    `chunks` must carry the CHUNK_TABLE_COLUMNS. With a `source_table`, chunks
+    of documents no longer in it are deleted as well. Returns a dict with
+    inserted, updated, unchanged, deleted (stale chunks of re-chunked
+    documents) and pruned (chunks of deleted documents) counts.
+    """
+    full_chunk_table = f"{database}.{schema}.{chunk_table}"
+    stage_table = f"{chunk_table}_MERGE_STAGE"
+    full_stage_table = f"{database}.{schema}.{stage_table}"
+
+    # Bulk-load the new chunks into a session-scoped staging table
+    session.write_pandas(chunks[CHUNK_TABLE_COLUMNS],
+                         table_name=stage_table,
+                         database=database,
+                         schema=schema,
+                         auto_create_table=True,
+                         overwrite=True,
+                         table_type="temporary")
+    try:
+        return merge_staged_chunks(session, full_stage_table, full_chunk_table, len(chunks), source_table)
+    finally:
+        session.sql(f"DROP TABLE IF EXISTS {full_stage_table}").collect()
+
+
+def prune_removed_documents(session, full_chunk_table, source_table):
+    """Delete chunks whose document is no longer in `source_table`; returns the number deleted."""
+    result = session.sql(f"""
+    DELETE FROM {full_chunk_table} t
+    WHERE NOT EXISTS (SELECT 1 FROM {source_table} d WHERE d.DOC_ID = t.DOC_ID)
+    """).collect()
+    return int(result[0][0]) if result else 0
+
+
+def merge_staged_chunks(session, full_stage_table, full_chunk_table, staged_rows, source_table=None):
+    """
+    MERGE a staging table holding the CHUNK_TABLE_COLUMNS into the chunk
+    table in one transaction (see merge_chunks).
+    """
+    session.sql("BEGIN").collect()
+    try:
+        counts = _merge_staged_chunks(session, full_stage_table, full_chunk_table, staged_rows)
+        counts['pruned'] = prune_removed_documents(session, full_chunk_table, source_table) if source_table else 0
+        session.sql("COMMIT").collect()
+    except Exception:
+        session.sql("ROLLBACK").collect()
+        raise
+    return counts
+
+
+def _merge_staged_chunks(session, full_stage_table, full_chunk_table, staged_rows):
+    merge_result = session.sql(f"""
+    MERGE INTO {full_chunk_table} t
+    USING {full_stage_table} s
+        ON t.DOC_ID = s.DOC_ID AND t.CHUNK_OFFSET = s.CHUNK_OFFSET
+    WHEN MATCHED AND t.CHUNK_ID IS DISTINCT FROM s.CHUNK_ID THEN UPDATE SET
+        CHUNK_ID = s.CHUNK_ID,
+        FILE_NAME = s.FILE_NAME,
+        CHUNK_TEXT = s.CHUNK_TEXT,
+        CHUNK_SIZE = s.CHUNK_SIZE,
+        CHUNK_TYPE = s.CHUNK_TYPE,
+        TEXT_HASH = s.TEXT_HASH,
+        SOURCE_HASH = s.SOURCE_HASH,
+        CREATED_TIMESTAMP = CURRENT_TIMESTAMP()
+    WHEN NOT MATCHED THEN INSERT
+        (CHUNK_ID, DOC_ID, FILE_NAME, CHUNK_TEXT, CHUNK_SIZE, CHUNK_TYPE, CHUNK_OFFSET, TEXT_HASH, SOURCE_HASH)
+    VALUES
+        (s.CHUNK_ID, s.DOC_ID, s.FILE_NAME, s.CHUNK_TEXT, s.CHUNK_SIZE, s.CHUNK_TYPE, s.CHUNK_OFFSET, s.TEXT_HASH, s.SOURCE_HASH)
+    """).collect()
+    inserted = int(merge_result[0][0]) if merge_result else 0
+    updated = int(merge_result[0][1]) if merge_result and len(merge_result[0]) > 1 else 0
+
+    # Unchanged chunks of a re-chunked document only need the new source hash
+    session.sql(f"""
+    UPDATE {full_chunk_table} t
+    SET SOURCE_HASH = s.SOURCE_HASH
+    FROM (SELECT DISTINCT DOC_ID, SOURCE_HASH FROM {full_stage_table}) s
+    WHERE t.DOC_ID = s.DOC_ID AND t.SOURCE_HASH IS DISTINCT FROM s.SOURCE_HASH
+    """).collect()
+
+    # Drop chunks of re-chunked documents that no longer exist (the document
+    # got shorter), plus rows written by the non-incremental modes
+    delete_result = session.sql(f"""
+    DELETE FROM {full_chunk_table} t
+    USING (SELECT DOC_ID, MAX(CHUNK_OFFSET) AS MAX_OFFSET FROM {full_stage_table} GROUP BY DOC_ID) s
+    WHERE t.DOC_ID = s.DOC_ID
+      AND (t.CHUNK_OFFSET > s.MAX_OFFSET OR t.CHUNK_OFFSET IS NULL)
+    """).collect()
+    deleted = int(delete_result[0][0]) if delete_result else 0
+
+    return {
+        'inserted': inserted,
+        'updated': updated,
+        'unchanged': staged_rows - inserted - updated,
+        'deleted': deleted,
+    }
+
+
+def replace_chunks(session, full_chunk_table, chunks_sql=None):
+    """
+    Replace every row of the chunk table with the rows of `chunks_sql` (a
+    SELECT of the CHUNK_TABLE_COLUMNS) in one transaction, so readers never
+    see the table empty or half-loaded and a failed load leaves it as it was.
+    Returns the number of rows inserted.
+    """
+    inserted = 0
+    session.sql("BEGIN").collect()
+    try:
+        # DELETE rather than TRUNCATE, which is not guaranteed to stay inside the transaction
+        session.sql(f"DELETE FROM {full_chunk_table}").collect()
+        if chunks_sql:
+            result = session.sql(f"""
+            INSERT INTO {full_chunk_table} ({", ".join(CHUNK_TABLE_COLUMNS)})
+            {chunks_sql}
+            """).collect()
+            inserted = int(result[0][0]) if result else 0
+        session.sql("COMMIT").collect()
+    except Exception:
+        session.sql("ROLLBACK").collect()
+        raise
+    return inserted
+
+
+def identify_chunks(chunks, docs, key):
+    """
+    Give chunks already built from `docs` their stable identities and hashes.
+
+    `docs` are the source rows (DOC_ID, EXTRACTED_TEXT) the chunks came from
+    and `key` the settings_key they were chunked with. Returns the
+    CHUNK_TABLE_COLUMNS, ready for write_chunks.
+    """
+    chunks = assign_chunk_ids(chunks)
+    # Every chunk carries the hash of the document version it came from
+    if 'SOURCE_HASH' in docs:
+        hashes = dict(zip(docs['DOC_ID'], docs['SOURCE_HASH']))
+    else:
+        hashes = {doc_id: source_hash(text, key)
+                  for doc_id, text in zip(docs['DOC_ID'].tolist(), docs['EXTRACTED_TEXT'].tolist())}
+    chunks['SOURCE_HASH'] = chunks['DOC_ID'].map(hashes)
+    return chunks[CHUNK_TABLE_COLUMNS]
+
+
+def write_chunks(session, chunks, database, schema, chunk_table, replace=False, source_table=None):
+    """
+    Write identified chunks (see identify_chunks) to the chunk table.
+
+    With `replace` the table is rewritten in one transaction, otherwise the
+    chunks are merged in on (DOC_ID, CHUNK_OFFSET), so re-saving a document
+    replaces its chunks instead of duplicating them (and, with a
+    `source_table`, chunks of documents deleted from it are pruned).
+    Returns the number of chunks written.
+    """
+    full_chunk_table = f"{database}.{schema}.{chunk_table}"
+    ensure_chunk_table(session, full_chunk_table)
+    if not replace:
+        merge_chunks(session, chunks, database, schema, chunk_table, source_table)
+        return len(chunks)
+
+    if not len(chunks):
+        replace_chunks(session, full_chunk_table)
+        return 0
+
+    # Load into a staging table first: write_pandas runs DDL, which would commit an open transaction
+    stage_table = f"{chunk_table}_REPLACE_STAGE"
+    full_stage_table = f"{database}.{schema}.{stage_table}"
+    session.write_pandas(chunks[CHUNK_TABLE_COLUMNS],
+                         table_name=stage_table,
+                         database=database,
+                         schema=schema,
+                         auto_create_table=True,
+                         overwrite=True,
+                         table_type="temporary")
+    try:
+        replace_chunks(session, full_chunk_table,
+                       f"SELECT {', '.join(CHUNK_TABLE_COLUMNS)} FROM {full_stage_table}")
+    finally:
+        session.sql(f"DROP TABLE IF EXISTS {full_stage_table}").collect()
+    return len(chunks)
+
+
+def _stable_chunks(docs, strategy, chunk_size, overlap):
+    return identify_chunks(chunk_documents(docs, strategy, chunk_size, overlap), docs,
+                           settings_key(strategy, chunk_size, overlap))
+
+
+def sync_chunks(session, source_table, database, schema, chunk_table,
+                strategy, chunk_size=200, overlap=50, full_embedding_table=None):
+    """
+    Incrementally chunk new/changed documents from `source_table` into the chunk table.
+
+    Chunks of documents deleted from `source_table` are pruned. With a
+    `full_embedding_table`, embeddings of chunks that no longer exist (or
+    whose text changed) are deleted as well. Returns the merge counts (see
+    merge_chunks) plus the number of documents that were re-chunked and of
+    embeddings deleted.
+    """
+    from embeddings import delete_stale_embeddings
+
+    full_chunk_table = f"{database}.{schema}.{chunk_table}"
+    ensure_chunk_table(session, full_chunk_table)
+
+    docs = fetch_changed_documents(session, source_table, full_chunk_table,
+                                   settings_key(strategy, chunk_size, overlap))
+    if docs.empty:
+        counts = {'documents': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0,
+                  'pruned': prune_removed_documents(session, full_chunk_table, source_table)}
+    else:
+        counts = merge_chunks(session, _stable_chunks(docs, strategy, chunk_size, overlap),
+                              database, schema, chunk_table, source_table)
+        counts['documents'] = len(docs)
+
+    counts['embeddings_deleted'] = 0
+    if full_embedding_table:
+        counts['embeddings_deleted'] = delete_stale_embeddings(session, full_chunk_table, full_embedding_table)
+    return counts
+
+
+def chunk_locally(session, source_table, database, schema, chunk_table, strategy,
+                  chunk_size=200, overlap=50, replace=True):
+    """
+    Chunk every document of `source_table` in this process and bulk-load the result.
+
+    The local counterpart of chunk_udtf.chunk_in_warehouse - cheaper for small
+    tables, where registering a UDTF costs more than the round trip. Chunks
+    get the same CHUNK_IDs, TEXT_HASH and SOURCE_HASH as sync_chunks. With
+    `replace` the table is rewritten, otherwise the chunks are merged in and
+    chunks of deleted documents pruned. Returns the number of chunks written.
+    """
+    docs = session.sql(f"""
+    SELECT DOC_ID, FILE_NAME, EXTRACTED_TEXT, WORD_COUNT,
+        {source_hash_sql('EXTRACTED_TEXT', settings_key(strategy, chunk_size, overlap))} AS SOURCE_HASH
+    FROM {source_table}
+    ORDER BY FILE_NAME, DOC_ID
+    """).to_pandas()
+
+    return write_chunks(session, _stable_chunks(docs, strategy, chunk_size, overlap),
+                        database, schema, chunk_table, replace, source_table)
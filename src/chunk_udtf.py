@@ -0,0 +1,129 @@
+"""
+In-warehouse chunking for Day 17.
+
+The chunkers from chunking.py are registered as a Snowpark Python UDTF, so a
+whole table can be chunked with one
+
+    INSERT INTO REVIEW_CHUNKS SELECT ... FROM EXTRACTED_DOCUMENTS, TABLE(CHUNK_REVIEWS_UDTF(...))
+
+without any document text leaving Snowflake.
+"""
+import os
+
+CHUNK_UDTF_NAME = "CHUNK_REVIEWS_UDTF"
+
+
+class ChunkReviews:
+    """
+    UDTF handler: one document in, one row per chunk out.
+
+    Rows carry the same CHUNK_ID and TEXT_HASH as chunking.assign_chunk_ids.
+    """
+
+    def process(self, doc_id, text, word_count, strategy, chunk_size, overlap):
+        from chunking import stable_chunk_id, text_hash
+
+        chunks = self._chunks(text, word_count, strategy, chunk_size, overlap)
+        for offset, (chunk_text, size, chunk_type) in enumerate(chunks):
+            chunk_text_hash = text_hash(chunk_text)
+            yield stable_chunk_id(doc_id, offset, chunk_text_hash), offset, chunk_text, size, chunk_type, chunk_text_hash
+
+    def _chunks(self, text, word_count, strategy, chunk_size, overlap):
+        from chunking import iter_token_chunks, iter_word_chunks
+
+        if text is None:
+            return
+        if strategy == 'full_review':
+            # CHUNK_SIZE is the stored WORD_COUNT, as in chunking.whole_document_chunks
+            yield text, word_count, 'full_review'
+        elif strategy == 'word_window':
+            yield from iter_word_chunks(text, chunk_size, overlap)
+        elif strategy == 'token_window':
+            for chunk_text, size, chunk_type, _ in iter_token_chunks(text, chunk_size, overlap):
+                yield chunk_text, size, chunk_type
+        else:
+            raise ValueError(f"Unknown chunking strategy: {strategy}")
+
+
+def register_chunk_udtf(session, name=CHUNK_UDTF_NAME, upload_dependencies=True):
+    """
+    Register ChunkReviews as a temporary UDTF for this session.
+
+    chunking.py and this module are uploaded alongside the handler. Pass
+    upload_dependencies=False under Snowpark local testing, where the handler
+    runs in-process.
+    """
+    from snowflake.snowpark.types import IntegerType, LongType, StringType, StructField, StructType
+
+    import chunking
+
+    options = {}
+    if upload_dependencies:
+        options = {
+            'imports': [os.path.abspath(chunking.__file__), os.path.abspath(__file__)],
+            'packages': ["numpy", "pandas"],
+        }
+
+    return session.udtf.register(
+        ChunkReviews,
+        output_schema=StructType([
+            StructField("CHUNK_ID", LongType()),
+            StructField("CHUNK_OFFSET", IntegerType()),
+            StructField("CHUNK_TEXT", StringType()),
+            StructField("CHUNK_SIZE", IntegerType()),
+            StructField("CHUNK_TYPE", StringType()),
+            StructField("TEXT_HASH", StringType()),
+        ]),
+        input_types=[LongType(), StringType(), IntegerType(), StringType(), IntegerType(), IntegerType()],
+        name=name,
+        replace=True,
+        is_permanent=False,
+        **options
+    )
+
+
+def chunk_in_warehouse(session, source_table, full_chunk_table, strategy,
+                       chunk_size=200, overlap=50, replace=True):
+    """
+    Chunk every document of `source_table` inside Snowflake.
+
+    Chunks get the same CHUNK_IDs, TEXT_HASH and SOURCE_HASH as the local
+    path and chunk_store.sync_chunks, so a later sync only touches documents
+    that changed. With `replace` the table is rewritten, otherwise the chunks
+    are merged in and chunks of deleted documents pruned. Returns the number
+    of chunks written.
+    """
+    from chunk_store import ensure_chunk_table, merge_staged_chunks, replace_chunks, settings_key, source_hash_sql
+
+    database, schema, chunk_table = full_chunk_table.split(".")
+    udtf_name = f"{database}.{schema}.{CHUNK_UDTF_NAME}"
+    register_chunk_udtf(session, name=udtf_name)
+
+    ensure_chunk_table(session, full_chunk_table)
+    chunks_sql = f"""
+    SELECT
+        c.CHUNK_ID,
+        d.DOC_ID,
+        d.FILE_NAME,
+        c.CHUNK_TEXT,
+        c.CHUNK_SIZE,
+        c.CHUNK_TYPE,
+        c.CHUNK_OFFSET,
+        c.TEXT_HASH,
+        {source_hash_sql('d.EXTRACTED_TEXT', settings_key(strategy, chunk_size, overlap))} AS SOURCE_HASH
+    FROM {source_table} d,
+        TABLE({udtf_name}(d.DOC_ID, d.EXTRACTED_TEXT, d.WORD_COUNT, '{strategy}',
+                         {int(chunk_size)}, {int(overlap)})) c
+    """
+
+    if not replace:
+        full_stage_table = f"{database}.{schema}.{chunk_table}_MERGE_STAGE"
+        session.sql(f"CREATE OR REPLACE TEMPORARY TABLE {full_stage_table} AS {chunks_sql}").collect()
+        try:
+            staged_rows = session.sql(f"SELECT COUNT(*) FROM {full_stage_table}").collect()[0][0]
+            merge_staged_chunks(session, full_stage_table, full_chunk_table, staged_rows, source_table)
+        finally:
+            session.sql(f"DROP TABLE IF EXISTS {full_stage_table}").collect()
+        return int(staged_rows)
+
+    return replace_chunks(session, full_chunk_table, chunks_sql)
@@ -0,0 +1,295 @@
+"""
+Chunking for Day 17.
+
+The chunkers work column-wise: they read the source columns once as plain
+arrays, stream chunks from a generator and build the output columns
+directly, instead of walking the DataFrame with iterrows() and creating a
+dict per chunk. The result is a DataFrame with the REVIEW_CHUNKS column
+names, ready for write_pandas.
+"""
+import hashlib
+import math
+import re
+
+import numpy as np
+import pandas as pd
+
+CHUNK_COLUMNS = ['CHUNK_ID', 'DOC_ID', 'FILE_NAME', 'CHUNK_TEXT', 'CHUNK_SIZE', 'CHUNK_TYPE']
+
+
+def iter_word_chunks(text, chunk_size, overlap):
+    """
+    Yield (chunk_text, word_count, chunk_type) for one document.
+
+    Documents with at most `chunk_size` words are kept as-is; longer ones are
+    split into windows of `chunk_size` words starting every
+    `chunk_size - overlap` words. The last window ends at the end of the
+    document, so no window is ever fully contained in its predecessor.
+    """
+    if overlap >= chunk_size:
+        raise ValueError("Overlap must be smaller than the chunk size")
+
+    words = text.split()
+
+    if len(words) <= chunk_size:
+        # Keep short reviews as-is
+        yield text, len(words), 'full_review'
+        return
+
+    # A window starting at i only adds new words if i + overlap < len(words)
+    for i in range(0, len(words) - overlap, chunk_size - overlap):
+        chunk_words = words[i:i + chunk_size]
+        yield ' '.join(chunk_words), len(chunk_words), 'chunked_review'
+
+
+def whole_document_chunks(df):
+    """One chunk per document - a pure column copy, no Python loop."""
+    n = len(df)
+    return pd.DataFrame({
+        'CHUNK_ID': np.arange(1, n + 1, dtype=np.int64),
+        'DOC_ID': df['DOC_ID'].to_numpy(),
+        'FILE_NAME': df['FILE_NAME'].to_numpy(),
+        'CHUNK_TEXT': df['EXTRACTED_TEXT'].to_numpy(),
+        'CHUNK_SIZE': df['WORD_COUNT'].to_numpy(),
+        'CHUNK_TYPE': np.full(n, 'full_review', dtype=object),
+    }, columns=CHUNK_COLUMNS)
+
+
+def word_window_chunks(df, chunk_size, overlap):
+    """Split documents longer than `chunk_size` words into overlapping word windows."""
+    doc_ids, file_names, texts, sizes, types = [], [], [], [], []
+
+    # Columns are read once as Python lists; zip() is far cheaper than iterrows()
+    for doc_id, file_name, text in zip(df['DOC_ID'].tolist(),
+                                       df['FILE_NAME'].tolist(),
+                                       df['EXTRACTED_TEXT'].tolist()):
+        for chunk_text, size, chunk_type in iter_word_chunks(text, chunk_size, overlap):
+            doc_ids.append(doc_id)
+            file_names.append(file_name)
+            texts.append(chunk_text)
+            sizes.append(size)
+            types.append(chunk_type)
+
+    return pd.DataFrame({
+        'CHUNK_ID': np.arange(1, len(texts) + 1, dtype=np.int64),
+        'DOC_ID': np.asarray(doc_ids),
+        'FILE_NAME': np.asarray(file_names, dtype=object),
+        'CHUNK_TEXT': np.asarray(texts, dtype=object),
+        'CHUNK_SIZE': np.asarray(sizes, dtype=np.int64),
+        'CHUNK_TYPE': np.asarray(types, dtype=object),
+    }, columns=CHUNK_COLUMNS)
+
+
+def chunk_documents(df, strategy, chunk_size=200, overlap=50, stats=None):
+    """
+    Run one of the Day 17 strategies: 'full_review', 'word_window' or 'token_window'.
+
+    `stats` (a ChunkStats) is only filled by the token strategy.
+    """
+    if strategy == 'full_review':
+        return whole_document_chunks(df)
+    elif strategy == 'word_window':
+        return word_window_chunks(df, chunk_size, overlap)
+    elif strategy == 'token_window':
+        return token_window_chunks(df, chunk_size, overlap, stats=stats)
+    raise ValueError(f"Unknown chunking strategy: {strategy}")
+
+
+def text_hash(text):
+    """SHA-256 hex digest of a chunk's text (TEXT_HASH)."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def stable_chunk_id(doc_id, offset, chunk_text_hash):
+    """Positive 63-bit CHUNK_ID derived from DOC_ID, offset and text hash."""
+    return int.from_bytes(hashlib.sha256(f"{doc_id}:{offset}:{chunk_text_hash}".encode()).digest()[:8], 'big') >> 1
+
+
+def assign_chunk_ids(chunks):
+    """
+    Give chunks stable identities for incremental (MERGE) loads.
+
+    Adds CHUNK_OFFSET (position within its document) and TEXT_HASH (SHA-256 of
+    the chunk text), and replaces CHUNK_ID with a positive 63-bit integer
+    derived from DOC_ID, offset and text hash - the same chunk always gets the
+    same ID, whichever run produced it.
+    """
+    chunks = chunks.copy()
+    chunks['CHUNK_OFFSET'] = chunks.groupby('DOC_ID', sort=False).cumcount().astype(np.int64)
+    chunks['TEXT_HASH'] = [text_hash(text) for text in chunks['CHUNK_TEXT'].tolist()]
+    chunks['CHUNK_ID'] = np.array([
+        stable_chunk_id(doc_id, offset, chunk_text_hash)
+        for doc_id, offset, chunk_text_hash in zip(chunks['DOC_ID'].tolist(),
+                                                   chunks['CHUNK_OFFSET'].tolist(),
+                                                   chunks['TEXT_HASH'].tolist())
+    ], dtype=np.int64)
+    return chunks
+
+
+# ---------------------------------------------------------------------------
+# Sentence-aware, token-sized chunking
+# ---------------------------------------------------------------------------
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def approx_token_count(text):
+    """
+    Approximate the embedding model's token count without loading a tokenizer.
+
+    snowflake-arctic-embed uses a WordPiece vocabulary: punctuation marks are
+    tokens of their own and long or rare words split into several pieces.
+    Pass a real tokenizer's count function to the chunkers for exact sizes.
+    """
+    return sum(math.ceil(len(t) / 6) for t in _TOKEN_RE.findall(text))
+
+
+def _split_units(text, max_tokens, count_tokens):
+    """Split text into (sentence, token_count, starts_paragraph) units."""
+    units = []
+    for paragraph in _PARAGRAPH_RE.split(text.strip()):
+        first = True
+        for sentence in _SENTENCE_RE.split(paragraph.strip()):
+            sentence = " ".join(sentence.split())
+            if not sentence:
+                continue
+            tokens = count_tokens(sentence)
+            if tokens <= max_tokens:
+                units.append((sentence, tokens, first))
+                first = False
+                continue
+
+            # A single sentence longer than a chunk: hard-split it on words
+            piece = []
+            for word in sentence.split():
+                if piece and count_tokens(" ".join(piece + [word])) > max_tokens:
+                    text_piece = " ".join(piece)
+                    units.append((text_piece, count_tokens(text_piece), first))
+                    first = False
+                    piece = []
+                piece.append(word)
+            if piece:
+                text_piece = " ".join(piece)
+                units.append((text_piece, count_tokens(text_piece), first))
+                first = False
+    return units
+
+
+def _join_units(units):
+    parts = []
+    for i, (sentence, _, starts_paragraph) in enumerate(units):
+        if i:
+            parts.append("\n\n" if starts_paragraph else " ")
+        parts.append(sentence)
+    return "".join(parts)
+
+
+def iter_token_chunks(text, max_tokens, overlap_tokens=0, count_tokens=approx_token_count):
+    """
+    Stream (chunk_text, word_count, chunk_type, token_count) for one document.
+
+    Chunks are built from whole sentences up to `max_tokens` tokens and close
+    early at a paragraph break once they are at least half full. Up to
+    `overlap_tokens` worth of trailing sentences are carried into the next
+    chunk, but every chunk adds at least one new sentence, so no chunk is a
+    subset of its predecessor.
+    """
+    if overlap_tokens >= max_tokens:
+        raise ValueError("Overlap must be smaller than the maximum chunk size")
+
+    if count_tokens(text) <= max_tokens:
+        # Short review: keep it whole, exactly as written
+        yield text, len(text.split()), 'full_review', count_tokens(text)
+        return
+
+    current, current_tokens, new_units = [], 0, 0
+
+    for unit in _split_units(text, max_tokens, count_tokens):
+        _, tokens, starts_paragraph = unit
+        full = current_tokens + tokens > max_tokens
+        paragraph_break = starts_paragraph and current_tokens >= max_tokens // 2
+
+        if current and new_units and (full or paragraph_break):
+            chunk_text = _join_units(current)
+            yield chunk_text, len(chunk_text.split()), 'chunked_review', current_tokens
+
+            # Carry trailing sentences as overlap, leaving room for the new unit
+            carried, carried_tokens = [], 0
+            for prev in reversed(current):
+                if carried_tokens + prev[1] > overlap_tokens or carried_tokens + prev[1] + tokens > max_tokens:
+                    break
+                carried.insert(0, prev)
+                carried_tokens += prev[1]
+            current, current_tokens, new_units = carried, carried_tokens, 0
+
+        current.append(unit)
+        current_tokens += tokens
+        new_units += 1
+
+    if new_units:
+        chunk_text = _join_units(current)
+        yield chunk_text, len(chunk_text.split()), 'chunked_review', current_tokens
+
+
+class ChunkStats:
+    """Running statistics for a chunking pass: chunks per document and token sizes."""
+
+    def __init__(self):
+        self.chunks_per_doc = []
+        self.token_counts = []
+
+    def add_document(self, token_counts):
+        self.chunks_per_doc.append(len(token_counts))
+        self.token_counts.extend(token_counts)
+
+    def summary(self):
+        per_doc = np.asarray(self.chunks_per_doc or [0])
+        tokens = np.asarray(self.token_counts or [0])
+        return {
+            'documents': len(self.chunks_per_doc),
+            'chunks': len(self.token_counts),
+            'avg_chunks_per_doc': float(per_doc.mean()),
+            'max_chunks_per_doc': int(per_doc.max()),
+            'avg_tokens': float(tokens.mean()),
+            'max_tokens': int(tokens.max()),
+        }
+
+    def token_histogram(self, bin_width=32):
+        """Chunk counts per token-size bucket (indexed by bucket start), ready for st.bar_chart."""
+        if not self.token_counts:
+            return pd.Series(dtype=np.int64, name="chunks")
+        tokens = np.asarray(self.token_counts)
+        edges = np.arange(0, tokens.max() + bin_width + 1, bin_width)
+        counts, _ = np.histogram(tokens, bins=edges)
+        return pd.Series(counts, index=pd.Index(edges[:-1], name="tokens"), name="chunks")
+
+
+def token_window_chunks(df, max_tokens, overlap_tokens=0, count_tokens=approx_token_count, stats=None):
+    """Sentence-aware chunks sized in embedding-model tokens (see iter_token_chunks)."""
+    doc_ids, file_names, texts, sizes, types = [], [], [], [], []
+
+    for doc_id, file_name, text in zip(df['DOC_ID'].tolist(),
+                                       df['FILE_NAME'].tolist(),
+                                       df['EXTRACTED_TEXT'].tolist()):
+        doc_tokens = []
+        for chunk_text, size, chunk_type, tokens in iter_token_chunks(
+                text, max_tokens, overlap_tokens, count_tokens):
+            doc_ids.append(doc_id)
+            file_names.append(file_name)
+            texts.append(chunk_text)
+            sizes.append(size)
+            types.append(chunk_type)
+            doc_tokens.append(tokens)
+        if stats is not None:
+            stats.add_document(doc_tokens)
+
+    return pd.DataFrame({
+        'CHUNK_ID': np.arange(1, len(texts) + 1, dtype=np.int64),
+        'DOC_ID': np.asarray(doc_ids),
+        'FILE_NAME': np.asarray(file_names, dtype=object),
+        'CHUNK_TEXT': np.asarray(texts, dtype=object),
+        'CHUNK_SIZE': np.asarray(sizes, dtype=np.int64),
+        'CHUNK_TYPE': np.asarray(types, dtype=object),
+    }, columns=CHUNK_COLUMNS)
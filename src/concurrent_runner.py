@@ -0,0 +1,231 @@
+"""
+Ordered concurrent calls under an adaptive in-flight limit.
+
+AdaptiveRunner maps a function over many items from a thread pool. The
+number of calls in flight adapts AIMD-style: it grows by about one per round
+of successful calls and halves whenever a call is throttled. Throttled
+calls are retried with exponential backoff and full jitter; results come
+back in input order.
+
+Used for client-side embedding (embedding_client.ConcurrentEmbedder) and
+batches of Cortex Search queries (search_services.search_many).
+
+A Snowpark Session is not documented as thread-safe, so calls only overlap
+when each runs on a session of its own: worker_pool(session) hands out a
+process-wide SessionPool of extra sessions opened from the app's connection
+secrets, and a runner given a `pool` calls fn(session, item) on a session
+checked out of it. Streamlit in Snowflake cannot open further sessions; there
+the pool is just the page's session and calls run one at a time.
+
+Code that shares one session with a background thread (live_search) instead
+goes through session_lock(session), passed as `lock`.
+"""
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+THROTTLE_MARKERS = ("429", "too many requests", "throttl", "rate limit", "concurrency limit")
+MAX_WORKER_SESSIONS = 32
+
+_session_locks = {}
+_session_locks_guard = threading.Lock()
+# Pool opened from the connection secrets (None where there are none), once worker_pool() has looked
+_worker_pool = None
+_worker_pool_checked = False
+
+
+def session_lock(session):
+    """Process-wide re-entrant lock for `session`, shared by every thread that calls it."""
+    with _session_locks_guard:
+        return _session_locks.setdefault(id(session), threading.RLock())
+
+
+class SessionPool:
+    """
+    Snowpark sessions for worker threads, each used by one call at a time.
+
+    Sessions are opened lazily with `create()`, up to `max_size`, and reused
+    after that; call() waits while all of them are busy.
+    """
+
+    def __init__(self, create=None, max_size=MAX_WORKER_SESSIONS, sessions=()):
+        self.create = create
+        self._idle = list(sessions)
+        self._opened = len(self._idle)
+        self.max_size = max(max_size, self._opened) if create else self._opened
+        self._available = threading.Condition()
+
+    @classmethod
+    def single(cls, session):
+        """A pool holding just `session`: calls on it run one at a time."""
+        return cls(sessions=[session])
+
+    def __len__(self):
+        return self._opened
+
+    def _checkout(self):
+        with self._available:
+            while not self._idle and self._opened >= self.max_size:
+                self._available.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._opened += 1
+        try:
+            return self.create()
+        except Exception:
+            with self._available:
+                self._opened -= 1
+                self._available.notify()
+            raise
+
+    def call(self, fn, *args):
+        """Run fn(session, *args) on a session checked out of the pool."""
+        session = self._checkout()
+        try:
+            return fn(session, *args)
+        finally:
+            with self._available:
+                self._idle.append(session)
+                self._available.notify()
+
+
+def worker_pool(session):
+    """
+    SessionPool for running calls concurrently next to `session`.
+
+    Outside Streamlit in Snowflake this is one process-wide pool of sessions
+    opened from st.secrets["connections"]["snowflake"] (the same parameters
+    the pages connect with). Where no further session can be opened it is
+    SessionPool.single(session).
+    """
+    global _worker_pool, _worker_pool_checked
+    with _session_locks_guard:
+        if not _worker_pool_checked:
+            import streamlit as st
+
+            try:
+                config = dict(st.secrets["connections"]["snowflake"])
+            except Exception:
+                # Streamlit in Snowflake: only the active session exists
+                config = None
+            if config:
+                from snowflake.snowpark import Session
+
+                _worker_pool = SessionPool(lambda: Session.builder.configs(config).create())
+            _worker_pool_checked = True
+    return _worker_pool or SessionPool.single(session)
+
+
+def is_throttled(error):
+    """Best-effort check for a rate-limit / throttling error."""
+    message = str(error).lower()
+    return any(marker in message for marker in THROTTLE_MARKERS)
+
+
+class AdaptiveRunner:
+    """
+    Call `fn(item)` for many items concurrently under an adaptive in-flight limit.
+
+    `fn` must be thread-safe. With a `pool` (SessionPool) it is called as
+    fn(session, item) on a session of its own, and no more calls than the
+    pool has sessions are in flight; with a `lock` (e.g. session_lock(session))
+    every call is made under it. With max_in_flight=1 calls run on the
+    calling thread. After map(), `stats` holds calls, retries, throttled,
+    seconds, items_per_sec and the final in-flight limit.
+    """
+
+    def __init__(self, fn, max_in_flight=8, min_in_flight=1, initial_in_flight=None,
+                 max_retries=6, base_delay=0.5, max_delay=30.0, throttled=is_throttled, lock=None, pool=None):
+        self.fn = fn
+        self.lock = lock
+        self.pool = pool
+        if pool is not None:
+            max_in_flight = max(1, min(max_in_flight, pool.max_size))
+        self.max_in_flight = max_in_flight
+        self.min_in_flight = min_in_flight
+        self.limit = float(min(initial_in_flight or max(min_in_flight, max_in_flight // 2), max_in_flight))
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.throttled = throttled
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def _on_success(self):
+        with self._lock:
+            # Additive increase: +1 per `limit` successful calls
+            self.limit = min(self.max_in_flight, self.limit + 1.0 / self.limit)
+
+    def _on_throttle(self):
+        with self._lock:
+            # Multiplicative decrease
+            self.limit = max(self.min_in_flight, self.limit / 2)
+            self.stats['throttled'] += 1
+
+    def _call(self, item):
+        for attempt in range(self.max_retries + 1):
+            try:
+                if self.pool is not None:
+                    result = self.pool.call(self.fn, item)
+                elif self.lock is not None:
+                    with self.lock:
+                        result = self.fn(item)
+                else:
+                    result = self.fn(item)
+                self._on_success()
+                return result
+            except Exception as e:
+                if not self.throttled(e) or attempt == self.max_retries:
+                    raise
+                self._on_throttle()
+                with self._lock:
+                    self.stats['retries'] += 1
+                # Exponential backoff with full jitter
+                time.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+
+    def map(self, items, progress=None):
+        """
+        Call `fn` on every item and return the results in input order.
+
+        `progress(done, total, items_per_sec)` is called as results arrive.
+        The first non-throttling error (or one still throttled after
+        max_retries) is raised once in-flight calls have finished.
+        """
+        items = list(items)
+        results = [None] * len(items)
+        self.stats = {'calls': len(items), 'retries': 0, 'throttled': 0}
+        start = time.perf_counter()
+        done = 0
+        next_index = 0
+        pending = {}
+
+        if self.max_in_flight == 1:
+            # Nothing to overlap: call in order on this thread (which may already hold `lock`)
+            for i, item in enumerate(items):
+                results[i] = self._call(item)
+                if progress:
+                    progress(i + 1, len(items), (i + 1) / max(time.perf_counter() - start, 1e-9))
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+                try:
+                    while next_index < len(items) or pending:
+                        while next_index < len(items) and len(pending) < int(self.limit):
+                            pending[pool.submit(self._call, items[next_index])] = next_index
+                            next_index += 1
+
+                        finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            results[pending.pop(future)] = future.result()
+                            done += 1
+                        if progress:
+                            progress(done, len(items), done / max(time.perf_counter() - start, 1e-9))
+                finally:
+                    for future in pending:
+                        future.cancel()
+
+        seconds = time.perf_counter() - start
+        self.stats.update(seconds=seconds,
+                          items_per_sec=len(items) / seconds if seconds else 0.0,
+                          in_flight=int(self.limit))
+        return results
@@ -1,8 +1,10 @@
 import streamlit as st
-from pypdf import PdfReader
-import io
 import pandas as pd
 from datetime import datetime
+from doc_extract import build_record, create_documents_table, get_file_type
+from stage_extract import ensure_document_stage, extract_staged_documents, new_batch_prefix, upload_to_stage
+from table_browser import fetch_aggregates, fetch_row, table_browser
+from table_meta import invalidate_table, table_row_count, table_version
 
 # Establish Snowflake connection
 # Connect to Snowflake
@@ -72,6 +74,9 @@ with st.container(border=True):
         - Perfect for testing batch processing and building RAG applications
         
         **Tip:** You can upload all 100 files at once for optimal batch processing!
+        
+        **Large corpora:** For tens of thousands of files, skip the uploader and load the archive directly:
+        `python src/ingest_documents.py review.zip --workers 8`
         """)
     
     st.divider()
@@ -85,15 +90,10 @@ with st.container(border=True):
         help="Supported formats: TXT, MD, PDF. Upload multiple files at once!"
 )
 
-    # Check if table exists to set default replace_mode value
-    table_exists = False
-    try:
-        check_result = session.sql(f"""
-            SELECT COUNT(*) as CNT FROM {st.session_state.database}.{st.session_state.schema}.{st.session_state.table_name}
-        """).collect()
-        table_exists = True  # Table exists if query succeeds
-    except:
-        table_exists = False  # Table doesn't exist
+    # Check if table exists to set default replace_mode value (cached metadata, no warehouse probe)
+    table_exists = table_row_count(
+        session, f"{st.session_state.database}.{st.session_state.schema}.{st.session_state.table_name}"
+    ) is not None
     
     # Set checkbox value based on table existence
     replace_mode = st.checkbox(
@@ -106,6 +106,15 @@ with st.container(border=True):
         st.warning(f":material/warning: **Replace Mode Enabled** - All existing documents in `{st.session_state.table_name}` will be deleted before saving new ones.")
     else:
         st.info(f":material/add: **Append Mode** - New documents will be added to `{st.session_state.table_name}`.")
+    
+    # PDF extraction mode
+    pdf_mode = st.radio(
+        ":material/picture_as_pdf: PDF Extraction",
+        ["Local (pypdf in this app)", "In Snowflake (PARSE_DOCUMENT)"],
+        horizontal=True,
+        help="In Snowflake mode, PDFs are uploaded to a stage and parsed in the warehouse, so this app only moves bytes. TXT and MD files are always read locally."
+    )
+    pushdown_pdfs = pdf_mode.startswith("In Snowflake")
 
 # Get values from session state for use in the rest of the code
 database = st.session_state.database
@@ -124,10 +133,7 @@ if uploaded_files:
                 {
                     "File Name": f.name,
                     "Size": f"{f.size:,} bytes",
-                    "Type": "TXT" if f.name.lower().endswith('.txt') 
-                           else "Markdown" if f.name.lower().endswith('.md')
-                           else "PDF" if f.name.lower().endswith('.pdf')
-                           else "Unknown"
+                    "Type": get_file_type(f.name)
                 }
                 for f in uploaded_files
             ])
@@ -145,6 +151,17 @@ if uploaded_files:
         success_count = 0
         error_count = 0
         extracted_data = []
+        staged_files = []
+        
+        # Pushdown mode: PDFs go to a stage as raw bytes and are parsed on save
+        if pushdown_pdfs and any(f.name.lower().endswith('.pdf') for f in uploaded_files):
+            try:
+                create_documents_table(session, database, schema, table_name)
+                stage_name = ensure_document_stage(session, database, schema)
+                stage_prefix = new_batch_prefix()
+            except Exception as e:
+                st.error(f"Error preparing document stage: {str(e)}")
+                st.stop()
         
         progress_bar = st.progress(0, text="Starting extraction...")
         status_container = st.empty()
@@ -154,51 +171,23 @@ if uploaded_files:
             progress_bar.progress(progress_pct, text=f"Processing {idx+1}/{len(uploaded_files)}: {uploaded_file.name}")
             
             try:
-                # Determine file type from extension
-                if uploaded_file.name.lower().endswith('.txt'):
-                    file_type = "TXT"
-                elif uploaded_file.name.lower().endswith('.md'):
-                    file_type = "Markdown"
-                elif uploaded_file.name.lower().endswith('.pdf'):
-                    file_type = "PDF"
-                else:
-                    file_type = "Unknown"
-                
                 # Reset file pointer
                 uploaded_file.seek(0)
                 
-                # Extract text based on file type
-                extracted_text = ""
-                
-                if uploaded_file.name.lower().endswith(('.txt', '.md')):
-                    # Handle TXT and Markdown files
-                    extracted_text = uploaded_file.read().decode("utf-8")
+                if pushdown_pdfs and uploaded_file.name.lower().endswith('.pdf'):
+                    # Only move bytes here - the warehouse parses the PDF
+                    upload_to_stage(session, stage_name, stage_prefix, uploaded_file.name, uploaded_file.read())
+                    staged_files.append({'file_name': uploaded_file.name, 'file_size': uploaded_file.size})
+                    success_count += 1
+                    continue
                 
-                elif uploaded_file.name.lower().endswith('.pdf'):
-                    # Handle PDF files
-                    pdf_reader = PdfReader(io.BytesIO(uploaded_file.read()))
-                    
-                    # Extract text from all pages
-                    for page in pdf_reader.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            extracted_text += page_text + "\n\n"
+                # Extract text based on file type
+                record = build_record(uploaded_file.name, uploaded_file.read())
                 
                 # Check if extraction was successful
-                if extracted_text and extracted_text.strip():
-                    # Calculate metadata
-                    word_count = len(extracted_text.split())
-                    char_count = len(extracted_text)
-                    
+                if record:
                     # Store extracted data
-                    extracted_data.append({
-                        'file_name': uploaded_file.name,
-                        'file_type': file_type,
-                        'file_size': uploaded_file.size,
-                        'extracted_text': extracted_text,
-                        'word_count': word_count,
-                        'char_count': char_count
-                    })
+                    extracted_data.append(record)
                     
                     success_count += 1
                 else:
@@ -225,9 +214,11 @@ if uploaded_files:
                 st.metric(":material/analytics: Total Words", f"{sum(d['word_count'] for d in extracted_data):,}")
             
             # Store in session state for review
-            if extracted_data:
+            if extracted_data or staged_files:
                 st.session_state.extracted_data = extracted_data
-                st.success(f":material/check_circle: Successfully extracted text from {success_count} file(s)!")
+                st.success(f":material/check_circle: Successfully extracted text from {len(extracted_data)} file(s)!")
+                if staged_files:
+                    st.info(f":material/cloud_upload: {len(staged_files)} PDF(s) staged for parsing in Snowflake")
                 
                 # Preview extracted data
                 with st.expander(":material/visibility: Preview First 3 Files"):
@@ -246,26 +237,9 @@ if uploaded_files:
                 # Save to Snowflake
                 with st.status("Saving to Snowflake...", expanded=True) as status:
                     try:
-                        # Ensure database and schema exist
+                        # Ensure database, schema and table exist
                         st.write(":material/looks_one: Setting up database structure...")
-                        session.sql(f"CREATE DATABASE IF NOT EXISTS {database}").collect()
-                        session.sql(f"CREATE SCHEMA IF NOT EXISTS {database}.{schema}").collect()
-                        
-                        # Create table if it doesn't exist
-                        st.write(":material/looks_two: Creating table if needed...")
-                        create_table_sql = f"""
-                        CREATE TABLE IF NOT EXISTS {database}.{schema}.{table_name} (
-                            DOC_ID NUMBER AUTOINCREMENT,
-                            FILE_NAME VARCHAR,
-                            FILE_TYPE VARCHAR,
-                            FILE_SIZE NUMBER,
-                            EXTRACTED_TEXT VARCHAR,
-                            UPLOAD_TIMESTAMP TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP(),
-                            WORD_COUNT NUMBER,
-                            CHAR_COUNT NUMBER
-                        )
-                        """
-                        session.sql(create_table_sql).collect()
+                        create_documents_table(session, database, schema, table_name)
                         
                         # Replace mode: clear existing data
                         if replace_mode:
@@ -277,7 +251,7 @@ if uploaded_files:
                                 st.write(f"   :material/warning: No existing data to clear")
                         
                         # Insert all extracted data
-                        st.write(f":material/looks_3: Inserting {len(extracted_data)} document(s)...")
+                        st.write(f":material/looks_two: Inserting {len(extracted_data)} document(s)...")
                         
                         for idx, data in enumerate(extracted_data, 1):
                             st.caption(f"Saving {idx}/{len(extracted_data)}: {data['file_name']}")
@@ -291,10 +265,21 @@ if uploaded_files:
                             """
                             session.sql(insert_sql).collect()
                         
+                        # Parse staged PDFs set-based in the warehouse
+                        parsed_count = 0
+                        if staged_files:
+                            st.write(f":material/looks_3: Parsing {len(staged_files)} staged PDF(s) in Snowflake...")
+                            parsed_count = extract_staged_documents(
+                                session, f"{database}.{schema}.{table_name}",
+                                stage_name, stage_prefix, staged_files
+                            )
+                            if parsed_count < len(staged_files):
+                                st.write(f"   :material/warning: No text extracted from {len(staged_files) - parsed_count} PDF(s)")
+                        
                         status.update(label=":material/check_circle: All documents saved!", state="complete", expanded=False)
                         
                         mode_msg = "replaced in" if replace_mode else "saved to"
-                        st.success(f":material/check_circle: Successfully {mode_msg} `{database}.{schema}.{table_name}`\n\n:material/description: {len(extracted_data)} document(s) now in table")
+                        st.success(f":material/check_circle: Successfully {mode_msg} `{database}.{schema}.{table_name}`\n\n:material/description: {len(extracted_data) + parsed_count} document(s) now in table")
                         
                         # Store references in session state for downstream apps
                         st.session_state.rag_source_table = f"{database}.{schema}.{table_name}"
@@ -305,6 +290,9 @@ if uploaded_files:
                         
                     except Exception as e:
                         st.error(f"Error saving to Snowflake: {str(e)}")
+                    finally:
+                        # A failed save may still have created, cleared or partly filled the table
+                        invalidate_table(f"{database}.{schema}.{table_name}")
             else:
                 st.warning("No text was successfully extracted from any file.")
 
@@ -315,96 +303,85 @@ with st.container(border=True):
     st.subheader(":material/search: View Saved Documents")
     
     # Check if table exists and show record count
-    try:
-        count_result = session.sql(f"""
-            SELECT COUNT(*) as CNT FROM {database}.{schema}.{table_name}
-        """).collect()
-        
-        if count_result:
-            record_count = count_result[0]['CNT']
-            if record_count > 0:
-                st.warning(f":material/warning: **{record_count} record(s)** currently in table `{database}.{schema}.{table_name}`")
-            else:
-                st.info(":material/inbox: **Table is empty** - No documents uploaded yet.")
-    except:
+    record_count = table_row_count(session, f"{database}.{schema}.{table_name}")
+    if record_count is None:
         st.info(":material/inbox: **Table doesn't exist yet** - Upload and save documents to create it.")
+    elif record_count > 0:
+        st.warning(f":material/warning: **{record_count} record(s)** currently in table `{database}.{schema}.{table_name}`")
+    else:
+        st.info(":material/inbox: **Table is empty** - No documents uploaded yet.")
     
     query_button = st.button("Query Table", type="secondary", use_container_width=True)
     
     if query_button:
-        try:
-            full_table_name = f"{database}.{schema}.{table_name}"
-            
-            # Query the table
-            query_sql = f"""
-            SELECT DOC_ID, FILE_NAME, FILE_TYPE, FILE_SIZE, UPLOAD_TIMESTAMP, WORD_COUNT, CHAR_COUNT
-            FROM {full_table_name}
-            ORDER BY UPLOAD_TIMESTAMP DESC
-            """
-            df = session.sql(query_sql).to_pandas()
-        
-            # Store in session state for persistence
-            st.session_state.queried_docs = df
-            st.session_state.full_table_name = full_table_name
-            st.rerun()
-                
-        except Exception as e:
-            st.error(f"Error: {str(e)}")
-            st.info(":material/lightbulb: Table may not exist yet. Upload and save documents first!")
+        # Only remember which table to browse; pages are fetched on demand below
+        st.session_state.full_table_name = f"{database}.{schema}.{table_name}"
+        st.rerun()
     
     # Display query results if available
-    if 'queried_docs' in st.session_state and 'full_table_name' in st.session_state:
+    if 'full_table_name' in st.session_state:
         # Use current session state values for dynamic table name display
         current_full_table_name = f"{st.session_state.database}.{st.session_state.schema}.{st.session_state.table_name}"
         
         # Only show results if they match the current table (avoid showing stale data from a different table)
         if st.session_state.full_table_name == current_full_table_name:
-            df = st.session_state.queried_docs
-            
-            if len(df) > 0:
+            if record_count:
                 st.code(f"{current_full_table_name}", language="sql")
                 
-                # Summary metrics
+                # Summary metrics (one aggregate query instead of loading every row)
+                totals = fetch_aggregates(
+                    session, current_full_table_name,
+                    (("DOCS", "COUNT(*)"), ("WORDS", "SUM(WORD_COUNT)"), ("CHARS", "SUM(CHAR_COUNT)")),
+                    table_version(current_full_table_name)
+                )
                 col1, col2, col3 = st.columns(3)
                 with col1:
-                    st.metric("Documents", len(df))
+                    st.metric("Documents", f"{totals['DOCS']:,}")
                 with col2:
-                    st.metric("Words", f"{df['WORD_COUNT'].sum():,}")
+                    st.metric("Words", f"{totals['WORDS'] or 0:,}")
                 with col3:
-                    st.metric("Characters", f"{df['CHAR_COUNT'].sum():,}")
+                    st.metric("Characters", f"{totals['CHARS'] or 0:,}")
                 
                 st.divider()
                 
-                # Display documents table
-                st.dataframe(
-                    df[['DOC_ID', 'FILE_NAME', 'FILE_TYPE', 'WORD_COUNT', 'UPLOAD_TIMESTAMP']],
-                    use_container_width=True
+                # Display one page of documents (sorted and paginated in Snowflake)
+                df = table_browser(
+                    session, current_full_table_name,
+                    columns=['DOC_ID', 'FILE_NAME', 'FILE_TYPE', 'WORD_COUNT', 'UPLOAD_TIMESTAMP'],
+                    sort_columns=['UPLOAD_TIMESTAMP', 'DOC_ID', 'FILE_NAME', 'WORD_COUNT'],
+                    key="day16_docs",
+                    key_column="DOC_ID",
+                    descending=True
                 )
                 
-                # Option to view full text of a document
-                with st.expander(":material/menu_book: View Full Document Text"):
-                    doc_id = st.selectbox(
-                        "Select Document ID:",
-                        options=df['DOC_ID'].tolist(),
-                        format_func=lambda x: f"Doc #{x} - {df[df['DOC_ID']==x]['FILE_NAME'].values[0]}"
-                    )
-                    
-                    if st.button("Load Text"):
-                        text_sql = f"SELECT EXTRACTED_TEXT, FILE_NAME FROM {current_full_table_name} WHERE DOC_ID = {doc_id}"
-                        text_result = session.sql(text_sql).to_pandas()
-                        if len(text_result) > 0:
-                            doc = text_result.iloc[0]
-                            # Store in session state
-                            st.session_state.loaded_doc_text = doc['EXTRACTED_TEXT']
-                            st.session_state.loaded_doc_name = doc['FILE_NAME']
-                    
-                    # Display loaded text if available
-                    if 'loaded_doc_text' in st.session_state:
-                        st.text_area(
-                            st.session_state.loaded_doc_name,
-                            value=st.session_state.loaded_doc_text,
-                            height=400
+                # Option to view full text of a document on the current page
+                if df is not None and len(df) > 0:
+                    with st.expander(":material/menu_book: View Full Document Text"):
+                        # Build the labels once (a per-option DataFrame scan is O(n²))
+                        doc_labels = dict(zip(df['DOC_ID'].tolist(), df['FILE_NAME'].tolist()))
+                        doc_id = st.selectbox(
+                            "Select Document ID:",
+                            options=list(doc_labels),
+                            format_func=lambda x: f"Doc #{x} - {doc_labels[x]}"
                         )
+                        
+                        if st.button("Load Text"):
+                            doc = fetch_row(session, current_full_table_name, ("EXTRACTED_TEXT", "FILE_NAME"),
+                                            "DOC_ID", doc_id, table_version(current_full_table_name))
+                            if doc is not None:
+                                # Store in session state
+                                st.session_state.loaded_doc_text = doc['EXTRACTED_TEXT']
+                                st.session_state.loaded_doc_name = doc['FILE_NAME']
+                        
+                        # Display loaded text if available
+                        if 'loaded_doc_text' in st.session_state:
+                            st.text_area(
+                                st.session_state.loaded_doc_name,
+                                value=st.session_state.loaded_doc_text,
+                                height=400
+                            )
+            elif record_count is None:
+                st.info(":material/lightbulb: Table may not exist yet. Upload and save documents first!")
             else:
                 st.info(":material/inbox: Table is empty. Upload files above!")
         else:
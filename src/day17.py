@@ -1,6 +1,12 @@
 import streamlit as st
 import pandas as pd
 import re
+from chunking import ChunkStats, token_window_chunks, whole_document_chunks, word_window_chunks
+from chunk_store import chunk_locally, identify_chunks, settings_key, sync_chunks, write_chunks
+from chunk_udtf import chunk_in_warehouse
+from embeddings import delete_stale_embeddings
+from table_browser import fetch_aggregates, fetch_row, table_browser
+from table_meta import invalidate_table, table_row_count, table_version
 
 # Connect to Snowflake
 try:
@@ -124,12 +130,14 @@ if 'loaded_data' in st.session_state:
         Since customer reviews are typically short (~150 words each), you have two options:
         - **Option 1**: Use each review as-is (Recommended for reviews)
         - **Option 2**: Chunk longer reviews (For reviews >200 words)
+        - **Option 3**: Sentence-aware chunks sized in embedding-model tokens (For long, multi-paragraph documents)
         """)
         
         processing_option = st.radio(
             "Select processing strategy:",
             ["Keep each review as a single chunk (Recommended)", 
-             "Chunk reviews longer than threshold"],
+             "Chunk reviews longer than threshold",
+             "Sentence-aware token chunks"],
             index=0
         )
         
@@ -146,82 +154,77 @@ if 'loaded_data' in st.session_state:
                     help="Maximum number of words per chunk"
                 )
             with col2:
+                # Overlap must stay below the chunk size or windows never advance
+                max_overlap = min(100, chunk_size - 10)
                 overlap = st.slider(
                     "Overlap (words):",
                     min_value=0,
-                    max_value=100,
-                    value=50,
+                    max_value=max_overlap,
+                    value=min(50, max_overlap),
                     step=10,
                     help="Number of overlapping words between chunks"
                 )
             st.caption(f"Reviews with >{chunk_size} words will be split into chunks of {chunk_size} words with {overlap} word overlap")
+        elif "Sentence-aware" in processing_option:
+            col1, col2 = st.columns(2)
+            with col1:
+                chunk_size = st.slider(
+                    "Max Chunk Size (tokens):",
+                    min_value=64,
+                    max_value=512,
+                    value=256,
+                    step=32,
+                    help="Maximum embedding-model tokens per chunk (snowflake-arctic-embed-m reads up to 512)"
+                )
+            with col2:
+                overlap = st.slider(
+                    "Overlap (tokens):",
+                    min_value=0,
+                    max_value=128,
+                    value=32,
+                    step=16,
+                    help="Trailing sentences worth up to this many tokens are repeated in the next chunk"
+                )
+            st.caption(f"Chunks are built from whole sentences, up to {chunk_size} tokens, breaking at paragraphs where possible, with up to {overlap} tokens of sentence overlap")
         else:
             # Default values if not chunking
             chunk_size = 200
             overlap = 50
         
         if st.button(":material/flash_on: Process Reviews", type="primary", use_container_width=True):
-            chunks = []
-            
             with st.status("Processing reviews...", expanded=True) as status:
+                chunk_stats = None
+                
                 if "Keep each review" in processing_option:
                     # Option 1: One review = one chunk
                     st.write(":material/edit_note: Creating one chunk per review...")
-                    
-                    for idx, row in df.iterrows():
-                        chunks.append({
-                            'doc_id': row['DOC_ID'],
-                            'file_name': row['FILE_NAME'],
-                            'chunk_id': idx + 1,
-                            'chunk_text': row['EXTRACTED_TEXT'],
-                            'chunk_size': row['WORD_COUNT'],
-                            'chunk_type': 'full_review'
-                        })
-                    
+                    strategy = 'full_review'
+                    chunks = whole_document_chunks(df)
                     st.write(f":material/check_circle: Created {len(chunks)} chunks (1 per review)")
                     
+                elif "Sentence-aware" in processing_option:
+                    # Option 3: Sentence-aware chunks sized in model tokens
+                    st.write(f":material/edit_note: Building sentence-aware chunks of up to {chunk_size} tokens...")
+                    strategy = 'token_window'
+                    chunk_stats = ChunkStats()
+                    chunks = token_window_chunks(df, chunk_size, overlap, stats=chunk_stats)
+                    st.write(f":material/check_circle: Created {len(chunks)} chunks from {len(df)} reviews")
+                    
                 else:
                     # Option 2: Chunk longer reviews
                     st.write(f":material/edit_note: Chunking reviews longer than {chunk_size} words...")
-                    chunk_id = 1
-                    
-                    for idx, row in df.iterrows():
-                        text = row['EXTRACTED_TEXT']
-                        words = text.split()
-                        
-                        if len(words) <= chunk_size:
-                            # Keep short reviews as-is
-                            chunks.append({
-                                'doc_id': row['DOC_ID'],
-                                'file_name': row['FILE_NAME'],
-                                'chunk_id': chunk_id,
-                                'chunk_text': text,
-                                'chunk_size': len(words),
-                                'chunk_type': 'full_review'
-                            })
-                            chunk_id += 1
-                        else:
-                            # Split longer reviews
-                            for i in range(0, len(words), chunk_size - overlap):
-                                chunk_words = words[i:i + chunk_size]
-                                chunk_text = ' '.join(chunk_words)
-                                
-                                chunks.append({
-                                    'doc_id': row['DOC_ID'],
-                                    'file_name': row['FILE_NAME'],
-                                    'chunk_id': chunk_id,
-                                    'chunk_text': chunk_text,
-                                    'chunk_size': len(chunk_words),
-                                    'chunk_type': 'chunked_review'
-                                })
-                                chunk_id += 1
-                    
+                    strategy = 'word_window'
+                    chunks = word_window_chunks(df, chunk_size, overlap)
                     st.write(f":material/check_circle: Created {len(chunks)} chunks from {len(df)} reviews")
                 
+                # Same stable CHUNK_IDs and hashes as the table-to-table paths, so saving merges
+                chunks = identify_chunks(chunks, df, settings_key(strategy, chunk_size, overlap))
+                
                 status.update(label="Processing complete!", state="complete", expanded=False)
                     
             # Store chunks in session state
             st.session_state.review_chunks = chunks
+            st.session_state.chunk_stats = chunk_stats
             st.session_state.processing_option = processing_option
             
             st.success(f":material/check_circle: Processed {len(df)} reviews into {len(chunks)} searchable chunks!")
@@ -237,16 +240,30 @@ if 'loaded_data' in st.session_state:
             with col1:
                 st.metric("Total Chunks", len(chunks))
             with col2:
-                full_reviews = len([c for c in chunks if c['chunk_type'] == 'full_review'])
+                full_reviews = int((chunks['CHUNK_TYPE'] == 'full_review').sum())
                 st.metric("Full Reviews", full_reviews)
             with col3:
-                split_reviews = len([c for c in chunks if c['chunk_type'] == 'chunked_review'])
+                split_reviews = int((chunks['CHUNK_TYPE'] == 'chunked_review').sum())
                 st.metric("Split Reviews", split_reviews)
             
+            # Token statistics (sentence-aware chunking only)
+            chunk_stats = st.session_state.get('chunk_stats')
+            if chunk_stats is not None:
+                stats = chunk_stats.summary()
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Avg Chunks/Review", f"{stats['avg_chunks_per_doc']:.1f}")
+                with col2:
+                    st.metric("Avg Tokens/Chunk", f"{stats['avg_tokens']:.0f}")
+                with col3:
+                    st.metric("Max Tokens/Chunk", stats['max_tokens'])
+                
+                with st.expander(":material/bar_chart: Token Histogram"):
+                    st.bar_chart(chunk_stats.token_histogram(), x_label="Tokens per chunk", y_label="Chunks")
+            
             # Display chunks
             with st.expander(":material/description: View Chunks"):
-                chunks_df = pd.DataFrame(chunks)
-                st.dataframe(chunks_df[['chunk_id', 'file_name', 'chunk_size', 'chunk_type', 'chunk_text']], 
+                st.dataframe(chunks[['CHUNK_ID', 'FILE_NAME', 'CHUNK_SIZE', 'CHUNK_TYPE', 'CHUNK_TEXT']], 
                             use_container_width=True)
         
         # Step 4: Save chunks to Snowflake
@@ -268,24 +285,17 @@ if 'loaded_data' in st.session_state:
             full_chunk_table = f"{st.session_state.day17_database}.{st.session_state.day17_schema}.{st.session_state.day17_chunk_table}"
             st.code(full_chunk_table, language="sql")
             
-            # Check if chunk table exists and show status
-            chunk_table_exists = False  # Default to False (unticked)
-            try:
-                count_result = session.sql(f"""
-                    SELECT COUNT(*) as CNT FROM {full_chunk_table}
-                """).collect()
-                
-                if count_result:
-                    record_count = count_result[0]['CNT']
-                    if record_count > 0:
-                        st.warning(f":material/warning: **{record_count} chunk(s)** currently in table `{full_chunk_table}`")
-                        chunk_table_exists = True  # Only tick if table has data
-                    else:
-                        st.info(":material/inbox: **Chunk table is empty** - No chunks saved yet.")
-                        chunk_table_exists = False
-            except:
+            # Check if chunk table exists and show status (cached metadata, no warehouse probe)
+            record_count = table_row_count(session, full_chunk_table)
+            if record_count is None:
                 st.info(":material/inbox: **Chunk table doesn't exist yet** - Will be created when you save chunks.")
                 chunk_table_exists = False
+            elif record_count > 0:
+                st.warning(f":material/warning: **{record_count} chunk(s)** currently in table `{full_chunk_table}`")
+                chunk_table_exists = True  # Only tick if table has data
+            else:
+                st.info(":material/inbox: **Chunk table is empty** - No chunks saved yet.")
+                chunk_table_exists = False
             
             # Initialize or update checkbox state based on table status
             # This ensures checkbox reflects current table state
@@ -308,62 +318,24 @@ if 'loaded_data' in st.session_state:
             if replace_mode:
                 st.warning("**Replace Mode Active**: Existing chunks will be deleted before saving new ones.")
             else:
-                st.success("**Append Mode Active**: New chunks will be added to existing data.")
+                st.success("**Append Mode Active**: Chunks are merged into existing data - re-saved reviews replace their old chunks.")
             
             # Save chunks to table
             if st.button(":material/save: Save Chunks to Snowflake", type="primary", use_container_width=True):
                 try:
                     with st.status("Saving chunks to Snowflake...", expanded=True) as status:
-                        # Step 1: Create table if it doesn't exist
-                        st.write(":material/looks_one: Checking table...")
-                        create_table_sql = f"""
-                        CREATE TABLE IF NOT EXISTS {full_chunk_table} (
-                            CHUNK_ID NUMBER,
-                            DOC_ID NUMBER,
-                            FILE_NAME VARCHAR,
-                            CHUNK_TEXT VARCHAR,
-                            CHUNK_SIZE NUMBER,
-                            CHUNK_TYPE VARCHAR,
-                            CREATED_TIMESTAMP TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()
-                        )
-                        """
-                        session.sql(create_table_sql).collect()
-                        
-                        # Step 2: Replace mode - clear existing chunks
                         if replace_mode:
-                            st.write(":material/sync: Replace mode: Clearing existing chunks...")
-                            try:
-                                session.sql(f"TRUNCATE TABLE {full_chunk_table}").collect()
-                                st.write("   :material/check_circle: Existing chunks cleared")
-                            except Exception as e:
-                                st.write(f"   :material/warning: No existing chunks to clear")
-                        
-                        # Step 3: Insert chunks
-                        st.write(f":material/looks_3: Inserting {len(chunks)} chunk(s)...")
-                        chunks_df = pd.DataFrame(chunks)
-                        
-                        # Rename columns to uppercase to match Snowflake table
-                        chunks_df_upper = chunks_df[['chunk_id', 'doc_id', 'file_name', 'chunk_text', 
-                                                       'chunk_size', 'chunk_type']].copy()
-                        chunks_df_upper.columns = ['CHUNK_ID', 'DOC_ID', 'FILE_NAME', 'CHUNK_TEXT', 
-                                                   'CHUNK_SIZE', 'CHUNK_TYPE']
-                        
-                        if replace_mode:
-                            # Use overwrite for replace mode (though we already truncated)
-                            session.write_pandas(chunks_df_upper,
-                                               table_name=st.session_state.day17_chunk_table,
-                                               database=st.session_state.day17_database,
-                                               schema=st.session_state.day17_schema,
-                                               overwrite=True)
+                            st.write(f":material/sync: Replacing table contents with {len(chunks)} chunk(s)...")
                         else:
-                            # Append mode
-                            session.write_pandas(chunks_df_upper,
-                                               table_name=st.session_state.day17_chunk_table,
-                                               database=st.session_state.day17_database,
-                                               schema=st.session_state.day17_schema,
-                                               overwrite=False)
+                            st.write(f":material/merge: Merging {len(chunks)} chunk(s) on (DOC_ID, CHUNK_OFFSET)...")
+                        write_chunks(session, chunks,
+                                     st.session_state.day17_database,
+                                     st.session_state.day17_schema,
+                                     st.session_state.day17_chunk_table,
+                                     replace=replace_mode)
                         
                         status.update(label=":material/check_circle: Chunks saved!", state="complete", expanded=False)
+                        invalidate_table(full_chunk_table)
                     
                     mode_msg = "replaced in" if replace_mode else "saved to"
                     st.success(f":material/check_circle: Successfully {mode_msg} `{full_chunk_table}`\n\n:material/description: {len(chunks)} chunk(s) now in table")
@@ -379,6 +351,144 @@ if 'loaded_data' in st.session_state:
                 except Exception as e:
                     st.error(f"Error saving chunks: {str(e)}")
 
+# Table-to-Table Chunking Section
+# Tables above this size are chunked inside Snowflake in "Auto" mode
+LOCAL_CHUNKING_MAX_DOCS = 2000
+
+with st.container(border=True):
+    st.subheader(":material/sync_alt: Table-to-Table Chunking")
+    st.write("Chunk straight from the source table into the chunk table, without loading reviews above.")
+    st.markdown("""
+    - **Sync New & Changed**: chunks only reviews that are new or changed since the last sync and `MERGE`s them. Unchanged chunks keep their IDs, so Day 18 doesn't have to re-embed them.
+    - **Rebuild All**: re-chunks every review, either in this app or inside Snowflake with a Python UDTF (no review text leaves the warehouse).
+    """)
+    
+    sync_strategies = {
+        'full_review': "Keep each review as a single chunk",
+        'word_window': "Chunk reviews longer than threshold (words)",
+        'token_window': "Sentence-aware token chunks",
+    }
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        sync_strategy = st.selectbox(
+            "Strategy:",
+            options=list(sync_strategies),
+            format_func=lambda x: sync_strategies[x],
+            key="day17_sync_strategy"
+        )
+    with col2:
+        sync_chunk_size = st.number_input("Chunk size:", min_value=50, max_value=512, value=200, step=10,
+                                          disabled=sync_strategy == 'full_review', key="day17_sync_chunk_size")
+    with col3:
+        sync_overlap = st.number_input("Overlap:", min_value=0, max_value=128, value=50, step=10,
+                                       disabled=sync_strategy == 'full_review', key="day17_sync_overlap")
+    
+    source_table = f"{st.session_state.day17_database}.{st.session_state.day17_schema}.{st.session_state.day17_table_name}"
+    full_chunk_table = f"{st.session_state.day17_database}.{st.session_state.day17_schema}.{st.session_state.day17_chunk_table}"
+    st.caption(f":material/analytics: `{source_table}` → `{full_chunk_table}`")
+    
+    # Day 18's embedding table, if any: embeddings of chunks that disappear are deleted with them
+    full_embedding_table = st.session_state.get('embeddings_table')
+    if full_embedding_table and table_row_count(session, full_embedding_table) is None:
+        full_embedding_table = None
+    
+    rebuild_engine = st.radio(
+        "Rebuild runs:",
+        ["Auto", "Locally", "In Snowflake (UDTF)"],
+        horizontal=True,
+        help=f"Auto chunks locally up to {LOCAL_CHUNKING_MAX_DOCS:,} reviews and inside Snowflake above that",
+        key="day17_rebuild_engine"
+    )
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        sync_clicked = st.button(":material/sync: Sync New & Changed", use_container_width=True)
+    with col2:
+        rebuild_clicked = st.button(":material/restart_alt: Rebuild All", use_container_width=True)
+    
+    if rebuild_clicked:
+        if sync_strategy != 'full_review' and sync_overlap >= sync_chunk_size:
+            st.error("Overlap must be smaller than the chunk size.")
+        else:
+            source_count = table_row_count(session, source_table) or 0
+            in_warehouse = (rebuild_engine == "In Snowflake (UDTF)"
+                            or (rebuild_engine == "Auto" and source_count > LOCAL_CHUNKING_MAX_DOCS))
+            try:
+                with st.status("Rebuilding chunks...", expanded=True) as status:
+                    if in_warehouse:
+                        st.write(f":material/cloud: Chunking {source_count:,} review(s) inside Snowflake...")
+                        chunk_count = chunk_in_warehouse(session, source_table, full_chunk_table,
+                                                         sync_strategy, sync_chunk_size, sync_overlap)
+                    else:
+                        st.write(f":material/computer: Chunking {source_count:,} review(s) locally...")
+                        chunk_count = chunk_locally(session, source_table,
+                                                    st.session_state.day17_database, st.session_state.day17_schema,
+                                                    st.session_state.day17_chunk_table,
+                                                    sync_strategy, sync_chunk_size, sync_overlap)
+                    embeddings_deleted = 0
+                    if full_embedding_table:
+                        embeddings_deleted = delete_stale_embeddings(session, full_chunk_table, full_embedding_table)
+                    status.update(label=":material/check_circle: Rebuild complete!", state="complete", expanded=False)
+                invalidate_table(full_chunk_table)
+                st.success(f":material/check_circle: {chunk_count:,} chunk(s) now in `{full_chunk_table}`")
+                if embeddings_deleted:
+                    invalidate_table(full_embedding_table)
+                    st.caption(f":material/delete: Removed {embeddings_deleted:,} embedding(s) of chunks that were removed or changed")
+                
+                # Store for Day 18
+                st.session_state.chunks_table = full_chunk_table
+                st.session_state.chunks_database = st.session_state.day17_database
+                st.session_state.chunks_schema = st.session_state.day17_schema
+                st.session_state.chunk_table_saved = True
+                
+            except Exception as e:
+                st.error(f"Error rebuilding chunks: {str(e)}")
+    
+    if sync_clicked:
+        if sync_strategy != 'full_review' and sync_overlap >= sync_chunk_size:
+            st.error("Overlap must be smaller than the chunk size.")
+        else:
+            try:
+                with st.status("Syncing chunks...", expanded=True) as status:
+                    st.write(":material/search: Finding new and changed reviews, chunking and merging...")
+                    counts = sync_chunks(
+                        session, source_table,
+                        st.session_state.day17_database, st.session_state.day17_schema,
+                        st.session_state.day17_chunk_table,
+                        sync_strategy, sync_chunk_size, sync_overlap,
+                        full_embedding_table=full_embedding_table
+                    )
+                    status.update(label=":material/check_circle: Sync complete!", state="complete", expanded=False)
+                invalidate_table(full_chunk_table)
+                
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("Reviews Re-chunked", counts['documents'])
+                with col2:
+                    st.metric("Inserted", counts['inserted'])
+                with col3:
+                    st.metric("Updated", counts['updated'])
+                with col4:
+                    st.metric("Unchanged", counts['unchanged'])
+                if counts['deleted']:
+                    st.caption(f":material/delete: Removed {counts['deleted']} stale chunk(s) of re-chunked reviews")
+                if counts['pruned']:
+                    st.caption(f":material/delete: Removed {counts['pruned']} chunk(s) of reviews deleted from `{source_table}`")
+                if counts['embeddings_deleted']:
+                    invalidate_table(full_embedding_table)
+                    st.caption(f":material/delete: Removed {counts['embeddings_deleted']:,} embedding(s) of chunks that were removed or changed")
+                if counts['documents'] == 0 and counts['pruned'] == 0:
+                    st.success(":material/check_circle: Chunk table is already up to date.")
+                
+                # Store for Day 18
+                st.session_state.chunks_table = full_chunk_table
+                st.session_state.chunks_database = st.session_state.day17_database
+                st.session_state.chunks_schema = st.session_state.day17_schema
+                st.session_state.chunk_table_saved = True
+                
+            except Exception as e:
+                st.error(f"Error syncing chunks: {str(e)}")
+
 # View Saved Chunks Section
 with st.container(border=True):
     st.subheader(":material/search: View Saved Chunks")
@@ -390,79 +500,71 @@ with st.container(border=True):
     query_button = st.button(":material/analytics: Query Chunk Table", type="secondary", use_container_width=True)
     
     if query_button:
-        try:
-            query_sql = f"""
-            SELECT 
-                CHUNK_ID,
-                FILE_NAME,
-                CHUNK_SIZE,
-                CHUNK_TYPE,
-                LEFT(CHUNK_TEXT, 100) AS TEXT_PREVIEW,
-                CREATED_TIMESTAMP
-            FROM {full_chunk_table}
-            ORDER BY CHUNK_ID
-            """
-            chunks_df = session.sql(query_sql).to_pandas()
-            
-            # Store in session state for persistence
-            st.session_state.queried_chunks = chunks_df
-            st.session_state.queried_chunks_table = full_chunk_table
-            st.rerun()
-                
-        except Exception as e:
-            st.error(f"Error querying chunks: {str(e)}")
+        # Only remember which table to browse; pages are fetched on demand below
+        st.session_state.queried_chunks_table = full_chunk_table
+        st.rerun()
     
     # Display results if available in session state
-    if 'queried_chunks' in st.session_state and st.session_state.get('queried_chunks_table') == full_chunk_table:
-        chunks_df = st.session_state.queried_chunks
+    if st.session_state.get('queried_chunks_table') == full_chunk_table:
+        chunk_count = table_row_count(session, full_chunk_table)
         
-        if len(chunks_df) > 0:
+        if chunk_count:
             st.code(full_chunk_table, language="sql")
             
-            # Summary metrics
+            # Summary metrics (one aggregate query instead of loading every row)
+            totals = fetch_aggregates(
+                session, full_chunk_table,
+                (("TOTAL", "COUNT(*)"),
+                 ("FULL_REVIEWS", "COUNT_IF(CHUNK_TYPE = 'full_review')"),
+                 ("SPLIT_REVIEWS", "COUNT_IF(CHUNK_TYPE = 'chunked_review')")),
+                table_version(full_chunk_table)
+            )
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric("Total Chunks", len(chunks_df))
+                st.metric("Total Chunks", f"{totals['TOTAL']:,}")
             with col2:
-                full_count = len(chunks_df[chunks_df['CHUNK_TYPE'] == 'full_review'])
-                st.metric("Full Reviews", full_count)
+                st.metric("Full Reviews", f"{totals['FULL_REVIEWS']:,}")
             with col3:
-                split_count = len(chunks_df[chunks_df['CHUNK_TYPE'] == 'chunked_review'])
-                st.metric("Split Reviews", split_count)
+                st.metric("Split Reviews", f"{totals['SPLIT_REVIEWS']:,}")
             
-            # Display table
-            st.dataframe(
-                chunks_df[['CHUNK_ID', 'FILE_NAME', 'CHUNK_SIZE', 'CHUNK_TYPE', 'TEXT_PREVIEW']],
-                use_container_width=True
+            # Display one page of chunks (sorted and paginated in Snowflake)
+            chunks_df = table_browser(
+                session, full_chunk_table,
+                columns=['CHUNK_ID', 'FILE_NAME', 'CHUNK_SIZE', 'CHUNK_TYPE', 'LEFT(CHUNK_TEXT, 100) AS TEXT_PREVIEW'],
+                sort_columns=['CHUNK_ID', 'FILE_NAME', 'CHUNK_SIZE', 'CREATED_TIMESTAMP'],
+                key="day17_chunks",
+                key_column="CHUNK_ID"
             )
             
-            # Option to view full text of a chunk
-            with st.expander(":material/menu_book: View Full Chunk Text"):
-                chunk_id = st.selectbox(
-                    "Select Chunk ID:",
-                    options=chunks_df['CHUNK_ID'].tolist(),
-                    format_func=lambda x: f"Chunk #{x} - {chunks_df[chunks_df['CHUNK_ID']==x]['FILE_NAME'].values[0]}",
-                    key="chunk_text_selector"
-                )
-                
-                if st.button("Load Chunk Text", key="load_chunk_text_btn"):
-                    # Store selection in session state
-                    st.session_state.selected_chunk_id = chunk_id
-                    st.session_state.load_chunk_text = True
-                    st.rerun()
-                
-                # Display chunk text if loaded
-                if st.session_state.get('load_chunk_text') and st.session_state.get('selected_chunk_id'):
-                    text_sql = f"SELECT CHUNK_TEXT, FILE_NAME FROM {full_chunk_table} WHERE CHUNK_ID = {st.session_state.selected_chunk_id}"
-                    text_result = session.sql(text_sql).to_pandas()
-                    if len(text_result) > 0:
-                        chunk = text_result.iloc[0]
-                        st.text_area(
-                            chunk['FILE_NAME'],
-                            value=chunk['CHUNK_TEXT'],
-                            height=300,
-                            key=f"chunk_text_display_{st.session_state.selected_chunk_id}"
-                        )
+            # Option to view full text of a chunk on the current page
+            if chunks_df is not None and len(chunks_df) > 0:
+                with st.expander(":material/menu_book: View Full Chunk Text"):
+                    # Build the labels once (a per-option DataFrame scan is O(n²))
+                    chunk_labels = dict(zip(chunks_df['CHUNK_ID'].tolist(), chunks_df['FILE_NAME'].tolist()))
+                    chunk_id = st.selectbox(
+                        "Select Chunk ID:",
+                        options=list(chunk_labels),
+                        format_func=lambda x: f"Chunk #{x} - {chunk_labels[x]}",
+                        key="chunk_text_selector"
+                    )
+                    
+                    if st.button("Load Chunk Text", key="load_chunk_text_btn"):
+                        # Store selection in session state
+                        st.session_state.selected_chunk_id = chunk_id
+                        st.session_state.load_chunk_text = True
+                        st.rerun()
+                    
+                    # Display chunk text if loaded
+                    if st.session_state.get('load_chunk_text') and st.session_state.get('selected_chunk_id'):
+                        chunk = fetch_row(session, full_chunk_table, ("CHUNK_TEXT", "FILE_NAME"), "CHUNK_ID",
+                                          st.session_state.selected_chunk_id, table_version(full_chunk_table))
+                        if chunk is not None:
+                            st.text_area(
+                                chunk['FILE_NAME'],
+                                value=chunk['CHUNK_TEXT'],
+                                height=300,
+                                key=f"chunk_text_display_{st.session_state.selected_chunk_id}"
+                            )
         else:
             st.info(":material/inbox: No chunks found in table.")
     else:
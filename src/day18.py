@@ -2,6 +2,15 @@ import streamlit as st
 from snowflake.cortex import embed_text_768
 import pandas as pd
 import numpy as np
+from chunking import text_hash
+from concurrent_runner import worker_pool
+from embedding_cache import EMBEDDING_CACHE_TABLE, EmbeddingCache
+from embedding_client import ConcurrentEmbedder
+from embeddings import (EMBEDDING_DIMENSIONS, EMBEDDING_MODEL, EmbeddingMatrix, embed_in_warehouse,
+                        ensure_embedding_table, write_embeddings)
+from table_browser import fetch_row, table_browser
+from table_meta import invalidate_table, table_row_count, table_version
+from vector_store import VectorStore, store_path, sync_vector_store
 
 st.title(":material/calculate: Embeddings Generator for Customer Reviews")
 st.write("Generate embeddings for review chunks from Day 17 to enable semantic search.")
@@ -155,42 +164,153 @@ if 'chunks_data' in st.session_state:
         - Group similar feedback together semantically
         """)
         
+        # Generation mode
+        generation_mode = st.radio(
+            "Generation Mode",
+            ["In Snowflake (set-based)", "In this app (one call per chunk)"],
+            horizontal=True,
+            help="Set-based mode embeds chunks with INSERT ... SELECT EMBED_TEXT_768 inside Snowflake "
+                 "and writes them straight to the embeddings table; no vectors pass through the app."
+        )
+        set_based = generation_mode.startswith("In Snowflake")
+        
         # Batch size selection
-        batch_size = st.selectbox("Batch Size", [10, 25, 50, 100], index=1,
-                                  help="Number of chunks to process at once")
+        if set_based:
+            batch_size = st.selectbox("Batch Size", [1000, 5000, 10000, 50000], index=1,
+                                      help="Number of chunks embedded per INSERT ... SELECT statement")
+            
+            full_chunk_table = f"{st.session_state.day18_database}.{st.session_state.day18_schema}.{st.session_state.day18_chunk_table}"
+            full_embedding_table = f"{st.session_state.day18_database}.{st.session_state.day18_schema}.{st.session_state.day18_embedding_table}"
+            st.caption(f":material/arrow_forward: `{full_chunk_table}` → `{full_embedding_table}`")
+            
+            setbased_replace = st.checkbox(
+                ":material/sync: Re-embed all chunks (replace table)",
+                help="Otherwise only chunks without an embedding are embedded",
+                key="day18_setbased_replace"
+            )
+        else:
+            # Concurrent calls each need a Snowpark session of their own
+            pool = worker_pool(session)
+            if pool.max_size > 1:
+                max_in_flight = st.select_slider(
+                    "Concurrent Requests", [1, 2, 4, 8, 16, 32], value=8,
+                    help="Upper bound on embedding calls in flight, each on its own Snowpark session. "
+                         "Concurrency adapts below it (halved on throttling, raised again as calls succeed)."
+                )
+            else:
+                max_in_flight = 1
+                st.caption(":material/info: Only this page's Snowpark session is available here, "
+                           "so chunks are embedded one call at a time.")
+        
+        # Content-addressed cache: unchanged chunk text is never embedded twice
+        use_cache = st.checkbox(
+            ":material/cached: Use embedding cache",
+            value=True,
+            help=f"Reuse embeddings of identical (whitespace-normalized) text from `{EMBEDDING_CACHE_TABLE}`. "
+                 "The model is part of the cache key, so switching models re-embeds automatically."
+        )
+        full_cache_table = f"{st.session_state.day18_database}.{st.session_state.day18_schema}.{EMBEDDING_CACHE_TABLE}"
 
         if st.button(":material/calculate: Generate Embeddings", type="primary", use_container_width=True):
-            try:
-                with st.status("Generating embeddings...", expanded=True) as status:
-                    embeddings = []
-                    total_chunks = len(df)
-                    progress_bar = st.progress(0)
-                    
-                    for i in range(0, total_chunks, batch_size):
-                        batch_end = min(i + batch_size, total_chunks)
-                        st.write(f"Processing chunks {i+1} to {batch_end} of {total_chunks}...")
+            if set_based:
+                try:
+                    with st.status("Generating embeddings in Snowflake...", expanded=True) as status:
+                        progress_bar = st.progress(0)
                         
-                        for idx, row in df.iloc[i:batch_end].iterrows():
-                            # Generate embedding using the correct function signature
-                            emb = embed_text_768(model='snowflake-arctic-embed-m', text=row['CHUNK_TEXT'])
-                            embeddings.append({
-                                'chunk_id': row['CHUNK_ID'],
-                                'embedding': emb
-                            })
+                        def show_progress(done, total):
+                            progress_bar.progress(done / total if total else 1.0)
+                            status.update(label=f"Embedded {done:,} of {total:,} chunks...")
                         
-                        # Update progress
-                        progress = batch_end / total_chunks
-                        progress_bar.progress(progress)
+                        result = embed_in_warehouse(
+                            session, full_chunk_table, full_embedding_table,
+                            batch_size=batch_size,
+                            replace=setbased_replace,
+                            progress=show_progress,
+                            cache_table=full_cache_table if use_cache else None
+                        )
+                        
+                        status.update(label="Embeddings generated!", state="complete", expanded=False)
+                        invalidate_table(full_embedding_table)
                     
-                    status.update(label="Embeddings generated!", state="complete", expanded=False)
+                    st.success(f":material/check_circle: Embedded {result['inserted']:,} chunk(s) into `{full_embedding_table}`")
+                    if result['deleted']:
+                        st.caption(f":material/delete: Removed {result['deleted']:,} embedding(s) of chunks that were removed or changed")
+                    if use_cache:
+                        st.session_state.day18_cache_stats = {
+                            'chunks': result['inserted'],
+                            'calls': result['calls'],
+                            'calls_saved': result['calls_saved'],
+                            'hit_rate': result['calls_saved'] / result['inserted'] if result['inserted'] else 0.0,
+                        }
                     
-                    # Store in session state
-                    st.session_state.embeddings_data = embeddings
-            
-                    st.success(f":material/check_circle: Generated {len(embeddings)} embeddings for {len(df)} review chunks!")
+                    # Store for Day 19
+                    st.session_state.embeddings_table = full_embedding_table
+                    st.session_state.embeddings_database = st.session_state.day18_database
+                    st.session_state.embeddings_schema = st.session_state.day18_schema
                     
-            except Exception as e:
-                st.error(f"Error generating embeddings: {str(e)}")
+                except Exception as e:
+                    st.error(f"Error generating embeddings: {str(e)}")
+            else:
+                try:
+                    with st.status("Generating embeddings...", expanded=True) as status:
+                        total_chunks = len(df)
+                        progress_bar = st.progress(0)
+                        embedder = ConcurrentEmbedder(
+                            lambda worker_session, text: embed_text_768(model=EMBEDDING_MODEL, text=text,
+                                                                        session=worker_session),
+                            max_in_flight=max_in_flight,
+                            pool=pool
+                        )
+                        
+                        def show_progress(done, total, chunks_per_sec):
+                            progress_bar.progress(done / total)
+                            status.update(label=f"Embedded {done:,} of {total:,} chunks ({chunks_per_sec:,.1f}/sec, "
+                                                f"{int(embedder.limit)} in flight)...")
+                        
+                        if use_cache:
+                            # Keep one cache (and its in-memory mirror) per table and model across reruns
+                            cache = st.session_state.get('day18_embedding_cache')
+                            if cache is None or cache.full_cache_table != full_cache_table or cache.model != EMBEDDING_MODEL:
+                                cache = EmbeddingCache(session, full_cache_table, model=EMBEDDING_MODEL)
+                                st.session_state.day18_embedding_cache = cache
+                            
+                            # Only cache misses are sent to the embedder
+                            vectors, st.session_state.day18_cache_stats = cache.embed(
+                                df['CHUNK_TEXT'].tolist(), embedder.embed, progress=show_progress
+                            )
+                            progress_bar.progress(1.0)
+                        else:
+                            # Write each vector straight into one preallocated float32 matrix
+                            vectors = np.empty((total_chunks, EMBEDDING_DIMENSIONS), dtype=np.float32)
+                            for j, emb in enumerate(embedder.embed(df['CHUNK_TEXT'].tolist(), progress=show_progress)):
+                                vectors[j] = emb
+                        
+                        status.update(label="Embeddings generated!", state="complete", expanded=False)
+                        if embedder.stats.get('seconds'):
+                            st.caption(f":material/speed: {embedder.stats['chunks_per_sec']:,.1f} chunks/sec · "
+                                       f"{embedder.stats['throttled']:,} throttled call(s) retried")
+                        
+                        # Store in session state as ids + one contiguous float32 matrix, plus the
+                        # hash of each embedded text so later incremental runs can spot stale rows
+                        embeddings = EmbeddingMatrix(df['CHUNK_ID'].to_numpy(), vectors,
+                                                     [text_hash(text) for text in df['CHUNK_TEXT'].tolist()])
+                        st.session_state.embeddings_data = embeddings
+                
+                        st.success(f":material/check_circle: Generated {len(embeddings)} embeddings for {len(df)} review chunks!")
+                        
+                except Exception as e:
+                    st.error(f"Error generating embeddings: {str(e)}")
+    
+        # Cache report for the last run
+        if use_cache and 'day18_cache_stats' in st.session_state:
+            cache_stats = st.session_state.day18_cache_stats
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Cache Hit Rate", f"{cache_stats['hit_rate']:.0%}")
+            with col2:
+                st.metric("Model Calls", f"{cache_stats['calls']:,}")
+            with col3:
+                st.metric("Calls Saved", f"{cache_stats['calls_saved']:,}")
     
     # View embeddings
     if 'embeddings_data' in st.session_state:
@@ -205,11 +325,20 @@ if 'chunks_data' in st.session_state:
             with col2:
                 st.metric("Dimensions per Embedding", 768)
             
+            # Memory footprint of the float32 matrix vs Python lists of floats
+            memory = embeddings.memory_report()
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Memory (float32 matrix)", f"{memory['total_mb']:,.1f} MB")
+            with col2:
+                st.metric("As Python lists", f"{memory['python_lists_mb']:,.1f} MB",
+                          help="Estimated size of the same embeddings as lists of Python floats")
+            
             # Show sample embedding
             with st.expander(":material/search: View Sample Embedding"):
-                sample_emb = embeddings[0]['embedding']
+                sample_emb = embeddings.matrix[0]
                 st.write("**First 10 values:**")
-                st.write(sample_emb[:10])
+                st.write(sample_emb[:10].tolist())
         
         # Save embeddings to Snowflake
         with st.container(border=True):
@@ -230,24 +359,17 @@ if 'chunks_data' in st.session_state:
             full_embedding_table = f"{st.session_state.day18_database}.{st.session_state.day18_schema}.{st.session_state.day18_embedding_table}"
             st.code(full_embedding_table, language="sql")
                 
-            # Check if embeddings table exists and show status
-            try:
-                check_query = f"""
-                SELECT COUNT(*) as count 
-                FROM {full_embedding_table}
-                """
-                result = session.sql(check_query).collect()
-                current_count = result[0]['COUNT']
-                
-                if current_count > 0:
-                    st.warning(f":material/warning: **{current_count:,} embedding(s)** currently in table `{full_embedding_table}`")
-                    embedding_table_exists = True
-                else:
-                    st.info(":material/inbox: **Embedding table is empty** - No embeddings saved yet.")
-                    embedding_table_exists = False
-            except:
+            # Check if embeddings table exists and show status (cached metadata, no warehouse probe)
+            current_count = table_row_count(session, full_embedding_table)
+            if current_count is None:
                 st.info(":material/inbox: **Embedding table doesn't exist yet** - Will be created when you save embeddings.")
                 embedding_table_exists = False
+            elif current_count > 0:
+                st.warning(f":material/warning: **{current_count:,} embedding(s)** currently in table `{full_embedding_table}`")
+                embedding_table_exists = True
+            else:
+                st.info(":material/inbox: **Embedding table is empty** - No embeddings saved yet.")
+                embedding_table_exists = False
             
             # Initialize or update checkbox state based on table status
             if 'day18_replace_mode' not in st.session_state:
@@ -275,52 +397,33 @@ if 'chunks_data' in st.session_state:
                         # Step 1: Create or truncate embeddings table
                         st.write(":material/looks_one: Preparing table...")
                         
+                        ensure_embedding_table(session, full_embedding_table, replace=replace_mode)
                         if replace_mode:
-                            # Replace existing data
-                            create_table_sql = f"""
-                            CREATE OR REPLACE TABLE {full_embedding_table} (
-                                CHUNK_ID NUMBER,
-                                EMBEDDING VECTOR(FLOAT, 768),
-                                CREATED_TIMESTAMP TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()
-                            )
-                            """
-                            session.sql(create_table_sql).collect()
                             st.write(":material/check_circle: Replaced existing table")
                         else:
-                            # Create if doesn't exist
-                            create_table_sql = f"""
-                            CREATE TABLE IF NOT EXISTS {full_embedding_table} (
-                                CHUNK_ID NUMBER,
-                                EMBEDDING VECTOR(FLOAT, 768),
-                                CREATED_TIMESTAMP TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()
-                            )
-                            """
-                            session.sql(create_table_sql).collect()
                             st.write(":material/check_circle: Table ready")
                         
-                        # Step 2: Insert embeddings
+                        # Step 2: Bulk-load embeddings
                         st.write(f":material/looks_two: Inserting {len(embeddings)} embeddings...")
                         
-                        for i, emb_data in enumerate(embeddings):
-                            # Get embedding list
-                            if isinstance(emb_data['embedding'], list):
-                                emb_list = emb_data['embedding']
-                            else:
-                                emb_list = list(emb_data['embedding'])
-                            
-                            # Convert to proper array format for Snowflake
-                            emb_array = "[" + ",".join([str(float(x)) for x in emb_list]) + "]"
-                            
-                            insert_sql = f"""
-                            INSERT INTO {full_embedding_table} (CHUNK_ID, EMBEDDING)
-                            SELECT {emb_data['chunk_id']}, {emb_array}::VECTOR(FLOAT, 768)
-                            """
-                            session.sql(insert_sql).collect()
-                            
-                            if (i + 1) % 10 == 0:
-                                st.write(f"Saved {i + 1} of {len(embeddings)} embeddings...")
+                        def show_progress(done, total, seconds):
+                            st.write(f"Saved {done:,} of {total:,} embeddings ({done / max(seconds, 1e-9):,.0f}/sec)...")
+                        
+                        load_stats = write_embeddings(
+                            session,
+                            embeddings.chunk_ids,
+                            embeddings.matrix,
+                            st.session_state.day18_database,
+                            st.session_state.day18_schema,
+                            st.session_state.day18_embedding_table,
+                            progress=show_progress,
+                            text_hashes=embeddings.text_hashes
+                        )
+                        st.write(f":material/check_circle: Loaded {load_stats['payload_mb']:,.1f} MB of vectors "
+                                 f"in {load_stats['seconds']:.1f}s ({load_stats['rows_per_sec']:,.0f} rows/sec)")
                         
                         status.update(label="Embeddings saved!", state="complete", expanded=False)
+                        invalidate_table(full_embedding_table)
                     
                     mode_msg = "replaced in" if replace_mode else "saved to"
                     st.success(f":material/check_circle: Successfully {mode_msg} `{full_embedding_table}`\n\n:material/calculate: {len(embeddings)} embedding(s) now in table")
@@ -342,97 +445,98 @@ with st.container(border=True):
     # Check if embeddings table exists and show record count
     full_embedding_table = f"{st.session_state.day18_database}.{st.session_state.day18_schema}.{st.session_state.day18_embedding_table}"
     
-    try:
-        count_result = session.sql(f"""
-            SELECT COUNT(*) as CNT FROM {full_embedding_table}
-        """).collect()
-        
-        if count_result:
-            record_count = count_result[0]['CNT']
-            if record_count > 0:
-                st.warning(f":material/warning: **{record_count:,} embedding(s)** currently in table `{full_embedding_table}`")
-            else:
-                st.info(":material/inbox: **Embedding table is empty** - Generate and save embeddings above.")
-    except:
+    record_count = table_row_count(session, full_embedding_table)
+    if record_count is None:
         st.info(":material/inbox: **Embedding table doesn't exist yet** - Generate and save embeddings to create it.")
+    elif record_count > 0:
+        st.warning(f":material/warning: **{record_count:,} embedding(s)** currently in table `{full_embedding_table}`")
+    else:
+        st.info(":material/inbox: **Embedding table is empty** - Generate and save embeddings above.")
+    
+    # Local memory-mapped copy of the table, e.g. for the Day 20 local index
+    with st.expander(":material/hard_drive: Local Embedding Store"):
+        store = VectorStore(store_path(full_embedding_table))
+        store_stats = store.stats()
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Stored Vectors", f"{store_stats['rows']:,}")
+        with col2:
+            st.metric("Deleted (uncompacted)", f"{store_stats['deleted']:,}")
+        with col3:
+            st.metric("On Disk", f"{store_stats['size_mb']:,.1f} MB")
+        st.caption(f":material/folder: `{store.path}` · synced up to {store_stats['watermark'] or 'never'}")
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            if st.button(":material/sync: Sync New Rows", use_container_width=True, disabled=not record_count):
+                try:
+                    with st.spinner("Syncing local store..."):
+                        _, appended = sync_vector_store(session, full_embedding_table, store)
+                    st.success(f":material/check_circle: Appended {appended:,} vector(s)")
+                except Exception as e:
+                    st.error(f"Error syncing store: {str(e)}")
+        with col2:
+            if st.button(":material/verified: Verify Checksums", use_container_width=True):
+                try:
+                    store.verify()
+                    st.success(":material/check_circle: Checksums OK")
+                except ValueError as e:
+                    st.error(str(e))
+        with col3:
+            if st.button(":material/compress: Compact", use_container_width=True, disabled=not store_stats['deleted']):
+                reclaimed = store.compact()
+                st.success(f":material/check_circle: Reclaimed {reclaimed:,} deleted row(s)")
     
     query_button = st.button(":material/analytics: Query Embedding Table", type="secondary", use_container_width=True)
     
     if query_button:
-        try:
-            query = f"""
-            SELECT 
-                CHUNK_ID,
-                EMBEDDING,
-                CREATED_TIMESTAMP,
-                VECTOR_L2_DISTANCE(EMBEDDING, EMBEDDING) as SELF_DISTANCE
-            FROM {full_embedding_table}
-            ORDER BY CHUNK_ID
-            """
-            result_df = session.sql(query).to_pandas()
-            
-            # Store in session state
-            st.session_state.queried_embeddings = result_df
-            st.session_state.queried_embeddings_table = full_embedding_table
-            st.rerun()
-            
-        except Exception as e:
-            st.error(f"Error querying embeddings: {str(e)}")
+        # Only remember which table to browse; pages are fetched on demand below
+        st.session_state.queried_embeddings_table = full_embedding_table
+        st.rerun()
     
     # Display results if available in session state
-    if 'queried_embeddings' in st.session_state and st.session_state.get('queried_embeddings_table') == full_embedding_table:
-        emb_df = st.session_state.queried_embeddings
-        
-        if len(emb_df) > 0:
+    if st.session_state.get('queried_embeddings_table') == full_embedding_table:
+        if record_count:
             st.code(full_embedding_table, language="sql")
             
             # Summary metrics
             col1, col2 = st.columns(2)
             with col1:
-                st.metric("Total Embeddings", len(emb_df))
+                st.metric("Total Embeddings", f"{record_count:,}")
             with col2:
                 st.metric("Dimensions", "768")
             
-            # Display table without the EMBEDDING column for readability
-            # Check which columns exist (case-insensitive)
-            embedding_col = None
-            for col in emb_df.columns:
-                if col.upper() == 'EMBEDDING':
-                    embedding_col = col
-                    break
-            
-            if embedding_col:
-                display_df = emb_df.drop(columns=[embedding_col])
-            else:
-                display_df = emb_df
-            
-            st.dataframe(display_df, use_container_width=True)
+            # Display one page without the EMBEDDING column; the self-distance
+            # check is computed in Snowflake for the page rows only
+            emb_df = table_browser(
+                session, full_embedding_table,
+                columns=['CHUNK_ID', 'CREATED_TIMESTAMP',
+                         'VECTOR_L2_DISTANCE(EMBEDDING, EMBEDDING) AS SELF_DISTANCE'],
+                sort_columns=['CHUNK_ID', 'CREATED_TIMESTAMP'],
+                key="day18_embeddings",
+                key_column="CHUNK_ID"
+            )
             
             st.info(":material/lightbulb: Self-distance should be 0, confirming embeddings are stored correctly")
             
-            # View individual embedding vectors (only if EMBEDDING column exists)
-            if embedding_col:
+            # View individual embedding vectors (loaded one at a time)
+            if emb_df is not None and len(emb_df) > 0:
                 with st.expander(":material/search: View Individual Embedding Vectors"):
                     st.write("Select a CHUNK_ID to view its full 768-dimensional embedding vector:")
                     
-                    # Find CHUNK_ID column (case-insensitive)
-                    chunk_id_col = None
-                    for col in emb_df.columns:
-                        if col.upper() == 'CHUNK_ID':
-                            chunk_id_col = col
-                            break
-                    
-                    chunk_ids = emb_df[chunk_id_col].tolist()
+                    chunk_ids = emb_df['CHUNK_ID'].tolist()
                     selected_chunk = st.selectbox("Select CHUNK_ID", chunk_ids, key="view_embedding_chunk")
                     
                     if st.button(":material/analytics: Load Embedding Vector", key="load_embedding_btn"):
-                        # Get the embedding for selected chunk
-                        selected_emb = emb_df[emb_df[chunk_id_col] == selected_chunk][embedding_col].iloc[0]
+                        # Get the embedding for the selected chunk only
+                        row = fetch_row(session, full_embedding_table, ("EMBEDDING",), "CHUNK_ID",
+                                        selected_chunk, table_version(full_embedding_table))
                         
-                        # Store in session state
-                        st.session_state.loaded_embedding = selected_emb
-                        st.session_state.loaded_embedding_chunk = selected_chunk
-                        st.rerun()
+                        if row is not None:
+                            # Store in session state
+                            st.session_state.loaded_embedding = row['EMBEDDING']
+                            st.session_state.loaded_embedding_chunk = selected_chunk
+                            st.rerun()
                     
                     # Display loaded embedding
                     if 'loaded_embedding' in st.session_state:
@@ -1,6 +1,8 @@
 import streamlit as st
 from snowflake.core import Root
 import pandas as pd
+import time
+from search_services import next_poll_delay, refresh_services, service_status
 
 st.title(":material/search: Cortex Search for Customer Reviews")
 st.write("Create a semantic search service for the customer reviews processed in Days 16-18.")
@@ -141,7 +143,7 @@ AS (
                 """
                 session.sql(create_service_sql).collect()
 
-                st.write(":material/looks_two: Waiting for indexing to complete...")
+                st.write(":material/looks_two: Indexing started - progress is tracked below")
                 st.caption("This may take a few minutes for 100 reviews...")
                 
                 status.update(label=":material/check_circle: Search service created!", state="complete", expanded=False)
@@ -149,12 +151,67 @@ AS (
             st.success(f":material/check_circle: Created: `{st.session_state.day19_database}.{st.session_state.day19_schema}.CUSTOMER_REVIEW_SEARCH`")
             st.session_state.search_service = f"{st.session_state.day19_database}.{st.session_state.day19_schema}.CUSTOMER_REVIEW_SEARCH"
             
-            st.balloons()
+            # Start watching the first indexing run
+            st.session_state.day19_index_watch = {
+                'service': st.session_state.search_service,
+                'started': time.time(),
+                'next_poll': 0.0,
+                'delay': 2.0,
+                'status': None,
+            }
+            refresh_services()
             
         except Exception as e:
             st.error(f"Error creating search service: {str(e)}")
             st.info(":material/lightbulb: Make sure:\n- Warehouse name is correct\n- You have CREATE CORTEX SEARCH SERVICE privileges\n- Review chunks exist in the table")
 
+# Indexing status: polled in a fragment, so the rest of the page stays usable
+@st.fragment(run_every=2)
+def index_status_watcher():
+    watch = st.session_state.get('day19_index_watch')
+    if not watch:
+        return
+    
+    now = time.time()
+    if watch['status'] is None or (not watch['status']['ready'] and now >= watch['next_poll']):
+        try:
+            watch['status'] = service_status(session, watch['service'])
+        except Exception as e:
+            watch['status'] = {'exists': False, 'ready': False, 'error': str(e)}
+        # Poll less often the longer indexing takes
+        watch['next_poll'] = now + watch['delay']
+        watch['delay'] = next_poll_delay(watch['delay'])
+    status = watch['status']
+    
+    with st.container(border=True):
+        st.subheader(":material/monitoring: Indexing Status")
+        st.caption(f"`{watch['service']}` · {now - watch['started']:.0f}s since creation")
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Indexing", status.get('indexing_state') or "-")
+        with col2:
+            st.metric("Serving", status.get('serving_state') or "-")
+        with col3:
+            rows = status.get('source_rows')
+            st.metric("Source Rows", f"{int(rows):,}" if rows is not None else "-")
+        
+        if status['ready']:
+            st.success(f":material/check_circle: Ready to query (data as of {status['data_timestamp']}) - continue to Day 20!")
+            if not watch.get('celebrated'):
+                watch['celebrated'] = True
+                # Days 20-22 should see the new index, not cached pre-indexing state
+                refresh_services()
+                st.balloons()
+        elif status['error']:
+            st.error(f"Indexing error: {status['error']}")
+        elif not status['exists']:
+            st.info(":material/hourglass_empty: Waiting for the service to appear...")
+        else:
+            st.info(f":material/hourglass_top: Indexing... next check in {max(0, watch['next_poll'] - now):.0f}s")
+
+index_status_watcher()
+
 # Step 3: Verify Search Service
 with st.container(border=True):
     st.subheader("Step 3: Verify Your Search Service")
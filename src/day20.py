@@ -1,5 +1,13 @@
+import json
 import streamlit as st
-from snowflake.core import Root
+from ann_index import index_path, open_index, search_chunks
+from concurrent_runner import session_lock
+from hybrid_search import bm25_path, open_hybrid_search, tokenize
+from live_search import LiveSearcher
+from quantization import open_quantized_index
+from search_services import (cached_search, filter_controls, get_service, list_services, refresh_services,
+                             result_cache, service_filter_table, service_version)
+from vector_store import VectorStore, store_path
 
 st.title(":material/search: Querying Cortex Search")
 st.write("Search and retrieve relevant text chunks using Cortex Search Service.")
@@ -14,20 +22,130 @@ except:
     from snowflake.snowpark import Session
     session = Session.builder.configs(st.secrets["connections"]["snowflake"]).create()
 
+# The live-search worker shares this session, which is not documented as
+# thread-safe: the worker and this script use it only while holding this lock
+session_guard = session_lock(session)
+
+LIVE_DEBOUNCE_SECONDS = 0.4
+EXAMPLE_QUERIES = ["warm thermal gloves", "durability issues", "comfortable helmet",
+                   "waterproof jacket", "sizing runs small", "fast shipping"]
+
+# Only the fields each result card shows are requested
+RESULT_COLUMNS = ["CHUNK_TEXT", "FILE_NAME", "CHUNK_TYPE", "CHUNK_ID"]
+
+INDEX_TYPES = {
+    "IVF (float32)": None,
+    "Binary codes + re-rank": "binary",
+    "Int8 codes + re-rank": "int8",
+}
+
+def load_local_index(embedding_table, index_type):
+    """Open (build or refresh) the local index and remember it for later searches."""
+    store = VectorStore(store_path(embedding_table))
+    if INDEX_TYPES[index_type]:
+        index, added = open_quantized_index(session, embedding_table, INDEX_TYPES[index_type], store=store)
+    else:
+        index, added = open_index(session, embedding_table, store=store)
+    st.session_state.day20_local_index = ((embedding_table, index_type), index)
+    return index, added
+
+def load_hybrid_engine(chunk_table, embedding_table, index_type, refresh=False):
+    """Refresh the BM25 index over the chunks and pair it with the local vector index."""
+    local_index = st.session_state.get('day20_local_index')
+    if not refresh and local_index and local_index[0] == (embedding_table, index_type):
+        index, added = local_index[1], 0
+    else:
+        index, added = load_local_index(embedding_table, index_type)
+    engine, keyword_added = open_hybrid_search(session, chunk_table, index)
+    st.session_state.day20_hybrid = ((chunk_table, embedding_table, index_type), engine)
+    return engine, added, keyword_added
+
+def show_results(items):
+    st.success(f":material/check_circle: Found {len(items)} result(s)!")
+    
+    # Display results
+    for i, item in enumerate(items, 1):
+        with st.container(border=True):
+            col1, col2, col3 = st.columns([2, 1, 1])
+            with col1:
+                st.markdown(f"**Result {i}** - {item.get('FILE_NAME', 'N/A')}")
+            with col2:
+                st.caption(f"Type: {item.get('CHUNK_TYPE', 'N/A')}")
+            with col3:
+                st.caption(f"Chunk: {item.get('CHUNK_ID', 'N/A')}")
+            
+            st.write(item.get("CHUNK_TEXT", "No text found"))
+            
+            # Show relevance score if available
+            if hasattr(item, 'score') or 'score' in item:
+                score = item.get('score', item.score if hasattr(item, 'score') else None)
+                if score is not None:
+                    st.caption(f"Relevance Score: {score:.4f}")
+
+def suggest_queries(query, limit=3):
+    """Example and earlier queries that share a word (or word prefix) with `query`."""
+    words = set(tokenize(query))
+    candidates = list(dict.fromkeys(st.session_state.get('day20_query_history', []) + EXAMPLE_QUERIES))
+    scored = []
+    for candidate in candidates:
+        if candidate.lower() == query.strip().lower():
+            continue
+        overlap = sum(any(w.startswith(q) or q.startswith(w) for w in tokenize(candidate)) for q in words)
+        if overlap:
+            scored.append((-overlap, candidates.index(candidate), candidate))
+    return [candidate for _, _, candidate in sorted(scored)[:limit]]
+
+def live_search_fn():
+    """Search function for the live-search worker, bound on the script thread to the current settings."""
+    if use_hybrid:
+        hybrid = st.session_state.get('day20_hybrid')
+        if hybrid and hybrid[0] == (chunk_table, embedding_table, index_type):
+            engine = hybrid[1]
+        else:
+            engine = load_hybrid_engine(chunk_table, embedding_table, index_type)[0]
+        return lambda q: engine.search(session, q, columns=RESULT_COLUMNS, limit=num_results,
+                                       filter=search_filter)[0]
+    if use_local_index:
+        local_index = st.session_state.get('day20_local_index')
+        if local_index and local_index[0] == (embedding_table, index_type):
+            index = local_index[1]
+        else:
+            index = load_local_index(embedding_table, index_type)[0]
+        return lambda q: search_chunks(session, index, chunk_table, q, k=num_results,
+                                       columns=RESULT_COLUMNS, filter=search_filter)[0]
+    svc, version, cache = get_service(session, search_service), service_version(session, search_service), result_cache()
+    return lambda q: cache.search(svc, search_service, q, RESULT_COLUMNS, num_results,
+                                  filter=search_filter, version=version)
+
+@st.fragment(run_every=0.5)
+def live_results():
+    searcher = st.session_state.get('day20_live', (None, None))[1]
+    latest = searcher.latest() if searcher else None
+    if searcher and searcher.pending():
+        st.caption(":material/hourglass_top: Searching...")
+    if latest is None:
+        if not (searcher and searcher.pending()):
+            st.info(":material/keyboard: Type a query above - results appear as soon as you pause.")
+        return
+    latest_query, _, items, error, ms = latest
+    if error:
+        st.error(f"Error: {error}")
+        return
+    stats = searcher.stats
+    st.caption(f":material/bolt: `{latest_query}` · {ms:.0f} ms · {stats['searched']} search(es), "
+               f"{stats['prefetched']} prefetched, {stats['served_prefetched']} served from prefetch, "
+               f"{stats['dropped']} stale dropped")
+    show_results(items)
+
 # Input Container
-with st.container(border=True):
+with st.container(border=True), session_guard:
     st.subheader(":material/search: Search Configuration and Query")
     
     # Default search service from Day 19
     default_service = 'RAG_DB.RAG_SCHEMA.CUSTOMER_REVIEW_SEARCH'
     
-    # Try to get available services
-    try:
-        services_result = session.sql("SHOW CORTEX SEARCH SERVICES").collect()
-        available_services = [f"{row['database_name']}.{row['schema_name']}.{row['name']}" 
-                            for row in services_result] if services_result else []
-    except:
-        available_services = []
+    # Available services (listed once per TTL, not on every rerun)
+    available_services = list_services(session)
     
     # Ensure default service is always first
     if default_service in available_services:
@@ -69,64 +187,185 @@ with st.container(border=True):
     st.code(search_service, language="sql")
     st.caption(":material/lightbulb: This should point to your CUSTOMER_REVIEW_SEARCH service from Day 19")
 
+    if st.button(":material/refresh: Refresh Services", use_container_width=True,
+                 help="Re-list Cortex Search services (e.g. after creating one in Day 19)"):
+        refresh_services()
+        st.rerun()
+
+    st.divider()
+
+    # Search engine: the Cortex Search service, or an in-process index over the Day 18 embeddings
+    search_engine = st.radio(
+        "Search Engine:",
+        ["Cortex Search service", "Local vector index", "Local hybrid (BM25 + vector)"],
+        horizontal=True,
+        help="The local index searches REVIEW_EMBEDDINGS in this app (IVF, cosine similarity); "
+             "only the query embedding and the hit texts need a round trip. Hybrid also ranks the "
+             "chunk text by keywords (BM25) and fuses both rankings (reciprocal rank fusion)."
+    )
+    use_hybrid = search_engine == "Local hybrid (BM25 + vector)"
+    use_local_index = search_engine == "Local vector index" or use_hybrid
+    
+    if use_local_index:
+        col1, col2 = st.columns(2)
+        with col1:
+            embedding_table = st.text_input(
+                "Embeddings Table:",
+                value=st.session_state.get('embeddings_table', 'RAG_DB.RAG_SCHEMA.REVIEW_EMBEDDINGS')
+            )
+        with col2:
+            chunk_table = st.text_input(
+                "Chunks Table:",
+                value=embedding_table.rsplit(".", 1)[0] + ".REVIEW_CHUNKS"
+            )
+        
+        index_type = st.selectbox(
+            "Index Type:",
+            list(INDEX_TYPES),
+            help="Quantized codes use 4x (int8) or 32x (binary) less memory; the top candidates "
+                 "are re-ranked with the exact float32 vectors from the local store."
+        )
+        
+        # The index is loaded (or built) lazily, on the first search or refresh
+        local_index = st.session_state.get('day20_local_index')
+        if local_index and local_index[0] == (embedding_table, index_type):
+            if INDEX_TYPES[index_type]:
+                st.caption(f":material/database: {len(local_index[1]):,} vectors · "
+                           f"{local_index[1].nbytes / 1_048_576:,.1f} MB of codes · `{store_path(embedding_table)}`")
+            else:
+                st.caption(f":material/database: {len(local_index[1]):,} vectors indexed · `{index_path(embedding_table)}`")
+        hybrid = st.session_state.get('day20_hybrid')
+        if use_hybrid and hybrid and hybrid[0] == (chunk_table, embedding_table, index_type):
+            st.caption(f":material/match_word: {len(hybrid[1].bm25):,} chunks, "
+                       f"{len(hybrid[1].bm25.postings):,} terms in the keyword index · `{bm25_path(chunk_table)}`")
+        
+        if st.button(":material/sync: Refresh Local Index", use_container_width=True):
+            try:
+                with st.spinner("Refreshing local index..."):
+                    if use_hybrid:
+                        engine, added, keyword_added = load_hybrid_engine(chunk_table, embedding_table,
+                                                                          index_type, refresh=True)
+                        index = engine.vector_index
+                    else:
+                        index, added = load_local_index(embedding_table, index_type)
+                st.success(f":material/check_circle: Added {added:,} new vector(s); {len(index):,} indexed")
+                if use_hybrid:
+                    st.success(f":material/check_circle: Added {keyword_added:,} chunk(s) to the keyword index")
+            except Exception as e:
+                st.error(f"Error refreshing index: {str(e)}")
+
     st.divider()
 
-    # Search query input
+    live_mode = st.toggle(
+        "Live search",
+        help="Search as you edit the query (on Enter or when the box loses focus) without clicking Search. "
+             "Edits are debounced in a background worker, so the service gets at most one request per "
+             f"{LIVE_DEBOUNCE_SECONDS}s, and suggested queries are prefetched."
+    )
+    
+    # Search query input (keyed, so a suggestion click can fill it in)
+    if 'day20_query' not in st.session_state:
+        st.session_state.day20_query = "warm thermal gloves"
     query = st.text_input(
         "Enter your search query:",
-        value="warm thermal gloves",
-        placeholder="e.g., durability issues, comfortable helmet"
+        placeholder="e.g., durability issues, comfortable helmet",
+        key="day20_query"
     )
+    
+    suggestions = suggest_queries(query)
+    if suggestions:
+        cols = st.columns(len(suggestions))
+        for col, suggestion in zip(cols, suggestions):
+            with col:
+                st.button(f":material/north_west: {suggestion}", key=f"day20_suggest_{suggestion}",
+                          on_click=lambda s=suggestion: st.session_state.update(day20_query=s),
+                          use_container_width=True)
 
     num_results = st.slider("Number of results:", 1, 20, 5)
     
-    search_clicked = st.button(":material/search: Search", type="primary", use_container_width=True)
+    # Attribute filters (FILE_NAME / CHUNK_TYPE are ATTRIBUTES of the Day 19 service)
+    filter_table = chunk_table if use_local_index else service_filter_table(session, search_service, key="day20_filter")
+    search_filter = filter_controls(session, filter_table, key="day20_filter")
+    
+    search_clicked = not live_mode and st.button(":material/search: Search", type="primary", use_container_width=True)
+    
+    if not live_mode and st.session_state.get('day20_live'):
+        # Live search switched off: stop the worker instead of leaving it idle
+        st.session_state.pop('day20_live')[1].stop()
+    
+    if live_mode and query and (search_service or use_local_index):
+        # One worker per settings combination; changing a setting replaces it. A worker
+        # stops itself once the page stops polling it (e.g. the user went to another page)
+        live_key = (search_engine, search_service, chunk_table if use_local_index else None,
+                    embedding_table if use_local_index else None, index_type if use_local_index else None,
+                    num_results, json.dumps(search_filter, sort_keys=True))
+        live = st.session_state.get('day20_live')
+        try:
+            if not live or live[0] != live_key or live[1].stopped:
+                if live:
+                    live[1].stop()
+                live = (live_key, LiveSearcher(live_search_fn(), debounce=LIVE_DEBOUNCE_SECONDS, lock=session_guard))
+                st.session_state.day20_live = live
+            live[1].submit(query, prefetch=suggestions)
+            history = st.session_state.setdefault('day20_query_history', [])
+            if query.strip() and query.strip() not in history:
+                history.insert(0, query.strip())
+                del history[20:]
+        except Exception as e:
+            st.error(f"Error starting live search: {str(e)}")
 
 # Output Container
-with st.container(border=True):
+with st.container(border=True), session_guard:
     st.subheader(":material/analytics: Search Results")
     
-    if search_clicked:
-        if query and search_service:
+    if live_mode:
+        live_results()
+    elif search_clicked:
+        if query and (search_service or use_local_index):
             try:
-                root = Root(session)
-                parts = search_service.split(".")
-                
-                if len(parts) != 3:
-                    st.error("Service path must be in format: database.schema.service_name")
+                if use_hybrid:
+                    with st.spinner("Searching local hybrid index..."):
+                        hybrid = st.session_state.get('day20_hybrid')
+                        if hybrid and hybrid[0] == (chunk_table, embedding_table, index_type):
+                            engine = hybrid[1]
+                        else:
+                            engine = load_hybrid_engine(chunk_table, embedding_table, index_type)[0]
+                        items, timings = engine.search(
+                            session, query,
+                            columns=RESULT_COLUMNS,
+                            limit=num_results,
+                            filter=search_filter
+                        )
+                    st.caption(f":material/timer: Embed query {timings['embed_ms']:.0f} ms · "
+                               f"keyword search {timings['keyword_ms']:.1f} ms · "
+                               f"vector search {timings['vector_ms']:.1f} ms · fetch text {timings['fetch_ms']:.0f} ms")
+                elif use_local_index:
+                    with st.spinner("Searching local index..."):
+                        local_index = st.session_state.get('day20_local_index')
+                        if local_index and local_index[0] == (embedding_table, index_type):
+                            index = local_index[1]
+                        else:
+                            index = load_local_index(embedding_table, index_type)[0]
+                        items, timings = search_chunks(session, index, chunk_table, query, k=num_results,
+                                                       columns=RESULT_COLUMNS, filter=search_filter)
+                    st.caption(f":material/timer: Embed query {timings['embed_ms']:.0f} ms · "
+                               f"index search {timings['search_ms']:.1f} ms · fetch text {timings['fetch_ms']:.0f} ms")
                 else:
-                    svc = (root
-                        .databases[parts[0]]
-                        .schemas[parts[1]]
-                        .cortex_search_services[parts[2]])
-                    
                     with st.spinner("Searching..."):
-                        results = svc.search(
-                            query=query,
-                            columns=["CHUNK_TEXT", "FILE_NAME", "CHUNK_TYPE", "CHUNK_ID"],
-                            limit=num_results
+                        hits_before = result_cache().stats()['hits']
+                        items = cached_search(
+                            session, search_service, query,
+                            columns=RESULT_COLUMNS,
+                            limit=num_results,
+                            filter=search_filter
                         )
-                    
-                    st.success(f":material/check_circle: Found {len(results.results)} result(s)!")
-                    
-                    # Display results
-                    for i, item in enumerate(results.results, 1):
-                        with st.container(border=True):
-                            col1, col2, col3 = st.columns([2, 1, 1])
-                            with col1:
-                                st.markdown(f"**Result {i}** - {item.get('FILE_NAME', 'N/A')}")
-                            with col2:
-                                st.caption(f"Type: {item.get('CHUNK_TYPE', 'N/A')}")
-                            with col3:
-                                st.caption(f"Chunk: {item.get('CHUNK_ID', 'N/A')}")
-                            
-                            st.write(item.get("CHUNK_TEXT", "No text found"))
-                            
-                            # Show relevance score if available
-                            if hasattr(item, 'score') or 'score' in item:
-                                score = item.get('score', item.score if hasattr(item, 'score') else None)
-                                if score is not None:
-                                    st.caption(f"Relevance Score: {score:.4f}")
+                    cache_stats = result_cache().stats()
+                    st.caption(f":material/cached: {'Served from' if cache_stats['hits'] > hits_before else 'Added to'} "
+                               f"result cache · {cache_stats['entries']:,} cached searches "
+                               f"({cache_stats['size_mb']:.1f} MB) · hit rate {cache_stats['hit_rate']:.0%}")
+                
+                if items is not None:
+                    show_results(items)
             
             except Exception as e:
                 st.error(f"Error: {str(e)}")
@@ -1,4 +1,8 @@
 import streamlit as st
+import time
+from llm_stream import stream_complete
+from search_services import (cached_search, filter_controls, list_services, local_hybrid_engine, refresh_services,
+                             service_filter_table)
 
 st.title(":material/link: RAG with Cortex Search")
 st.write("Combine search results with LLM generation for grounded answers.")
@@ -57,13 +61,8 @@ with st.sidebar:
     # Default search service from Day 19
     default_service = 'RAG_DB.RAG_SCHEMA.CUSTOMER_REVIEW_SEARCH'
     
-    # Try to get available services
-    try:
-        services_result = session.sql("SHOW CORTEX SEARCH SERVICES").collect()
-        available_services = [f"{row['database_name']}.{row['schema_name']}.{row['name']}" 
-                            for row in services_result] if services_result else []
-    except:
-        available_services = []
+    # Available services (listed once per TTL, not on every rerun)
+    available_services = list_services(session)
     
     # Ensure default service is always first
     if default_service in available_services:
@@ -102,6 +101,29 @@ with st.sidebar:
             help="Full path to your Cortex Search service"
         )
     
+    if st.button(":material/refresh: Refresh Services", use_container_width=True,
+                 help="Re-list Cortex Search services (e.g. after creating one in Day 19)"):
+        refresh_services()
+        st.rerun()
+    
+    # Retrieval engine: the Cortex Search service, or a local BM25 + vector index (Day 20)
+    search_engine = st.radio(
+        "Retrieval Engine:",
+        ["Cortex Search service", "Local hybrid (BM25 + vector)"],
+        help="The local engine ranks REVIEW_CHUNKS by keywords and REVIEW_EMBEDDINGS by similarity "
+             "in this app, fused with reciprocal rank fusion."
+    )
+    use_hybrid = search_engine == "Local hybrid (BM25 + vector)"
+    if use_hybrid:
+        embedding_table = st.text_input(
+            "Embeddings Table:",
+            value=st.session_state.get('embeddings_table', 'RAG_DB.RAG_SCHEMA.REVIEW_EMBEDDINGS')
+        )
+        chunk_table = st.text_input("Chunks Table:", value=embedding_table.rsplit(".", 1)[0] + ".REVIEW_CHUNKS")
+        if st.button(":material/sync: Refresh Local Index", use_container_width=True):
+            with st.spinner("Refreshing local index..."):
+                local_hybrid_engine(session, chunk_table, embedding_table, refresh=True)
+    
     num_chunks = st.slider("Context chunks:", 1, 10, 3,
                            help="Number of relevant chunks to retrieve")
     
@@ -112,6 +134,10 @@ with st.sidebar:
     )
     
     show_context = st.checkbox("Show retrieved context", value=True)
+    
+    # Attribute filters, pushed down to the search (FILE_NAME / CHUNK_TYPE)
+    filter_table = chunk_table if use_hybrid else service_filter_table(session, search_service, key="day21_filter")
+    search_filter = filter_controls(session, filter_table, key="day21_filter")
 
 # Main interface
 st.subheader(":material/help: Ask a Question")
@@ -123,43 +149,44 @@ question = st.text_input(
 )
 
 if st.button(":material/search: Search & Answer", type="primary"):
-    if question and search_service:
+    if question and (search_service or use_hybrid):
         with st.status("Processing...", expanded=True) as status:
             
             # Step 1: Retrieve context from Cortex Search
             st.write(":material/search: **Step 1:** Searching documents...")
             
             try:
-                from snowflake.core import Root
-                
-                root = Root(session)
-                parts = search_service.split(".")
-                
-                if len(parts) != 3:
-                    st.error("Service path must be in format: database.schema.service_name")
+                timings = {}
+                start = time.perf_counter()
+                try:
+                    if use_hybrid:
+                        search_results, _ = local_hybrid_engine(session, chunk_table, embedding_table).search(
+                            session, question, columns=["CHUNK_TEXT", "FILE_NAME"], limit=num_chunks,
+                            filter=search_filter
+                        )
+                    else:
+                        search_results = cached_search(
+                            session, search_service, question,
+                            columns=["CHUNK_TEXT", "FILE_NAME"],
+                            limit=num_chunks,
+                            filter=search_filter
+                        )
+                except ValueError as e:
+                    st.error(str(e))
                     st.stop()
                 
-                svc = (root
-                    .databases[parts[0]]
-                    .schemas[parts[1]]
-                    .cortex_search_services[parts[2]])
-                
-                search_results = svc.search(
-                    query=question,
-                    columns=["CHUNK_TEXT", "FILE_NAME"],
-                    limit=num_chunks
-                )
-                
                 # Extract context with metadata
                 context_chunks = []
                 sources = []
-                for item in search_results.results:
+                for item in search_results:
                     context_chunks.append(item.get("CHUNK_TEXT", ""))
                     sources.append(item.get("FILE_NAME", "Unknown"))
                 
                 context = "\n\n---\n\n".join(context_chunks)
+                timings['retrieval_ms'] = (time.perf_counter() - start) * 1000
                 
-                st.write(f"   :material/check_circle: Found {len(context_chunks)} relevant chunks")
+                st.write(f"   :material/check_circle: Found {len(context_chunks)} relevant chunks "
+                         f"in {timings['retrieval_ms']:.0f} ms")
                 
                 # Step 2: Generate answer with LLM
                 st.write(":material/smart_toy: **Step 2:** Generating answer...")
@@ -174,37 +201,42 @@ USER QUESTION: {question}
 
 Provide a clear, accurate answer based on the context. If you use information from the context, mention it naturally."""
                 
-                # Call LLM
-                response_sql = f"""
-                SELECT SNOWFLAKE.CORTEX.COMPLETE(
-                    '{model}',
-                    '{rag_prompt.replace("'", "''")}'
-                ) as response
-                """
-                
-                response = session.sql(response_sql).collect()[0][0]
-                
-                st.write("   :material/check_circle: Answer generated")
-                status.update(label="Complete!", state="complete", expanded=True)
-                
-                # Display results
-                st.divider()
-                
-                st.subheader(":material/lightbulb: Answer")
-                with st.container(border=True):
-                    st.markdown(response)
-                
-                if show_context:
-                    st.subheader(":material/library_books: Retrieved Context")
-                    st.caption(f"Used {len(context_chunks)} chunks from customer reviews")
-                    for i, (chunk, source) in enumerate(zip(context_chunks, sources), 1):
-                        with st.expander(f":material/description: Chunk {i} - {source}"):
-                            st.write(chunk)
-                
             except Exception as e:
                 status.update(label="Error", state="error")
                 st.error(f"Error: {str(e)}")
                 st.info(":material/lightbulb: **Troubleshooting:**\n- Make sure the search service exists (check Day 19)\n- Verify the service has finished indexing\n- Check your permissions")
+                st.stop()
+        
+        # Display results: the sources are shown now, the answer streams in above them
+        st.divider()
+        
+        st.subheader(":material/lightbulb: Answer")
+        answer_container = st.container(border=True)
+        
+        if show_context:
+            st.subheader(":material/library_books: Retrieved Context")
+            st.caption(f"Used {len(context_chunks)} chunks from customer reviews")
+            for i, (chunk, source) in enumerate(zip(context_chunks, sources), 1):
+                with st.expander(f":material/description: Chunk {i} - {source}"):
+                    st.write(chunk)
+        
+        try:
+            with answer_container:
+                st.write_stream(stream_complete(session, model, rag_prompt, timings))
+            
+            with status:
+                st.write(f"   :material/check_circle: Answer generated · first token after "
+                         f"{timings['ttft_ms']:.0f} ms · {timings['generate_ms'] / 1000:.1f}s to complete")
+            total_ms = timings['retrieval_ms'] + timings['generate_ms']
+            status.update(label=f"Complete! Retrieval {timings['retrieval_ms']:.0f} ms · "
+                                f"first token {timings['retrieval_ms'] + timings['ttft_ms']:.0f} ms · "
+                                f"total {total_ms / 1000:.1f}s",
+                          state="complete", expanded=True)
+        
+        except Exception as e:
+            status.update(label="Error", state="error")
+            st.error(f"Error generating answer: {str(e)}")
+            st.info(":material/lightbulb: **Troubleshooting:**\n- Check that the model is available in your region\n- Check your permissions")
     else:
         st.warning(":material/warning: Please enter a question and configure a search service.")
         st.info(":material/lightbulb: **Need a search service?**\n- Complete Day 19 to create `CUSTOMER_REVIEW_SEARCH`\n- The service will automatically appear in the dropdown above")
@@ -1,4 +1,8 @@
 import streamlit as st
+import time
+from llm_stream import stream_complete
+from search_services import (cached_search, filter_controls, list_services, local_hybrid_engine, refresh_services,
+                             service_filter_table)
 
 st.title(":material/chat: Chat with Your Documents")
 st.write("A conversational RAG chatbot powered by Cortex Search.")
@@ -24,13 +28,8 @@ with st.sidebar:
     # Check for search service from Day 19
     default_service = st.session_state.get('search_service', 'RAG_DB.RAG_SCHEMA.CUSTOMER_REVIEW_SEARCH')
     
-    # Try to get available services
-    try:
-        services_result = session.sql("SHOW CORTEX SEARCH SERVICES").collect()
-        available_services = [f"{row['database_name']}.{row['schema_name']}.{row['name']}" 
-                            for row in services_result] if services_result else []
-    except:
-        available_services = []
+    # Available services (listed once per TTL, not on every rerun)
+    available_services = list_services(session)
     
     # Ensure default service is always first in the list
     if default_service:
@@ -71,9 +70,36 @@ with st.sidebar:
             placeholder="database.schema.service_name"
         )
     
+    if st.button(":material/refresh: Refresh Services", use_container_width=True,
+                 help="Re-list Cortex Search services (e.g. after creating one in Day 19)"):
+        refresh_services()
+        st.rerun()
+    
+    # Retrieval engine: the Cortex Search service, or a local BM25 + vector index (Day 20)
+    search_engine = st.radio(
+        "Retrieval Engine:",
+        ["Cortex Search service", "Local hybrid (BM25 + vector)"],
+        help="The local engine ranks REVIEW_CHUNKS by keywords and REVIEW_EMBEDDINGS by similarity "
+             "in this app, fused with reciprocal rank fusion."
+    )
+    use_hybrid = search_engine == "Local hybrid (BM25 + vector)"
+    if use_hybrid:
+        embedding_table = st.text_input(
+            "Embeddings Table:",
+            value=st.session_state.get('embeddings_table', 'RAG_DB.RAG_SCHEMA.REVIEW_EMBEDDINGS')
+        )
+        chunk_table = st.text_input("Chunks Table:", value=embedding_table.rsplit(".", 1)[0] + ".REVIEW_CHUNKS")
+        if st.button(":material/sync: Refresh Local Index", use_container_width=True):
+            with st.spinner("Refreshing local index..."):
+                local_hybrid_engine(session, chunk_table, embedding_table, refresh=True)
+    
     num_chunks = st.slider("Context chunks:", 1, 5, 3,
                            help="Number of relevant chunks to retrieve per question")
     
+    # Attribute filters, pushed down to the search (FILE_NAME / CHUNK_TYPE)
+    filter_table = chunk_table if use_hybrid else service_filter_table(session, search_service, key="day22_filter")
+    search_filter = filter_controls(session, filter_table, key="day22_filter")
+    
     st.divider()
     
     if st.button(":material/delete: Clear Chat", use_container_width=True):
@@ -82,16 +108,16 @@ with st.sidebar:
 
 # Search function
 def search_documents(query, service_path, limit):
-    from snowflake.core import Root
-    root = Root(session)
-    parts = service_path.split(".")
-    if len(parts) != 3:
-        raise ValueError("Service path must be in format: database.schema.service_name")
-    svc = root.databases[parts[0]].schemas[parts[1]].cortex_search_services[parts[2]]
-    results = svc.search(query=query, columns=["CHUNK_TEXT", "FILE_NAME"], limit=limit)
+    if use_hybrid:
+        results, _ = local_hybrid_engine(session, chunk_table, embedding_table).search(
+            session, query, columns=["CHUNK_TEXT", "FILE_NAME"], limit=limit, filter=search_filter
+        )
+    else:
+        results = cached_search(session, service_path, query, columns=["CHUNK_TEXT", "FILE_NAME"], limit=limit,
+                                filter=search_filter)
     
     chunks_data = []
-    for item in results.results:
+    for item in results:
         chunks_data.append({
             "text": item.get("CHUNK_TEXT", ""),
             "source": item.get("FILE_NAME", "Unknown")
@@ -99,7 +125,7 @@ def search_documents(query, service_path, limit):
     return chunks_data
 
 # Main interface
-if not search_service:
+if not (search_service or use_hybrid):
     st.info(":material/arrow_back: Configure a Cortex Search service to start chatting!")
     st.caption(":material/lightbulb: **Need a search service?**\n- Complete Day 19 to create `CUSTOMER_REVIEW_SEARCH`\n- The service will automatically appear in the dropdown above")
 else:
@@ -117,10 +143,13 @@ else:
         
         with st.chat_message("assistant"):
             try:
-                with st.spinner("Searching and thinking..."):
+                timings = {}
+                start = time.perf_counter()
+                with st.spinner("Searching reviews..."):
                     # Retrieve context
                     chunks_data = search_documents(prompt, search_service, num_chunks)
                     context = "\n\n---\n\n".join([c["text"] for c in chunks_data])
+                    timings['retrieval_ms'] = (time.perf_counter() - start) * 1000
                     
                     # Generate response with guardrails
                     rag_prompt = f"""You are a customer review analysis assistant. Your role is to ONLY answer questions about customer reviews and feedback.
@@ -138,11 +167,9 @@ CONTEXT FROM CUSTOMER REVIEWS:
 USER QUESTION: {prompt}
 
 Provide a clear, helpful answer based ONLY on the customer reviews above. If you cite information, mention it naturally."""
-                    
-                    sql = f"SELECT SNOWFLAKE.CORTEX.COMPLETE('claude-3-5-sonnet', '{rag_prompt.replace(chr(39), chr(39)+chr(39))}')"
-                    response = session.sql(sql).collect()[0][0]
                 
-                st.markdown(response)
+                # The answer streams in here, above the sources (which are shown right away)
+                answer_container = st.container()
                 
                 # Show sources with file names
                 with st.expander(f":material/library_books: Sources ({len(chunks_data)} reviews used)"):
@@ -150,6 +177,13 @@ Provide a clear, helpful answer based ONLY on the customer reviews above. If you
                         st.caption(f"**[{i}] {chunk_info['source']}**")
                         st.write(chunk_info['text'][:200] + "..." if len(chunk_info['text']) > 200 else chunk_info['text'])
                 
+                with answer_container:
+                    response = st.write_stream(stream_complete(session, 'claude-3-5-sonnet', rag_prompt, timings))
+                
+                st.caption(f":material/timer: Retrieval {timings['retrieval_ms']:.0f} ms · "
+                           f"first token {timings['retrieval_ms'] + timings['ttft_ms']:.0f} ms · "
+                           f"total {(timings['retrieval_ms'] + timings['generate_ms']) / 1000:.1f}s")
+                
                 st.session_state.doc_messages.append({"role": "assistant", "content": response})
                 
             except Exception as e:
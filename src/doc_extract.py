@@ -0,0 +1,81 @@
+"""
+Text extraction shared by the Day 16 page and the headless ingest CLI.
+
+Everything here works on plain (file_name, bytes) pairs so it does not care
+whether the bytes came from st.file_uploader, a zip member or a file on disk.
+"""
+import io
+
+from pypdf import PdfReader
+
+SUPPORTED_EXTENSIONS = ('.txt', '.md', '.pdf')
+
+
+def get_file_type(file_name):
+    """Map a file name to the FILE_TYPE label stored in EXTRACTED_DOCUMENTS."""
+    name = file_name.lower()
+    if name.endswith('.txt'):
+        return "TXT"
+    elif name.endswith('.md'):
+        return "Markdown"
+    elif name.endswith('.pdf'):
+        return "PDF"
+    return "Unknown"
+
+
+def extract_text(file_name, data):
+    """Extract text from raw file bytes based on the file extension."""
+    extracted_text = ""
+
+    if file_name.lower().endswith(('.txt', '.md')):
+        # Handle TXT and Markdown files
+        extracted_text = data.decode("utf-8")
+
+    elif file_name.lower().endswith('.pdf'):
+        # Handle PDF files - extract text from all pages
+        pdf_reader = PdfReader(io.BytesIO(data))
+        for page in pdf_reader.pages:
+            page_text = page.extract_text()
+            if page_text:
+                extracted_text += page_text + "\n\n"
+
+    return extracted_text
+
+
+def build_record(file_name, data):
+    """
+    Extract text and metadata for one file.
+
+    Returns a dict shaped like a row of EXTRACTED_DOCUMENTS, or None when no
+    text could be extracted.
+    """
+    extracted_text = extract_text(file_name, data)
+    if not extracted_text or not extracted_text.strip():
+        return None
+
+    return {
+        'file_name': file_name,
+        'file_type': get_file_type(file_name),
+        'file_size': len(data),
+        'extracted_text': extracted_text,
+        'word_count': len(extracted_text.split()),
+        'char_count': len(extracted_text)
+    }
+
+
+def create_documents_table(session, database, schema, table_name):
+    """Create the database, schema and EXTRACTED_DOCUMENTS-style table if needed."""
+    session.sql(f"CREATE DATABASE IF NOT EXISTS {database}").collect()
+    session.sql(f"CREATE SCHEMA IF NOT EXISTS {database}.{schema}").collect()
+    session.sql(f"""
+    CREATE TABLE IF NOT EXISTS {database}.{schema}.{table_name} (
+        DOC_ID NUMBER AUTOINCREMENT,
+        FILE_NAME VARCHAR,
+        FILE_TYPE VARCHAR,
+        FILE_SIZE NUMBER,
+        EXTRACTED_TEXT VARCHAR,
+        UPLOAD_TIMESTAMP TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP(),
+        WORD_COUNT NUMBER,
+        CHAR_COUNT NUMBER
+    )
+    """).collect()
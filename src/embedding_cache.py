@@ -0,0 +1,262 @@
+"""
+Content-addressed embedding cache for Day 18.
+
+Embeddings are keyed on (MODEL, TEXT_HASH), where TEXT_HASH is the SHA-256 of
+the chunk text with whitespace runs collapsed to one space and trimmed. The
+cache lives in an EMBEDDING_CACHE table in Snowflake and is mirrored by
+EmbeddingCache in memory and on disk (CACHE_DIR, next to .vector_store), so
+re-running Day 18 - or restarting the app - only calls the model for text it
+has never seen, and only looks up in Snowflake what this machine has not
+seen either. The model is part of the key: switching models simply misses.
+
+The disk mirror is two append-only files per model: <model>.keys holds the
+32-byte SHA-256 digests and <model>.f32 the float32 rows in the same order.
+Appends run under an exclusive file lock, vectors before keys, so a reader
+only trusts rows present in both.
+
+The same normalisation is available in SQL (normalized_text_sql /
+text_hash_sql) so the set-based path in embeddings.py shares the cache.
+"""
+import hashlib
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from embeddings import EMBEDDING_DIMENSIONS, EMBEDDING_MODEL
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-writer use only
+    fcntl = None
+
+EMBEDDING_CACHE_TABLE = "EMBEDDING_CACHE"
+CACHE_DIR = ".embedding_cache"
+
+# Same character class as \s in Snowflake regular expressions
+_WHITESPACE = re.compile(r"[ \t\n\r\f\v]+")
+
+
+def normalize_text(text):
+    """Collapse whitespace runs to a single space and trim."""
+    return _WHITESPACE.sub(" ", text).strip(" ")
+
+
+def text_hash(text):
+    """Cache key for a chunk text (SHA-256 hex of the normalised text)."""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def normalized_text_sql(column):
+    """SQL twin of normalize_text()."""
+    return f"TRIM(REGEXP_REPLACE({column}, '\\\\s+', ' '))"
+
+
+def text_hash_sql(column):
+    """SQL twin of text_hash()."""
+    return f"SHA2({normalized_text_sql(column)}, 256)"
+
+
+def ensure_cache_table(session, full_cache_table):
+    """Create the embedding cache table if it doesn't exist."""
+    session.sql(f"""
+    CREATE TABLE IF NOT EXISTS {full_cache_table} (
+        MODEL VARCHAR,
+        TEXT_HASH VARCHAR,
+        EMBEDDING VECTOR(FLOAT, {EMBEDDING_DIMENSIONS}),
+        CREATED_TIMESTAMP TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()
+    )
+    """).collect()
+
+
+class LocalMirror:
+    """Append-only on-disk {text hash: vector} mirror for one model (see module docstring)."""
+
+    def __init__(self, cache_dir, model, dimensions=EMBEDDING_DIMENSIONS):
+        self.dimensions = dimensions
+        os.makedirs(cache_dir, exist_ok=True)
+        base = os.path.join(cache_dir, re.sub(r"[^\w.-]", "_", model))
+        self.keys_path, self.vectors_path, self.lock_path = base + ".keys", base + ".f32", base + ".lock"
+
+    def _lock(self, mode):
+        lock = open(self.lock_path, "a")
+        if fcntl:
+            fcntl.flock(lock, mode)
+        return lock
+
+    def load(self):
+        """Every mirrored entry as {hash: vector}."""
+        if not os.path.exists(self.keys_path):
+            return {}
+        with self._lock(fcntl.LOCK_SH if fcntl else None):
+            keys = np.fromfile(self.keys_path, dtype=np.uint8)
+            vectors = np.fromfile(self.vectors_path, dtype=np.float32)
+        rows = min(len(keys) // 32, len(vectors) // self.dimensions)
+        keys = keys[:rows * 32].reshape(rows, 32)
+        vectors = vectors[:rows * self.dimensions].reshape(rows, self.dimensions)
+        return {key.tobytes().hex(): vector for key, vector in zip(keys, vectors)}
+
+    def append(self, hashes, matrix):
+        if not len(hashes):
+            return
+        with self._lock(fcntl.LOCK_EX if fcntl else None):
+            with open(self.vectors_path, "ab") as f:
+                f.write(np.ascontiguousarray(matrix, dtype=np.float32).tobytes())
+            with open(self.keys_path, "ab") as f:
+                f.write(b"".join(bytes.fromhex(h) for h in hashes))
+
+
+class EmbeddingCache:
+    """
+    Embedding cache for one model: an in-memory and on-disk mirror in front of the Snowflake table.
+
+    Keep an instance in st.session_state so the in-memory mirror survives
+    reruns; the disk mirror in `cache_dir` survives restarts (None disables it).
+    """
+
+    def __init__(self, session, full_cache_table, model=EMBEDDING_MODEL, lookup_batch=5000,
+                 cache_dir=CACHE_DIR):
+        self.session = session
+        self.full_cache_table = full_cache_table
+        self.model = model
+        self.lookup_batch = lookup_batch
+        self.mirror = LocalMirror(cache_dir, model) if cache_dir else None
+        self.local = self.mirror.load() if self.mirror else {}
+        ensure_cache_table(session, full_cache_table)
+
+    def _remember(self, hashes, matrix):
+        new = [i for i, h in enumerate(hashes) if h not in self.local]
+        self.local.update(zip(hashes, matrix))
+        if self.mirror and new:
+            self.mirror.append([hashes[i] for i in new], matrix[new])
+
+    def lookup(self, hashes):
+        """Return {hash: vector} for every hash found locally or in Snowflake."""
+        found = {h: self.local[h] for h in hashes if h in self.local}
+        remote = sorted(set(hashes) - set(found))
+        for i in range(0, len(remote), self.lookup_batch):
+            in_list = ", ".join(f"'{h}'" for h in remote[i:i + self.lookup_batch])
+            rows = self.session.sql(f"""
+            SELECT TEXT_HASH, EMBEDDING
+            FROM {self.full_cache_table}
+            WHERE MODEL = '{self.model}' AND TEXT_HASH IN ({in_list})
+            """).collect()
+            if rows:
+                hashes = [row[0] for row in rows]
+                matrix = np.asarray([row[1] for row in rows], dtype=np.float32).reshape(-1, EMBEDDING_DIMENSIONS)
+                self._remember(hashes, matrix)
+                found.update(zip(hashes, matrix))
+        return found
+
+    def store(self, hashes, vectors):
+        """Add new embeddings to the mirrors and bulk-load them into the cache table."""
+        if not hashes:
+            return
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(-1, EMBEDDING_DIMENSIONS)
+        self._remember(list(hashes), matrix)
+
+        database, schema, table = self.full_cache_table.split(".")
+        stage_table = f"{table}_LOAD_STAGE"
+        self.session.write_pandas(pd.DataFrame({'TEXT_HASH': list(hashes), 'EMBEDDING': list(matrix)}),
+                                  table_name=stage_table,
+                                  database=database,
+                                  schema=schema,
+                                  auto_create_table=True,
+                                  overwrite=True,
+                                  table_type="temporary")
+        self.session.sql(f"""
+        INSERT INTO {self.full_cache_table} (MODEL, TEXT_HASH, EMBEDDING)
+        SELECT '{self.model}', s.TEXT_HASH, s.EMBEDDING::VECTOR(FLOAT, {EMBEDDING_DIMENSIONS})
+        FROM {database}.{schema}.{stage_table} s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM {self.full_cache_table} k
+            WHERE k.MODEL = '{self.model}' AND k.TEXT_HASH = s.TEXT_HASH
+        )
+        """).collect()
+        self.session.sql(f"DROP TABLE IF EXISTS {database}.{schema}.{stage_table}").collect()
+
+    def embed(self, texts, embed_many, progress=None):
+        """
+        Embed `texts`, sending only cache misses to `embed_many(texts, progress)`
+        (e.g. embedding_client.ConcurrentEmbedder.embed).
+
+        Each distinct normalised text is embedded once. Returns an (n, 768)
+        float32 matrix in input order and a dict with chunks, calls,
+        calls_saved and hit_rate. `progress` is passed through to `embed_many`.
+        """
+        hashes = [text_hash(text) for text in texts]
+        found = self.lookup(hashes)
+
+        # One call per distinct missing text
+        misses = {}
+        for h, text in zip(hashes, texts):
+            if h not in found and h not in misses:
+                misses[h] = normalize_text(text)
+
+        new_vectors = embed_many(list(misses.values()), progress) if misses else []
+        self.store(list(misses), new_vectors)
+        found.update(zip(misses, (np.asarray(v, dtype=np.float32) for v in new_vectors)))
+
+        stats = {
+            'chunks': len(texts),
+            'calls': len(misses),
+            'calls_saved': len(texts) - len(misses),
+            'hit_rate': (len(texts) - len(misses)) / len(texts) if texts else 0.0,
+        }
+        matrix = np.empty((len(hashes), EMBEDDING_DIMENSIONS), dtype=np.float32)
+        for i, h in enumerate(hashes):
+            matrix[i] = found[h]
+        return matrix, stats
+
+
+def fill_cache_in_warehouse(session, full_chunk_table, full_embedding_table, full_cache_table,
+                            model=EMBEDDING_MODEL, batch_size=None, progress=None):
+    """
+    Embed, inside Snowflake, every distinct chunk text that is neither embedded nor cached.
+
+    Runs in TEXT_HASH ranges of `batch_size` texts when given, calling
+    `progress(done, total)` after each. Returns the number of model calls made.
+    """
+    ensure_cache_table(session, full_cache_table)
+    misses = f"""
+    SELECT DISTINCT {text_hash_sql('c.CHUNK_TEXT')} AS TEXT_HASH, {normalized_text_sql('c.CHUNK_TEXT')} AS NORMALIZED_TEXT
+    FROM {full_chunk_table} c
+    WHERE NOT EXISTS (SELECT 1 FROM {full_embedding_table} e WHERE e.CHUNK_ID = c.CHUNK_ID)
+      AND NOT EXISTS (
+          SELECT 1 FROM {full_cache_table} k
+          WHERE k.MODEL = '{model}' AND k.TEXT_HASH = {text_hash_sql('c.CHUNK_TEXT')}
+      )
+    """
+
+    def insert(where=""):
+        result = session.sql(f"""
+        INSERT INTO {full_cache_table} (MODEL, TEXT_HASH, EMBEDDING)
+        SELECT '{model}', m.TEXT_HASH, SNOWFLAKE.CORTEX.EMBED_TEXT_768('{model}', m.NORMALIZED_TEXT)
+        FROM ({misses}) m
+        {where}
+        """).collect()
+        return int(result[0][0]) if result else 0
+
+    if not batch_size:
+        calls = insert()
+        if progress:
+            progress(calls, calls)
+        return calls
+
+    boundaries = [row[0] for row in session.sql(f"""
+    SELECT m.TEXT_HASH FROM ({misses}) m
+    QUALIFY MOD(ROW_NUMBER() OVER (ORDER BY m.TEXT_HASH) - 1, {int(batch_size)}) = 0
+    ORDER BY m.TEXT_HASH
+    """).collect()]
+    total = session.sql(f"SELECT COUNT(*) FROM ({misses})").collect()[0][0]
+
+    calls = 0
+    for i, lower in enumerate(boundaries):
+        if i + 1 < len(boundaries):
+            calls += insert(f"WHERE m.TEXT_HASH >= '{lower}' AND m.TEXT_HASH < '{boundaries[i + 1]}'")
+        else:
+            calls += insert(f"WHERE m.TEXT_HASH >= '{lower}'")
+        if progress:
+            progress(calls, total)
+    return calls
@@ -0,0 +1,30 @@
+"""
+Concurrent client-side embedding for Day 18 (and ad-hoc query embedding).
+
+ConcurrentEmbedder calls an embedding function (e.g. snowflake.cortex's
+embed_text_768) through concurrent_runner.AdaptiveRunner: requests in flight
+adapt AIMD-style to throttling, throttled calls are retried with backoff and
+results come back in input order.
+"""
+from concurrent_runner import AdaptiveRunner
+
+
+class ConcurrentEmbedder(AdaptiveRunner):
+    """
+    Embed many texts concurrently under an adaptive in-flight limit.
+
+    The embedding function is called as fn(text), or as fn(session, text)
+    with a `pool` (see AdaptiveRunner). After embed(), `stats`
+    holds calls, retries, throttled, seconds, chunks_per_sec and the final
+    in-flight limit.
+    """
+
+    def embed(self, texts, progress=None):
+        """
+        Embed `texts` and return the results in input order.
+
+        `progress(done, total, chunks_per_sec)` is called as results arrive.
+        """
+        results = self.map(texts, progress)
+        self.stats['chunks_per_sec'] = self.stats['items_per_sec']
+        return results
@@ -0,0 +1,284 @@
+"""
+Set-based embedding generation for Day 18.
+
+Instead of one EMBED_TEXT_768 round trip per chunk, embeddings are computed
+inside Snowflake with
+
+    INSERT INTO REVIEW_EMBEDDINGS SELECT CHUNK_ID, SNOWFLAKE.CORTEX.EMBED_TEXT_768(...) FROM REVIEW_CHUNKS
+
+optionally split into CHUNK_ID ranges of `batch_size` chunks so the page can
+show progress. The batch size is the number of chunks per statement, i.e.
+real server-side batching.
+
+Embeddings computed in the app are saved with write_embeddings(), which
+ships float32 arrays as Parquet through write_pandas and casts them to
+VECTOR in one INSERT ... SELECT per chunk of rows.
+
+Both paths can sit behind the content-addressed cache in embedding_cache.py.
+
+Every embedding row records the TEXT_HASH (SHA-256 of CHUNK_TEXT, as in
+chunking.text_hash) of the text it was computed from. Incremental runs
+delete embeddings whose chunk is gone or whose text no longer hashes the
+same - e.g. after a Replace save that reused CHUNK_IDs for other text - and
+embed those chunks again.
+
+In the app, embeddings are held as an EmbeddingMatrix (one contiguous
+float32 matrix plus an int64 CHUNK_ID array); Python lists only appear at
+the I/O boundary.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+EMBEDDING_MODEL = "snowflake-arctic-embed-m"
+EMBEDDING_DIMENSIONS = 768
+
+
+def ensure_embedding_table(session, full_embedding_table, replace=False):
+    """Create the embedding table (or recreate it empty when `replace` is set)."""
+    create = "CREATE OR REPLACE TABLE" if replace else "CREATE TABLE IF NOT EXISTS"
+    session.sql(f"""
+    {create} {full_embedding_table} (
+        CHUNK_ID NUMBER,
+        EMBEDDING VECTOR(FLOAT, 768),
+        CREATED_TIMESTAMP TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP(),
+        TEXT_HASH VARCHAR
+    )
+    """).collect()
+    # Tables created before TEXT_HASH was recorded
+    session.sql(f"ALTER TABLE {full_embedding_table} ADD COLUMN IF NOT EXISTS TEXT_HASH VARCHAR").collect()
+
+
+def chunk_hash_sql(column):
+    """SQL expression for the TEXT_HASH of a chunk text column (matches chunking.text_hash)."""
+    return f"SHA2({column}, 256)"
+
+
+def _missing_chunks(full_chunk_table, full_embedding_table):
+    """Chunks of the chunk table that have no embedding yet."""
+    return f"""
+    FROM {full_chunk_table} c
+    WHERE NOT EXISTS (SELECT 1 FROM {full_embedding_table} e WHERE e.CHUNK_ID = c.CHUNK_ID)
+    """
+
+
+def delete_stale_embeddings(session, full_chunk_table, full_embedding_table):
+    """
+    Delete embeddings whose chunk is gone or whose chunk text changed since
+    they were computed; returns the number deleted.
+
+    Rows without a TEXT_HASH (saved before it was recorded) cannot be checked
+    and are deleted too, so they are embedded again once.
+    """
+    result = session.sql(f"""
+    DELETE FROM {full_embedding_table} e
+    WHERE NOT EXISTS (
+        SELECT 1 FROM {full_chunk_table} c
+        WHERE c.CHUNK_ID = e.CHUNK_ID AND e.TEXT_HASH = {chunk_hash_sql('c.CHUNK_TEXT')}
+    )
+    """).collect()
+    return int(result[0][0]) if result else 0
+
+
+def embedding_chunk_ids(session, full_embedding_table):
+    """Every CHUNK_ID in the embedding table, as an int64 array (no vectors are read)."""
+    ids = session.sql(f"SELECT CHUNK_ID FROM {full_embedding_table}").to_pandas()['CHUNK_ID']
+    return ids.to_numpy(dtype=np.int64)
+
+
+def batch_boundaries(session, full_chunk_table, full_embedding_table, batch_size):
+    """
+    First CHUNK_ID of every batch of `batch_size` chunks still to embed.
+
+    CHUNK_IDs can be sparse (hashed IDs from the incremental sync), so the
+    boundaries are taken from ROW_NUMBER() rather than from the ID values;
+    only one row per batch comes back to the client.
+    """
+    rows = session.sql(f"""
+    SELECT c.CHUNK_ID
+    {_missing_chunks(full_chunk_table, full_embedding_table)}
+    QUALIFY MOD(ROW_NUMBER() OVER (ORDER BY c.CHUNK_ID) - 1, {int(batch_size)}) = 0
+    ORDER BY c.CHUNK_ID
+    """).collect()
+    return [row[0] for row in rows]
+
+
+def embed_in_warehouse(session, full_chunk_table, full_embedding_table, model=EMBEDDING_MODEL,
+                       batch_size=None, replace=False, progress=None, cache_table=None):
+    """
+    Embed every chunk without an embedding with set-based INSERT ... SELECT statements.
+
+    With `replace` the embedding table is recreated first, otherwise stale
+    embeddings (see delete_stale_embeddings) are dropped and only chunks
+    without an embedding are embedded. Without a `batch_size` everything runs as a single
+    statement; with one, `progress(done, total)` is called after each batch.
+
+    With a `cache_table` (see embedding_cache.py) only texts missing from the
+    cache are sent to the model and the rest is joined from the cache.
+    Returns a dict with inserted, calls, calls_saved and deleted.
+    """
+    ensure_embedding_table(session, full_embedding_table, replace=replace)
+    deleted = 0 if replace else delete_stale_embeddings(session, full_chunk_table, full_embedding_table)
+
+    if cache_table:
+        from embedding_cache import fill_cache_in_warehouse, text_hash_sql
+
+        calls = fill_cache_in_warehouse(session, full_chunk_table, full_embedding_table, cache_table,
+                                        model=model, batch_size=batch_size, progress=progress)
+        result = session.sql(f"""
+        INSERT INTO {full_embedding_table} (CHUNK_ID, EMBEDDING, TEXT_HASH)
+        SELECT c.CHUNK_ID, k.EMBEDDING, {chunk_hash_sql('c.CHUNK_TEXT')}
+        FROM {full_chunk_table} c
+        JOIN {cache_table} k
+            ON k.MODEL = '{model}' AND k.TEXT_HASH = {text_hash_sql('c.CHUNK_TEXT')}
+        WHERE NOT EXISTS (SELECT 1 FROM {full_embedding_table} e WHERE e.CHUNK_ID = c.CHUNK_ID)
+        """).collect()
+        inserted = int(result[0][0]) if result else 0
+        return {'inserted': inserted, 'calls': calls, 'calls_saved': max(inserted - calls, 0), 'deleted': deleted}
+
+    def insert(where=""):
+        result = session.sql(f"""
+        INSERT INTO {full_embedding_table} (CHUNK_ID, EMBEDDING, TEXT_HASH)
+        SELECT c.CHUNK_ID, SNOWFLAKE.CORTEX.EMBED_TEXT_768('{model}', c.CHUNK_TEXT), {chunk_hash_sql('c.CHUNK_TEXT')}
+        {_missing_chunks(full_chunk_table, full_embedding_table)}
+        {where}
+        """).collect()
+        return int(result[0][0]) if result else 0
+
+    if not batch_size:
+        inserted = insert()
+        if progress:
+            progress(inserted, inserted)
+        return {'inserted': inserted, 'calls': inserted, 'calls_saved': 0, 'deleted': deleted}
+
+    boundaries = batch_boundaries(session, full_chunk_table, full_embedding_table, batch_size)
+    total = session.sql(f"SELECT COUNT(*) {_missing_chunks(full_chunk_table, full_embedding_table)}").collect()[0][0]
+
+    inserted = 0
+    for i, lower in enumerate(boundaries):
+        if i + 1 < len(boundaries):
+            inserted += insert(f"AND c.CHUNK_ID >= {lower} AND c.CHUNK_ID < {boundaries[i + 1]}")
+        else:
+            inserted += insert(f"AND c.CHUNK_ID >= {lower}")
+        if progress:
+            progress(inserted, total)
+    return {'inserted': inserted, 'calls': inserted, 'calls_saved': 0, 'deleted': deleted}
+
+
+class EmbeddingMatrix:
+    """
+    Embeddings as one contiguous (n, 768) float32 matrix plus an int64 CHUNK_ID array.
+
+    About 3 KB per vector, versus ~25 KB for a 768-element list of Python floats.
+    `text_hashes` optionally holds the TEXT_HASH each vector was computed from.
+    """
+
+    def __init__(self, chunk_ids, vectors, text_hashes=None):
+        self.chunk_ids = np.ascontiguousarray(chunk_ids, dtype=np.int64)
+        self.matrix = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, EMBEDDING_DIMENSIONS)
+        self.text_hashes = list(text_hashes) if text_hashes is not None else None
+        if len(self.chunk_ids) != len(self.matrix):
+            raise ValueError(f"{len(self.chunk_ids)} chunk ids for {len(self.matrix)} vectors")
+
+    def __len__(self):
+        return len(self.chunk_ids)
+
+    @property
+    def nbytes(self):
+        return self.matrix.nbytes + self.chunk_ids.nbytes
+
+    def memory_report(self):
+        """Footprint in MB, next to the list-of-Python-floats equivalent it replaces."""
+        # float object (24 B) + list slot (8 B) per value, list header, int id and dict per row
+        list_bytes = len(self) * (EMBEDDING_DIMENSIONS * 32 + 56 + 28 + 232)
+        return {
+            'rows': len(self),
+            'dimensions': EMBEDDING_DIMENSIONS,
+            'matrix_mb': self.matrix.nbytes / 1_048_576,
+            'total_mb': self.nbytes / 1_048_576,
+            'python_lists_mb': list_bytes / 1_048_576,
+        }
+
+
+def load_embeddings(session, full_embedding_table, where=""):
+    """
+    Read an embedding table into an EmbeddingMatrix.
+
+    Result batches are converted to float32 one at a time, so the VECTOR
+    column never exists as Python lists for the whole table at once.
+    """
+    ids, blocks = [], []
+    batches = session.sql(f"""
+    SELECT CHUNK_ID, EMBEDDING
+    FROM {full_embedding_table}
+    {where}
+    ORDER BY CHUNK_ID
+    """).to_pandas_batches()
+    for batch in batches:
+        ids.append(batch['CHUNK_ID'].to_numpy(dtype=np.int64))
+        blocks.append(np.asarray(batch['EMBEDDING'].tolist(), dtype=np.float32).reshape(-1, EMBEDDING_DIMENSIONS))
+    if not ids:
+        return EmbeddingMatrix(np.empty(0, dtype=np.int64), np.empty((0, EMBEDDING_DIMENSIONS), dtype=np.float32))
+    return EmbeddingMatrix(np.concatenate(ids), np.concatenate(blocks))
+
+
+def embedding_frame(chunk_ids, vectors, text_hashes=None):
+    """CHUNK_ID + EMBEDDING (one float32 array per row) [+ TEXT_HASH] frame, ready for write_pandas."""
+    matrix = np.asarray(vectors, dtype=np.float32).reshape(-1, EMBEDDING_DIMENSIONS)
+    frame = pd.DataFrame({
+        'CHUNK_ID': np.asarray(chunk_ids, dtype=np.int64),
+        'EMBEDDING': list(matrix),
+    })
+    if text_hashes is not None:
+        frame['TEXT_HASH'] = list(text_hashes)
+    return frame
+
+
+def write_embeddings(session, chunk_ids, vectors, database, schema, embedding_table,
+                     chunk_rows=50_000, progress=None, text_hashes=None):
+    """
+    Bulk-load embeddings computed in the app into the embedding table.
+
+    Each chunk of `chunk_rows` vectors is written with write_pandas into a
+    temporary ARRAY staging table and moved over with one
+    INSERT ... SELECT EMBEDDING::VECTOR(FLOAT, 768), so every chunk is committed
+    on its own. `progress(done, total, seconds)` is called after each chunk.
+    Pass the `text_hashes` the vectors were computed from, or incremental
+    runs will treat the rows as stale (see delete_stale_embeddings).
+    Returns rows, seconds, rows_per_sec and payload_mb.
+    """
+    full_embedding_table = f"{database}.{schema}.{embedding_table}"
+    stage_table = f"{embedding_table}_LOAD_STAGE"
+    full_stage_table = f"{database}.{schema}.{stage_table}"
+
+    frame = embedding_frame(chunk_ids, vectors, text_hashes)
+    text_hash = "TEXT_HASH" if text_hashes is not None else "NULL"
+    total = len(frame)
+    start = time.perf_counter()
+    try:
+        for i in range(0, total, chunk_rows):
+            session.write_pandas(frame.iloc[i:i + chunk_rows],
+                                 table_name=stage_table,
+                                 database=database,
+                                 schema=schema,
+                                 auto_create_table=True,
+                                 overwrite=True,
+                                 table_type="temporary")
+            session.sql(f"""
+            INSERT INTO {full_embedding_table} (CHUNK_ID, EMBEDDING, TEXT_HASH)
+            SELECT CHUNK_ID, EMBEDDING::VECTOR(FLOAT, {EMBEDDING_DIMENSIONS}), {text_hash}
+            FROM {full_stage_table}
+            """).collect()
+            if progress:
+                progress(min(i + chunk_rows, total), total, time.perf_counter() - start)
+    finally:
+        session.sql(f"DROP TABLE IF EXISTS {full_stage_table}").collect()
+
+    seconds = time.perf_counter() - start
+    return {
+        'rows': total,
+        'seconds': seconds,
+        'rows_per_sec': total / seconds if seconds else 0.0,
+        'payload_mb': total * EMBEDDING_DIMENSIONS * 4 / 1_048_576,
+    }
@@ -0,0 +1,267 @@
+"""
+Local hybrid (keyword + vector) retrieval over REVIEW_CHUNKS and REVIEW_EMBEDDINGS.
+
+BM25Index is an inverted index over the chunk text. It is built
+incrementally like ann_index.open_index: rows created since the last refresh
+are tokenised and added, and re-chunked rows replace their old postings.
+HybridSearch ranks the query against it and against a vector index
+(ann_index.IVFIndex or quantization.QuantizedIndex), then fuses the two
+rankings with reciprocal rank fusion (RRF):
+
+    score(chunk) = sum over rankings of 1 / (rrf_k + rank)
+
+Keyword matching catches short, literal queries such as product names
+("thermal gloves") that vector search alone can rank poorly. Results have
+the shape of `svc.search(...).results`, so Days 20-22 can switch engines.
+"""
+import math
+import os
+import re
+import time
+from collections import Counter
+
+import numpy as np
+
+from ann_index import INDEX_DIR, embed_query, fetch_chunks, filtered_chunk_ids
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have i if in into is it its my not of on or so
+that the their them they this to too was we were what when which who will with you your
+""".split())
+
+
+def tokenize(text):
+    """Lower-cased alphanumeric terms, without stopwords."""
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 inverted index with incremental add/replace and npz persistence."""
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}   # term -> {chunk_id: term frequency}
+        self.doc_terms = {}  # chunk_id -> its distinct terms (to replace a chunk's postings)
+        self.doc_lengths = {}
+        self.total_length = 0
+        self.watermark = ""
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def remove(self, chunk_id):
+        for term in self.doc_terms.pop(chunk_id, ()):
+            postings = self.postings[term]
+            del postings[chunk_id]
+            if not postings:
+                del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(chunk_id, 0)
+
+    def add(self, chunk_ids, texts):
+        """Index chunk texts; a chunk that is already indexed is replaced. Returns the number added."""
+        added = 0
+        for chunk_id, text in zip(chunk_ids, texts):
+            chunk_id = int(chunk_id)
+            if chunk_id in self.doc_lengths:
+                self.remove(chunk_id)
+            terms = tokenize(text or "")
+            counts = Counter(terms)
+            for term, tf in counts.items():
+                self.postings.setdefault(term, {})[chunk_id] = tf
+            self.doc_terms[chunk_id] = tuple(counts)
+            self.doc_lengths[chunk_id] = len(terms)
+            self.total_length += len(terms)
+            added += 1
+        return added
+
+    def search(self, query, k=10, allowed=None):
+        """
+        Return (chunk_ids, scores) of the `k` best BM25 matches, best first.
+
+        With `allowed` (a set of chunk ids) only those chunks are scored.
+        """
+        scores = {}
+        n = len(self)
+        avg_length = self.total_length / n if n else 0.0
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, tf in postings.items():
+                if allowed is not None and chunk_id not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[chunk_id] / max(avg_length, 1e-9))
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        if not scores:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        ids = np.fromiter(scores.keys(), dtype=np.int64, count=len(scores))
+        values = np.fromiter(scores.values(), dtype=np.float32, count=len(scores))
+        k = min(k, len(ids))
+        top = np.argpartition(-values, k - 1)[:k]
+        top = top[np.argsort(-values[top])]
+        return ids[top], values[top]
+
+    def save(self, path):
+        terms = list(self.postings)
+        sizes = [len(self.postings[t]) for t in terms]
+        np.savez(path,
+                 terms=np.array(terms, dtype=str),
+                 offsets=np.concatenate([[0], np.cumsum(sizes, dtype=np.int64)]),
+                 ids=np.fromiter((c for t in terms for c in self.postings[t]), dtype=np.int64, count=sum(sizes)),
+                 tfs=np.fromiter((f for t in terms for f in self.postings[t].values()),
+                                 dtype=np.int32, count=sum(sizes)),
+                 doc_ids=np.fromiter(self.doc_lengths, dtype=np.int64, count=len(self)),
+                 doc_lengths=np.fromiter(self.doc_lengths.values(), dtype=np.int64, count=len(self)),
+                 params=np.array([self.k1, self.b]),
+                 watermark=np.array(self.watermark))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            k1, b = data['params'].tolist()
+            index = cls(k1=k1, b=b)
+            offsets, ids, tfs = data['offsets'], data['ids'].tolist(), data['tfs'].tolist()
+            doc_terms = {}
+            for term, start, end in zip(data['terms'].tolist(), offsets[:-1].tolist(), offsets[1:].tolist()):
+                index.postings[term] = dict(zip(ids[start:end], tfs[start:end]))
+                for chunk_id in ids[start:end]:
+                    doc_terms.setdefault(chunk_id, []).append(term)
+            index.doc_lengths = dict(zip(data['doc_ids'].tolist(), data['doc_lengths'].tolist()))
+            index.doc_terms = {chunk_id: tuple(doc_terms.get(chunk_id, ())) for chunk_id in index.doc_lengths}
+            index.total_length = sum(index.doc_lengths.values())
+            index.watermark = str(data['watermark'])
+        return index
+
+
+def bm25_path(full_chunk_table, index_dir=INDEX_DIR):
+    return os.path.join(index_dir, f"{full_chunk_table.replace('.', '_').upper()}_BM25.npz")
+
+
+def open_bm25_index(session, full_chunk_table, path=None):
+    """
+    Load the BM25 index for `full_chunk_table` (building it on first use) and
+    index chunks created or re-chunked since its last refresh.
+
+    Like ann_index.open_index, MAX(CREATED_TIMESTAMP) is the watermark;
+    re-chunked rows replace their old postings, and when the row counts
+    disagree the postings of chunks no longer in the table are dropped.
+    Returns (index, rows_added).
+    """
+    path = path or bm25_path(full_chunk_table)
+    watermark, table_rows = session.sql(f"""
+    SELECT TO_VARCHAR(MAX(CREATED_TIMESTAMP), 'YYYY-MM-DD HH24:MI:SS.FF9'), COUNT(*)
+    FROM {full_chunk_table}
+    """).collect()[0]
+    watermark = watermark or ""
+
+    index = BM25Index.load(path) if os.path.exists(path) else BM25Index()
+    if watermark <= index.watermark and table_rows == len(index):
+        return index, 0
+
+    added = 0
+    for batch in session.sql(f"""
+    SELECT CHUNK_ID, CHUNK_TEXT
+    FROM {full_chunk_table}
+    WHERE CREATED_TIMESTAMP > '{index.watermark or "1970-01-01"}'::TIMESTAMP_NTZ
+      AND CREATED_TIMESTAMP <= '{watermark or "1970-01-01"}'::TIMESTAMP_NTZ
+    """).to_pandas_batches():
+        added += index.add(batch['CHUNK_ID'].tolist(), batch['CHUNK_TEXT'].tolist())
+
+    if table_rows != len(index):
+        # Chunks deleted or re-chunked away since the last refresh
+        table_ids = set(session.sql(f"SELECT CHUNK_ID FROM {full_chunk_table}").to_pandas()['CHUNK_ID'].tolist())
+        for chunk_id in [c for c in index.doc_lengths if c not in table_ids]:
+            index.remove(chunk_id)
+
+    index.watermark = watermark
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    index.save(path)
+    return index, added
+
+
+def rrf_fuse(rankings, rrf_k=60, weights=None):
+    """
+    Reciprocal rank fusion of several best-first id lists.
+
+    Returns [(chunk_id, fused_score), ...], best first.
+    """
+    weights = weights or [1.0] * len(rankings)
+    fused = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, chunk_id in enumerate(ranking, 1):
+            fused[int(chunk_id)] = fused.get(int(chunk_id), 0.0) + weight / (rrf_k + rank)
+    return sorted(fused.items(), key=lambda item: -item[1])
+
+
+class HybridSearch:
+    """
+    BM25 + vector retrieval fused with RRF.
+
+    `vector_index` is any index with search(query_vector, k) -> (ids, scores);
+    each engine contributes its top `candidates` to the fusion. A filter is
+    resolved to the allowed chunk ids first and both engines rank only those.
+    """
+
+    def __init__(self, bm25, vector_index, full_chunk_table, rrf_k=60, candidates=50,
+                 keyword_weight=1.0, vector_weight=1.0):
+        self.bm25 = bm25
+        self.vector_index = vector_index
+        self.full_chunk_table = full_chunk_table
+        self.rrf_k = rrf_k
+        self.candidates = candidates
+        self.weights = [keyword_weight, vector_weight]
+
+    def search(self, session, query, columns=("CHUNK_TEXT", "FILE_NAME"), limit=5, model=None, filter=None):
+        """
+        Return (results, timings) for `query`.
+
+        Result dicts hold the requested `columns` (as from `svc.search`) plus
+        CHUNK_ID and the fused `score`; timings are embed/keyword/vector/fetch
+        milliseconds (plus filter_ms with a `filter`, in search_filters syntax).
+        """
+        timings = {}
+        start = time.perf_counter()
+        query_vector = embed_query(session, query, model)
+        timings['embed_ms'] = (time.perf_counter() - start) * 1000
+
+        allowed = allowed_set = None
+        if filter:
+            start = time.perf_counter()
+            allowed = filtered_chunk_ids(session, self.full_chunk_table, filter)
+            allowed_set = set(allowed.tolist())
+            timings['filter_ms'] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        keyword_ids, _ = self.bm25.search(query, self.candidates, allowed=allowed_set)
+        timings['keyword_ms'] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        vector_ids, _ = self.vector_index.search(query_vector, self.candidates, allowed=allowed)
+        timings['vector_ms'] = (time.perf_counter() - start) * 1000
+
+        fused = rrf_fuse([keyword_ids, vector_ids], self.rrf_k, self.weights)
+
+        # Fetch before truncating: a fused id whose chunk has since left the
+        # table is skipped and the next candidate takes its place
+        start = time.perf_counter()
+        columns = ["CHUNK_ID"] + [c for c in columns if c != "CHUNK_ID"]
+        results = []
+        for i in range(0, len(fused), limit):
+            page = fused[i:i + limit]
+            rows = fetch_chunks(session, self.full_chunk_table, [c for c, _ in page], columns)
+            results += [dict(rows[c], score=score) for c, score in page if c in rows]
+            if len(results) >= limit:
+                break
+        timings['fetch_ms'] = (time.perf_counter() - start) * 1000
+        return results[:limit], timings
+
+
+def open_hybrid_search(session, full_chunk_table, vector_index, **kwargs):
+    """Refresh the BM25 index of `full_chunk_table` and pair it with `vector_index`. Returns (engine, rows_added)."""
+    bm25, added = open_bm25_index(session, full_chunk_table)
+    return HybridSearch(bm25, vector_index, full_chunk_table, **kwargs), added
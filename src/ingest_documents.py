@@ -0,0 +1,192 @@
+"""
+Headless batch ingestion for EXTRACTED_DOCUMENTS.
+
+Streams documents straight out of a zip/tar archive or a directory (nothing is
+extracted to disk), runs the Day 16 extraction logic in parallel worker
+processes and bulk-loads the results with write_pandas.
+
+Usage:
+    python src/ingest_documents.py review.zip
+    python src/ingest_documents.py corpus.tar.gz --workers 8 --batch-size 1000 --replace
+
+Connection parameters are read from the same `[connections.snowflake]` block
+of `.streamlit/secrets.toml` that the Streamlit apps use.
+"""
+import argparse
+import os
+import sys
+import tarfile
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+from doc_extract import SUPPORTED_EXTENSIONS, build_record, create_documents_table
+
+
+def iter_source(path):
+    """Yield (file_name, bytes) for every supported document in a zip, tar or directory."""
+    if os.path.isdir(path):
+        for root, _, files in os.walk(path):
+            for name in sorted(files):
+                if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    with open(os.path.join(root, name), "rb") as f:
+                        yield name, f.read()
+
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            for info in zf.infolist():
+                name = os.path.basename(info.filename)
+                # Skip directories and macOS resource forks (__MACOSX/._file)
+                if info.is_dir() or name.startswith("._"):
+                    continue
+                if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    yield name, zf.read(info)
+
+    elif tarfile.is_tarfile(path):
+        # "r|*" reads the archive as a stream, one member at a time
+        with tarfile.open(path, "r|*") as tf:
+            for member in tf:
+                name = os.path.basename(member.name)
+                if not member.isfile() or name.startswith("._"):
+                    continue
+                if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    yield name, tf.extractfile(member).read()
+
+    else:
+        raise ValueError(f"Unsupported source (expected a zip, tar or directory): {path}")
+
+
+def _extract(item):
+    """Worker entry point: returns (file_name, byte_count, record or error message)."""
+    file_name, data = item
+    try:
+        return file_name, len(data), build_record(file_name, data)
+    except Exception as e:
+        return file_name, len(data), f"Error processing {file_name}: {str(e)}"
+
+
+def write_batch(session, records, database, schema, table_name):
+    """Bulk-load a batch of extracted records with a single write_pandas call."""
+    df = pd.DataFrame(records)[['file_name', 'file_type', 'file_size', 'extracted_text',
+                                'word_count', 'char_count']]
+    df.columns = ['FILE_NAME', 'FILE_TYPE', 'FILE_SIZE', 'EXTRACTED_TEXT',
+                  'WORD_COUNT', 'CHAR_COUNT']
+    session.write_pandas(df,
+                         table_name=table_name,
+                         database=database,
+                         schema=schema,
+                         overwrite=False)
+
+
+def ingest(session, source, database, schema, table_name,
+           workers=None, batch_size=500, replace=False, log=print):
+    """
+    Extract and load every document in `source`.
+
+    Memory is bounded by `batch_size` extracted records plus at most
+    2 x workers files in flight, regardless of the corpus size.
+    Returns a dict of counters and throughput figures.
+    """
+    create_documents_table(session, database, schema, table_name)
+    if replace:
+        session.sql(f"TRUNCATE TABLE {database}.{schema}.{table_name}").collect()
+
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = workers * 2
+
+    stats = {'docs': 0, 'failed': 0, 'bytes': 0, 'batches': 0}
+    batch = []
+    start = time.perf_counter()
+
+    def report(label):
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        log(f"{label}: {stats['docs']:,} docs ({stats['failed']:,} failed) in {elapsed:.1f}s | "
+            f"{stats['docs'] / elapsed:,.1f} docs/sec | "
+            f"{stats['bytes'] / 1_048_576 / elapsed:,.2f} MB/sec")
+
+    def collect(done):
+        for future in done:
+            file_name, size, result = future.result()
+            stats['bytes'] += size
+            if isinstance(result, dict):
+                batch.append(result)
+                stats['docs'] += 1
+            else:
+                stats['failed'] += 1
+                log(result or f"No text extracted from: {file_name}")
+
+        if len(batch) >= batch_size:
+            write_batch(session, batch, database, schema, table_name)
+            stats['batches'] += 1
+            batch.clear()
+            report(f"Batch {stats['batches']}")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for item in iter_source(source):
+            # Backpressure: never read more files than the pool can work on
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(pool.submit(_extract, item))
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+
+    if batch:
+        write_batch(session, batch, database, schema, table_name)
+        stats['batches'] += 1
+        batch.clear()
+
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    report("Done")
+    stats['seconds'] = elapsed
+    stats['docs_per_sec'] = stats['docs'] / elapsed
+    stats['mb_per_sec'] = stats['bytes'] / 1_048_576 / elapsed
+    return stats
+
+
+def create_session(secrets_path):
+    """Create a Snowpark session from the Streamlit secrets file."""
+    from snowflake.snowpark import Session
+
+    try:
+        import tomllib
+        with open(secrets_path, "rb") as f:
+            secrets = tomllib.load(f)
+    except ImportError:
+        import toml
+        secrets = toml.load(secrets_path)
+
+    return Session.builder.configs(secrets["connections"]["snowflake"]).create()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract documents from a zip/tar/directory into Snowflake.")
+    parser.add_argument("source", help="Path to a .zip, .tar(.gz) archive or a directory")
+    parser.add_argument("--database", default="RAG_DB")
+    parser.add_argument("--schema", default="RAG_SCHEMA")
+    parser.add_argument("--table", default="EXTRACTED_DOCUMENTS")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Extraction processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=500,
+                        help="Documents per write_pandas call")
+    parser.add_argument("--replace", action="store_true",
+                        help="Truncate the target table before loading")
+    parser.add_argument("--secrets", default=".streamlit/secrets.toml",
+                        help="Secrets file with a [connections.snowflake] block")
+    args = parser.parse_args(argv)
+
+    session = create_session(args.secrets)
+    try:
+        ingest(session, args.source, args.database, args.schema, args.table,
+               workers=args.workers, batch_size=args.batch_size, replace=args.replace)
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
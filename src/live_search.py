@@ -0,0 +1,157 @@
+"""
+Background search-as-you-type for Day 20.
+
+LiveSearcher runs searches on one worker thread. Each submit() replaces the
+pending query: the worker waits until submissions pause for `debounce`
+seconds, searches only the newest query, and drops results that were
+overtaken by a newer submission while in flight. When idle it prefetches
+the suggested follow-up queries, so picking one is instant. Calls to
+`search_fn` are spaced at least `debounce` seconds apart, so the service
+sees at most one request per debounce window.
+
+`search_fn(query)` runs on the worker thread, so it must not touch
+st.session_state; resolve services and settings on the script thread and
+close over them. Calls are made under `lock` (e.g.
+concurrent_runner.session_lock(session)) when one is given, since a Snowpark
+session is not documented as thread-safe. The worker stops by itself once
+nobody has called submit() or latest() for `idle_timeout` seconds, e.g.
+after the user left the page.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from embedding_cache import normalize_text
+
+
+class LiveSearcher:
+    """Debounced single-worker searcher with stale-result dropping and prefetch."""
+
+    def __init__(self, search_fn, debounce=0.4, max_results=64, lock=None, idle_timeout=30.0):
+        self.search_fn = search_fn
+        self.debounce = debounce
+        self.max_results = max_results
+        self.lock = lock
+        self.idle_timeout = idle_timeout
+        self._last_seen = time.monotonic()
+        self._results = OrderedDict()  # normalised query -> (results, error, seconds)
+        self._pending = None
+        self._prefetch = []
+        self._generation = 0
+        self._submitted_at = 0.0
+        self._last_call = 0.0
+        self._latest = None
+        self._stopped = False
+        self.stats = {'submitted': 0, 'searched': 0, 'dropped': 0, 'prefetched': 0, 'served_prefetched': 0}
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="live-search", daemon=True)
+        self._thread.start()
+
+    def submit(self, query, prefetch=()):
+        """Queue `query` (replacing any pending one) and the suggestions to prefetch after it."""
+        key = normalize_text(query)
+        with self._cond:
+            self._last_seen = time.monotonic()
+            if not key or (self._latest and self._latest[0] == key and self._pending is None):
+                return
+            if self._pending == key:
+                return
+            self.stats['submitted'] += 1
+            self._generation += 1
+            self._prefetch = [normalize_text(q) for q in prefetch if normalize_text(q) not in (key, "")]
+            if key in self._results:
+                # Already searched (or prefetched): show it without a service call
+                self._latest = (key, self._generation) + self._results[key]
+                self.stats['served_prefetched'] += 1
+                self._pending = None
+            else:
+                self._pending = key
+                self._submitted_at = time.monotonic()
+            self._cond.notify()
+
+    def latest(self):
+        """(query, generation, results, error, seconds) of the newest completed search, or None."""
+        with self._cond:
+            self._last_seen = time.monotonic()
+            return self._latest
+
+    def pending(self):
+        with self._cond:
+            return self._pending
+
+    @property
+    def stopped(self):
+        with self._cond:
+            return self._stopped
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def _idle(self):
+        # Called with the lock held
+        if time.monotonic() - self._last_seen > self.idle_timeout:
+            self._stopped = True
+        return self._stopped
+
+    def _store(self, key, outcome):
+        self._results[key] = outcome
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
+
+    def _wait_turn(self):
+        # Called with the lock held: wait for the typing pause and the rate limit
+        while not self._stopped:
+            now = time.monotonic()
+            ready_at = max(self._last_call + self.debounce,
+                           self._submitted_at + self.debounce if self._pending else 0.0)
+            if now >= ready_at:
+                return
+            self._cond.wait(ready_at - now)
+
+    def _call(self, key):
+        start = time.perf_counter()
+        try:
+            if self.lock is not None:
+                with self.lock:
+                    outcome = (self.search_fn(key), None)
+            else:
+                outcome = (self.search_fn(key), None)
+        except Exception as e:
+            outcome = (None, str(e))
+        return outcome + ((time.perf_counter() - start) * 1000,)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._idle() and self._pending is None and not self._prefetch:
+                    self._cond.wait(self.idle_timeout)
+                self._wait_turn()
+                if self._stopped:
+                    return
+                if self._pending is not None:
+                    key, generation, prefetch = self._pending, self._generation, False
+                    self._pending = None
+                elif self._prefetch:
+                    key, generation, prefetch = self._prefetch.pop(0), None, True
+                    if key in self._results:
+                        continue
+                else:
+                    continue
+                self._last_call = time.monotonic()
+
+            outcome = self._call(key)
+
+            with self._cond:
+                self.stats['prefetched' if prefetch else 'searched'] += 1
+                if outcome[1] is None:
+                    self._store(key, outcome)
+                if prefetch:
+                    continue
+                if generation == self._generation:
+                    self._latest = (key, generation) + outcome
+                else:
+                    # Overtaken by a newer query while in flight
+                    self.stats['dropped'] += 1
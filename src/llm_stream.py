@@ -0,0 +1,26 @@
+"""
+Streaming Cortex COMPLETE calls for the RAG pages (Days 21-22).
+
+stream_complete() yields the answer as it is generated, for st.write_stream,
+and records time-to-first-token and total generation time, so pages can
+report retrieval, first token and total latency separately.
+"""
+import time
+
+
+def stream_complete(session, model, prompt, timings):
+    """
+    Yield answer text chunks from snowflake.cortex.Complete(stream=True).
+
+    Fills `timings` with ttft_ms (first chunk) and generate_ms (last chunk),
+    both measured from the call.
+    """
+    from snowflake.cortex import Complete
+
+    start = time.perf_counter()
+    for chunk in Complete(model=model, prompt=prompt, session=session, stream=True):
+        if 'ttft_ms' not in timings:
+            timings['ttft_ms'] = (time.perf_counter() - start) * 1000
+        yield chunk
+    timings['generate_ms'] = (time.perf_counter() - start) * 1000
+    timings.setdefault('ttft_ms', timings['generate_ms'])
@@ -0,0 +1,152 @@
+"""
+Quantized embeddings for local similarity search.
+
+QuantizedIndex keeps compact codes in memory and scans those; the best
+`candidates` are then re-ranked exactly against the float32 vectors, which
+can stay memory-mapped on disk (vector_store.VectorStore) so only the
+candidate rows are ever paged in.
+
+    int8    per-dimension scalar quantization, 768 bytes/vector (4x smaller)
+    binary  1 sign bit per dimension, 96 bytes/vector (32x smaller),
+            ranked by Hamming distance
+"""
+import numpy as np
+
+from ann_index import _normalize
+from vector_store import sync_vector_store
+
+# Popcount of every byte value, for NumPy builds without np.bitwise_count
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(words):
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words)
+    return _POPCOUNT[words.view(np.uint8)].reshape(*words.shape, -1).sum(axis=-1)
+
+
+class ScalarQuantizer:
+    """Map each dimension's [min, max] range linearly onto int8."""
+
+    def fit(self, vectors):
+        self.low = vectors.min(axis=0)
+        self.scale = np.maximum(vectors.max(axis=0) - self.low, 1e-12) / 255.0
+        return self
+
+    def encode(self, vectors):
+        # Rows outside the fitted sample's range saturate instead of wrapping around
+        return np.clip(np.rint((vectors - self.low) / self.scale) - 128, -128, 127).astype(np.int8)
+
+    def scores(self, codes, query, block=2048):
+        """Approximate dot products of `query` with the decoded codes, without decoding them all."""
+        # x ≈ low + scale * (code + 128)  =>  q·x ≈ q·low + 128 * (q*scale)·1 + (q*scale)·code
+        weights = (query * self.scale).astype(np.float32)
+        offset = float(query @ self.low) + 128.0 * float(weights.sum())
+        out = np.empty(len(codes), dtype=np.float32)
+        for i in range(0, len(codes), block):
+            out[i:i + block] = codes[i:i + block].astype(np.float32) @ weights
+        return out + offset
+
+
+class BinaryQuantizer:
+    """One bit per dimension: is the value above that dimension's mean?"""
+
+    def fit(self, vectors):
+        self.mean = vectors.mean(axis=0)
+        return self
+
+    def encode(self, vectors):
+        # 768 bits = 12 uint64 words per vector
+        return np.packbits(vectors > self.mean, axis=1).view(np.uint64)
+
+    def scores(self, codes, query):
+        """Negated Hamming distance to the query's code (higher is closer)."""
+        distances = _popcount(codes ^ self.encode(query[None, :])).sum(axis=1, dtype=np.int32)
+        return -distances.astype(np.float32)
+
+
+QUANTIZERS = {'int8': ScalarQuantizer, 'binary': BinaryQuantizer}
+
+
+class QuantizedIndex:
+    """
+    Brute-force scan over quantized codes, with exact float32 re-ranking.
+
+    `embeddings` is an embeddings.EmbeddingMatrix (its matrix may be a
+    memory map). Cosine similarity, like ann_index.IVFIndex, and the same
+    search(query_vector, k) API.
+    """
+
+    def __init__(self, embeddings, method="binary", candidates=200, rerank=True,
+                 sample_rows=100_000, block=65536, seed=0):
+        if method not in QUANTIZERS:
+            raise ValueError(f"Unknown quantization method: {method}")
+        self.method = method
+        self.candidates = candidates
+        self.rerank = rerank
+        self.chunk_ids = np.asarray(embeddings.chunk_ids)
+        self.vectors = embeddings.matrix
+
+        self.quantizer = QUANTIZERS[method]()
+        self.codes = np.empty((0,), dtype=np.int8)
+        if len(self.chunk_ids):
+            # Fit on a sample and encode block by block, so a memory-mapped
+            # matrix is never loaded into memory as a whole
+            rng = np.random.default_rng(seed)
+            sample = np.sort(rng.choice(len(self), min(len(self), sample_rows), replace=False))
+            self.quantizer.fit(_normalize(self.vectors[sample]))
+            self.codes = np.concatenate([
+                self.quantizer.encode(_normalize(self.vectors[i:i + block]))
+                for i in range(0, len(self), block)
+            ])
+
+    def __len__(self):
+        return len(self.chunk_ids)
+
+    @property
+    def nbytes(self):
+        """Memory held by the codes (the float32 vectors can stay on disk)."""
+        return self.codes.nbytes + self.chunk_ids.nbytes
+
+    def search(self, query_vector, k=5, candidates=None, allowed=None):
+        """
+        Return (chunk_ids, scores) of the `k` most similar vectors, best first.
+
+        With `allowed` (an array of chunk ids) only the codes of those ids are scanned.
+        """
+        if len(self) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        query = _normalize(query_vector)[0]
+        if allowed is not None:
+            rows = np.flatnonzero(np.isin(self.chunk_ids, allowed))
+            if len(rows) == 0:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            scores = self.quantizer.scores(self.codes[rows], query)
+        else:
+            rows = None
+            scores = self.quantizer.scores(self.codes, query)
+
+        shortlist = min(max(candidates or self.candidates, k) if self.rerank else k, len(scores))
+        top = np.argpartition(-scores, shortlist - 1)[:shortlist]
+        if self.rerank:
+            # Exact cosine on the shortlist only; sorted rows read the memory map sequentially
+            top = np.sort(top if rows is None else rows[top])
+            scores = _normalize(self.vectors[top]) @ query
+        else:
+            scores = scores[top]
+            top = top if rows is None else rows[top]
+
+        k = min(k, len(top))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return self.chunk_ids[top[best]], scores[best]
+
+
+def open_quantized_index(session, full_embedding_table, method="binary", store=None):
+    """
+    Sync the local vector store for `full_embedding_table` and quantize it.
+
+    The store's memory map backs the re-ranking vectors. Returns (index, rows_added).
+    """
+    store, added = sync_vector_store(session, full_embedding_table, store)
+    return QuantizedIndex(store.load(), method=method), added
@@ -0,0 +1,53 @@
+"""
+Attribute filters for retrieval (Days 20-22).
+
+Filters use the Cortex Search filter syntax, so the same dict can be passed
+as `svc.search(..., filter=...)`:
+
+    {"@and": [{"@or": [{"@eq": {"FILE_NAME": "review-001.txt"}}, ...]},
+              {"@eq": {"CHUNK_TYPE": "full_review"}}]}
+
+`filter_sql()` translates one into a SQL predicate, so the local engines
+(ann_index, hybrid_search) apply the same filter to REVIEW_CHUNKS.
+"""
+
+FILTER_ATTRIBUTES = ("FILE_NAME", "CHUNK_TYPE")
+
+
+def build_filter(selections):
+    """
+    Filter for {attribute: [allowed values]}: values of one attribute are OR-ed,
+    attributes are AND-ed. Returns None when nothing is selected.
+    """
+    clauses = []
+    for attribute, values in selections.items():
+        values = list(dict.fromkeys(values or []))
+        if len(values) == 1:
+            clauses.append({"@eq": {attribute: values[0]}})
+        elif values:
+            clauses.append({"@or": [{"@eq": {attribute: value}} for value in values]})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"@and": clauses}
+
+
+def _literal(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def filter_sql(filter):
+    """SQL predicate equivalent to a filter built from @eq/@or/@and/@not."""
+    (operator, operand), = filter.items()
+    if operator == "@eq":
+        (column, value), = operand.items()
+        if column.upper() not in FILTER_ATTRIBUTES:
+            raise ValueError(f"Unsupported filter attribute: {column}")
+        return f"{column.upper()} = {_literal(value)}"
+    if operator in ("@and", "@or"):
+        joiner = " AND " if operator == "@and" else " OR "
+        return "(" + joiner.join(filter_sql(clause) for clause in operand) + ")"
+    if operator == "@not":
+        return f"NOT ({filter_sql(operand)})"
+    raise ValueError(f"Unsupported filter operator: {operator}")
@@ -0,0 +1,452 @@
+"""
+Cached Cortex Search service discovery for the search pages (Days 20-22).
+
+`SHOW CORTEX SEARCH SERVICES` is run once per TTL instead of on every rerun,
+and resolved service handles (Root -> database -> schema -> service) are kept
+per Snowpark session and service path, so a search only pays for the search
+call itself. `refresh_services()` forces a fresh listing, e.g. right after a
+service was created in Day 19.
+
+`cached_search()` puts a process-wide LRU + TTL result cache in front of
+`svc.search(...)`. Queries are whitespace-normalised, the cache is bounded in
+bytes, and entries are tied to the service's DATA_TIMESTAMP: once the
+service has refreshed its index, older results for it are dropped.
+`search_many()` runs a batch of queries concurrently through the same cache,
+each call on a worker session of its own (concurrent_runner.worker_pool).
+`service_status()` / `wait_until_ready()` report whether a newly created
+service has finished its first indexing run.
+
+`filter_controls()` renders FILE_NAME / CHUNK_TYPE pickers and returns a
+search_filters filter that every engine accepts. For a service, the values
+come from its source table, read from the service definition
+(`service_filter_table()`). Attributes with more than FILTER_VALUES_LIMIT
+values are searched by prefix instead of listed.
+
+`local_hybrid_engine()` is the in-app alternative to a service: a
+hybrid_search.HybridSearch over the Day 17/18 tables, kept per user session.
+"""
+import json
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import streamlit as st
+
+from concurrent_runner import AdaptiveRunner, worker_pool
+from embedding_cache import normalize_text
+from search_filters import FILTER_ATTRIBUTES, build_filter
+from table_meta import table_version
+
+SERVICE_LIST_TTL_SECONDS = 300
+SERVICE_STATE_TTL_SECONDS = 60
+FILTER_VALUES_LIMIT = 200
+
+# First `FROM <table>` of a service definition; the name may be quoted and partly qualified
+_FROM_TABLE_RE = re.compile(r'\bFROM\s+((?:"[^"]+"|[A-Za-z_][\w$]*)(?:\s*\.\s*(?:"[^"]+"|[A-Za-z_][\w$]*)){0,2})',
+                            re.IGNORECASE)
+
+
+def split_service_path(service_path):
+    """Split `DB.SCHEMA.SERVICE` into its three parts."""
+    parts = [p.strip() for p in service_path.split(".")]
+    if len(parts) != 3 or not all(parts):
+        raise ValueError("Service path must be in format: database.schema.service_name")
+    return tuple(parts)
+
+
+@st.cache_data(ttl=SERVICE_LIST_TTL_SECONDS, show_spinner=False)
+def _list_services(_session, version):
+    """Every visible service as `database.schema.name` (one metadata query)."""
+    try:
+        rows = _session.sql("SHOW CORTEX SEARCH SERVICES").collect()
+    except Exception:
+        # No warehouse / no privileges - the pages fall back to manual entry
+        return []
+    return [f"{row['database_name']}.{row['schema_name']}.{row['name']}" for row in rows]
+
+
+def list_services(session):
+    """Cached list of available Cortex Search services."""
+    return list(_list_services(session, st.session_state.get('_search_services_version', 0)))
+
+
+def refresh_services():
+    """Drop the cached service list and resolved handles."""
+    st.session_state['_search_services_version'] = st.session_state.get('_search_services_version', 0) + 1
+    st.session_state.pop('_search_service_handles', None)
+
+
+def get_service(session, service_path):
+    """
+    Resolve `service_path` to a Cortex Search service handle, memoized per session.
+
+    Raises ValueError if the path is not `database.schema.service_name`.
+    """
+    database, schema, name = split_service_path(service_path)
+    handles = st.session_state.setdefault('_search_service_handles', {})
+    # The handle keeps its session alive, so id(session) can't be reused while it is cached
+    key = (id(session), database, schema, name)
+    if key not in handles:
+        handles[key] = _resolve_service(session, database, schema, name)
+    return handles[key]
+
+
+def _resolve_service(session, database, schema, name):
+    from snowflake.core import Root
+
+    return Root(session).databases[database].schemas[schema].cortex_search_services[name]
+
+
+def service_status(session, service_path):
+    """
+    Current state of a service from DESCRIBE CORTEX SEARCH SERVICE (uncached).
+
+    Returns a dict with exists, ready, indexing_state, serving_state,
+    source_rows, data_timestamp and error. A service is ready once its first
+    refresh has produced an index (DATA_TIMESTAMP is set) and it is serving.
+    """
+    database, schema, name = split_service_path(service_path)
+    try:
+        rows = session.sql(f"DESCRIBE CORTEX SEARCH SERVICE {database}.{schema}.{name}").collect()
+    except Exception as e:
+        if "does not exist" in str(e).lower():
+            return {'exists': False, 'ready': False, 'error': None}
+        raise
+    info = {k.lower(): v for k, v in rows[0].as_dict().items()} if rows else {}
+    serving_state = str(info.get('serving_state') or "").upper()
+    status = {
+        'exists': bool(rows),
+        'indexing_state': str(info.get('indexing_state') or "").upper() or None,
+        'serving_state': serving_state or None,
+        'source_rows': info.get('source_data_num_rows'),
+        'data_timestamp': info.get('data_timestamp'),
+        'error': info.get('indexing_error') or None,
+    }
+    status['ready'] = (status['exists'] and not status['error'] and status['data_timestamp'] is not None
+                       and serving_state in ("", "ACTIVE"))
+    return status
+
+
+def source_table_of(definition, database, schema):
+    """
+    The table a service definition selects FROM, qualified with the service's
+    database and schema where the definition leaves them out; None if not found.
+    """
+    match = _FROM_TABLE_RE.search(definition or "")
+    if not match:
+        return None
+    parts = re.findall(r'"[^"]+"|[^\s.]+', match.group(1))
+    return ".".join([database, schema][:3 - len(parts)] + parts)
+
+
+@st.cache_data(ttl=SERVICE_LIST_TTL_SECONDS, show_spinner=False)
+def _service_source_table(_session, database, schema, name, version):
+    try:
+        rows = _session.sql(f"DESCRIBE CORTEX SEARCH SERVICE {database}.{schema}.{name}").collect()
+    except Exception:
+        return None
+    info = {k.lower(): v for k, v in rows[0].as_dict().items()} if rows else {}
+    return source_table_of(info.get('definition'), database, schema)
+
+
+def service_filter_table(session, service_path, key):
+    """
+    Table whose FILE_NAME / CHUNK_TYPE values filter `service_path`: its source
+    table from DESCRIBE CORTEX SEARCH SERVICE, or - if that can't be read - one
+    the user enters. Returns None while there is neither.
+    """
+    try:
+        database, schema, name = split_service_path(service_path)
+    except ValueError:
+        return None
+    table = _service_source_table(session, database, schema, name,
+                                  st.session_state.get('_search_services_version', 0))
+    if table:
+        return table
+    return st.text_input(
+        "Filter values from table:",
+        key=f"{key}_table",
+        placeholder="database.schema.table",
+        help="The service's source table could not be read from its definition; "
+             "enter the table it indexes to filter by its attributes"
+    ).strip() or None
+
+
+def next_poll_delay(delay, max_delay=30.0):
+    """Exponential backoff for status polling: double the delay (with jitter), capped at max_delay."""
+    return min(max_delay, delay * 2) * random.uniform(0.8, 1.0)
+
+
+def wait_until_ready(session, service_path, timeout=600, initial_delay=2.0, max_delay=30.0, on_poll=None):
+    """
+    Block until `service_path` has finished indexing; returns its final status.
+
+    Polls service_status() with exponential backoff; `on_poll(status,
+    elapsed_seconds)` is called after each poll. Raises RuntimeError if
+    indexing failed and TimeoutError after `timeout` seconds.
+    """
+    start = time.monotonic()
+    delay = initial_delay
+    while True:
+        status = service_status(session, service_path)
+        elapsed = time.monotonic() - start
+        if on_poll:
+            on_poll(status, elapsed)
+        if status['ready']:
+            return status
+        if status['error']:
+            raise RuntimeError(f"Indexing {service_path} failed: {status['error']}")
+        if elapsed + delay > timeout:
+            raise TimeoutError(f"{service_path} was not ready after {timeout:.0f}s")
+        time.sleep(delay)
+        delay = next_poll_delay(delay, max_delay)
+
+
+@st.cache_data(ttl=SERVICE_STATE_TTL_SECONDS, show_spinner=False)
+def _data_timestamp(_session, database, schema, name, version):
+    pattern = name.strip('"')
+    try:
+        rows = _session.sql(f"SHOW CORTEX SEARCH SERVICES LIKE '{pattern}' IN SCHEMA {database}.{schema}").collect()
+    except Exception:
+        return ""
+    return str(rows[0]['data_timestamp']) if rows else ""
+
+
+def service_version(session, service_path):
+    """
+    When the service last refreshed its index (DATA_TIMESTAMP), checked at most once a minute.
+
+    Returns "" if it can't be read; cached results then just expire by TTL.
+    """
+    database, schema, name = split_service_path(service_path)
+    return _data_timestamp(session, database, schema, name,
+                           st.session_state.get('_search_services_version', 0))
+
+
+class SearchResultCache:
+    """
+    LRU + TTL cache of Cortex Search results, bounded by their (JSON) size in bytes.
+
+    Thread-safe; `stats()` reports hits, misses, evictions and the current size.
+    """
+
+    def __init__(self, max_bytes=32 * 1_048_576, ttl_seconds=600):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counts = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0, 'invalidated': 0}
+
+    @staticmethod
+    def key(service_path, query, columns, limit, filter=None):
+        return (service_path.upper(), normalize_text(query), tuple(sorted(columns)), int(limit),
+                json.dumps(filter, sort_keys=True) if filter else "")
+
+    def _drop(self, key):
+        self._bytes -= self._entries.pop(key)[2]
+
+    def _check_version(self, service, version):
+        # A newer index for this service: every result cached for it is stale
+        if self._versions.get(service, version) != version:
+            for key in [k for k in self._entries if k[0] == service]:
+                self._drop(key)
+                self._counts['invalidated'] += 1
+        self._versions[service] = version
+
+    def get(self, key, version=""):
+        with self._lock:
+            self._check_version(key[0], version)
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] > self.ttl_seconds:
+                self._drop(key)
+                self._counts['expired'] += 1
+                entry = None
+            if entry is None:
+                self._counts['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counts['hits'] += 1
+            return [dict(item) for item in entry[0]]
+
+    def put(self, key, results, version=""):
+        results = [dict(item) for item in results]
+        size = len(json.dumps(results, default=str))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._check_version(key[0], version)
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (results, time.monotonic(), size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self._counts['evictions'] += 1
+
+    def search(self, svc, service_path, query, columns, limit, filter=None, version=""):
+        """`svc.search(...)` through the cache; returns the result dicts."""
+        key = self.key(service_path, query, columns, limit, filter)
+        results = self.get(key, version)
+        if results is None:
+            kwargs = {'filter': filter} if filter else {}
+            results = svc.search(query=query, columns=list(columns), limit=limit, **kwargs).results
+            self.put(key, results, version)
+            results = [dict(item) for item in results]
+        return results
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counts['hits'] + self._counts['misses']
+            return dict(self._counts, entries=len(self._entries), size_mb=self._bytes / 1_048_576,
+                        hit_rate=self._counts['hits'] / lookups if lookups else 0.0)
+
+
+@st.cache_resource(show_spinner=False)
+def result_cache():
+    """The result cache shared by every page and user session of this app process."""
+    return SearchResultCache()
+
+
+def cached_search(session, service_path, query, columns, limit, filter=None):
+    """Search `service_path` through the shared result cache; returns a list of result dicts."""
+    return result_cache().search(get_service(session, service_path), service_path, query, columns,
+                                 limit, filter=filter, version=service_version(session, service_path))
+
+
+def search_many(session, service_path, queries, columns, limit, filter=None, max_workers=8, progress=None):
+    """
+    Search many queries concurrently; results come back in query order.
+
+    Duplicate queries (after normalisation) are searched once. Calls go
+    through the result cache, at most `max_workers` at a time, each on a
+    worker session of its own (one at a time where worker_pool() only has
+    `session`), and are retried with backoff when the service throttles. `progress(done, total,
+    queries_per_sec)` is called as searches finish. Returns (results, stats):
+    one list of result dicts per query, and stats with each query's latency
+    in milliseconds (latencies_ms), p50_ms, p95_ms, seconds, queries_per_sec
+    and max_in_flight (1 when the calls could not overlap).
+    """
+    database, schema, name = split_service_path(service_path)
+    version = service_version(session, service_path)
+    cache = result_cache()
+    queries = list(queries)
+    unique = list(dict.fromkeys(cache.key(service_path, q, columns, limit, filter) for q in queries))
+    latencies = {}
+    # One service handle per worker session (st.session_state is not available on worker threads)
+    handles = {}
+
+    def search_one(worker_session, key):
+        svc = handles.get(id(worker_session))
+        if svc is None:
+            svc = handles[id(worker_session)] = _resolve_service(worker_session, database, schema, name)
+        start = time.perf_counter()
+        results = cache.search(svc, service_path, key[1], columns, limit, filter=filter, version=version)
+        latencies[key] = (time.perf_counter() - start) * 1000
+        return results
+
+    runner = AdaptiveRunner(search_one, max_in_flight=max_workers, initial_in_flight=max_workers,
+                            pool=worker_pool(session))
+    by_key = dict(zip(unique, runner.map(unique, progress=progress)))
+
+    keys = [cache.key(service_path, q, columns, limit, filter) for q in queries]
+    latencies_ms = [latencies[key] for key in keys]
+    ordered = sorted(latencies_ms)
+    seconds = runner.stats['seconds']
+    stats = {
+        'latencies_ms': latencies_ms,
+        'p50_ms': ordered[len(ordered) // 2] if ordered else 0.0,
+        'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] if ordered else 0.0,
+        'seconds': seconds,
+        'queries_per_sec': len(queries) / seconds if seconds else 0.0,
+        'retries': runner.stats['retries'],
+        'max_in_flight': runner.max_in_flight,
+    }
+    return [[dict(item) for item in by_key[key]] for key in keys], stats
+
+
+def local_hybrid_engine(session, full_chunk_table, full_embedding_table, refresh=False):
+    """
+    BM25 + vector engine over the chunk and embedding tables, opened once per user session.
+
+    `refresh=True` picks up rows added since it was opened.
+    """
+    from ann_index import open_index
+    from hybrid_search import open_hybrid_search
+    from vector_store import VectorStore, store_path
+
+    key = (full_chunk_table.upper(), full_embedding_table.upper())
+    cached = st.session_state.get('_hybrid_engine')
+    if refresh or not cached or cached[0] != key:
+        index, _ = open_index(session, full_embedding_table, store=VectorStore(store_path(full_embedding_table)))
+        engine, _ = open_hybrid_search(session, full_chunk_table, index)
+        st.session_state['_hybrid_engine'] = cached = (key, engine)
+    return cached[1]
+
+
+@st.cache_data(ttl=SERVICE_LIST_TTL_SECONDS, show_spinner=False)
+def _attribute_values(_session, full_chunk_table, attribute, prefix, version):
+    """Up to FILTER_VALUES_LIMIT + 1 distinct values of `attribute` (starting with `prefix`, if given)."""
+    where = f"{attribute} IS NOT NULL"
+    if prefix:
+        literal = prefix.replace("'", "''")
+        where += f" AND STARTSWITH(LOWER({attribute}), LOWER('{literal}'))"
+    try:
+        rows = _session.sql(f"""
+            SELECT DISTINCT {attribute}
+            FROM {full_chunk_table}
+            WHERE {where}
+            ORDER BY {attribute}
+            LIMIT {FILTER_VALUES_LIMIT + 1}
+        """).collect()
+    except Exception:
+        return []
+    return [row[0] for row in rows]
+
+
+def filter_controls(session, full_chunk_table, key):
+    """
+    Multiselects for the filterable attributes of `full_chunk_table`.
+
+    Values are cached against the table's table_version. An attribute with
+    more than FILTER_VALUES_LIMIT values gets a prefix search box, and only
+    values matching it are listed. Returns a filter for the selected values,
+    or None (no filter).
+    """
+    if not full_chunk_table:
+        return None
+    try:
+        version = table_version(full_chunk_table)
+    except ValueError:
+        return None
+    labels = {'FILE_NAME': "Files", 'CHUNK_TYPE': "Chunk Types"}
+    selections = {}
+    for attribute in FILTER_ATTRIBUTES:
+        label = labels.get(attribute, attribute)
+        values = _attribute_values(session, full_chunk_table, attribute, "", version)
+        if not values:
+            continue
+        if len(values) > FILTER_VALUES_LIMIT:
+            # Too many to list: search by prefix, keeping earlier picks selectable
+            prefix = st.text_input(f"Find {label}:", key=f"{key}_{attribute}_prefix",
+                                   placeholder="Type the start of a value").strip()
+            values = _attribute_values(session, full_chunk_table, attribute, prefix, version) if prefix else []
+            if len(values) > FILTER_VALUES_LIMIT:
+                st.caption(f"Showing the first {FILTER_VALUES_LIMIT} matches - keep typing to narrow them down")
+            values = sorted(set(values[:FILTER_VALUES_LIMIT]) | set(st.session_state.get(f"{key}_{attribute}", [])))
+        selections[attribute] = st.multiselect(
+            f"Filter {label}:",
+            values,
+            key=f"{key}_{attribute}",
+            help="Only search chunks with these values (empty = all)"
+        )
+    return build_filter(selections)
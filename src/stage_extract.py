@@ -0,0 +1,93 @@
+"""
+Pushdown document extraction for Day 16.
+
+Instead of parsing PDFs with pypdf inside the Streamlit process, the raw files
+are streamed to an internal stage with put_stream (as Days 24/25 do for images
+and audio) and parsed set-based in the warehouse with
+SNOWFLAKE.CORTEX.PARSE_DOCUMENT, writing straight into EXTRACTED_DOCUMENTS.
+The app container only moves bytes.
+"""
+import io
+import time
+
+DOCUMENT_STAGE = "DOCUMENT_STAGE"
+
+
+def ensure_document_stage(session, database, schema, stage=DOCUMENT_STAGE):
+    """Create the upload stage (server-side encryption is required by PARSE_DOCUMENT)."""
+    full_stage_name = f"{database}.{schema}.{stage}"
+    session.sql(f"""
+    CREATE STAGE IF NOT EXISTS {full_stage_name}
+        DIRECTORY = ( ENABLE = true )
+        ENCRYPTION = ( TYPE = 'SNOWFLAKE_SSE' )
+    """).collect()
+    return f"@{full_stage_name}"
+
+
+def new_batch_prefix():
+    """Unique stage folder for one upload batch, so extraction only sees its own files."""
+    return f"batch_{int(time.time() * 1000)}"
+
+
+def upload_to_stage(session, stage_name, prefix, file_name, data):
+    """Stream raw file bytes to `<stage>/<prefix>/<file_name>` without compression."""
+    session.file.put_stream(
+        io.BytesIO(data),
+        f"{stage_name}/{prefix}/{file_name}",
+        overwrite=True,
+        auto_compress=False
+    )
+
+
+def extract_staged_documents(session, full_table_name, stage_name, prefix, staged_files,
+                             file_type="PDF", mode="OCR", remove_after=True):
+    """
+    Parse staged files in the warehouse and insert them into `full_table_name`.
+
+    `staged_files` is a list of {'file_name', 'file_size'} dicts for files
+    uploaded under `prefix`; with `remove_after` they are removed from the
+    stage whether or not parsing succeeds. Returns the number of documents
+    inserted.
+    """
+    if not staged_files:
+        return 0
+
+    values = ",\n".join(
+        f"('{f['file_name'].replace(chr(39), chr(39) * 2)}', {int(f['file_size'])})"
+        for f in staged_files
+    )
+
+    # One set-based statement: parse every staged file and derive the same
+    # WORD_COUNT / CHAR_COUNT metadata the local extractor computes
+    insert_sql = f"""
+    INSERT INTO {full_table_name}
+        (FILE_NAME, FILE_TYPE, FILE_SIZE, EXTRACTED_TEXT, WORD_COUNT, CHAR_COUNT)
+    SELECT
+        FILE_NAME,
+        '{file_type}',
+        FILE_SIZE,
+        EXTRACTED_TEXT,
+        ARRAY_SIZE(SPLIT(REGEXP_REPLACE(TRIM(EXTRACTED_TEXT), '\\\\s+', ' '), ' ')),
+        LENGTH(EXTRACTED_TEXT)
+    FROM (
+        SELECT
+            f.column1 AS FILE_NAME,
+            f.column2 AS FILE_SIZE,
+            SNOWFLAKE.CORTEX.PARSE_DOCUMENT(
+                '{stage_name}',
+                '{prefix}/' || f.column1,
+                {{'mode': '{mode}'}}
+            ):content::VARCHAR AS EXTRACTED_TEXT
+        FROM VALUES
+        {values} AS f
+    )
+    WHERE EXTRACTED_TEXT IS NOT NULL AND TRIM(EXTRACTED_TEXT) <> ''
+    """
+    try:
+        result = session.sql(insert_sql).collect()
+    finally:
+        if remove_after:
+            # Staged copies are no longer needed once the text is in the table - or once
+            # parsing failed, since the next attempt uploads a new batch anyway
+            session.sql(f"REMOVE {stage_name}/{prefix}/").collect()
+    return int(result[0][0]) if result else 0
@@ -0,0 +1,176 @@
+"""
+Server-side table browser for the RAG pipeline pages (Days 16-18).
+
+Pagination, projection and sorting are pushed down to SQL and only one page
+is fetched at a time. Pages are read by keyset: rows are ordered by the sort
+column plus the table's unique key column (so ties have a stable order), and
+each page seeks past the (sort value, key) of the previous page's last row
+instead of skipping rows with OFFSET, so reading page 1,000 of a 1M-row table
+costs the same as reading page 1. Heavy columns (full text, vectors) are not part of
+the page; pages load them for a single row with `fetch_row()` when it is
+opened.
+"""
+import datetime
+import math
+
+import streamlit as st
+
+from table_meta import table_row_count, table_version
+
+PAGE_SIZES = [25, 50, 100, 250]
+BROWSER_TTL_SECONDS = 60
+
+
+def _literal(value):
+    if hasattr(value, "item"):
+        value = value.item()  # NumPy scalar from a pandas row
+    if isinstance(value, datetime.datetime):
+        return f"'{value.isoformat(sep=' ')}'::TIMESTAMP_NTZ"
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _ordering(order_by, key_column, descending):
+    direction = "DESC" if descending else "ASC"
+    return f"{order_by} {direction} NULLS LAST, {key_column} {direction}"
+
+
+def _after(order_by, key_column, descending, anchor):
+    """Predicate for the rows after `anchor` = (sort value, key) in _ordering() order."""
+    if anchor is None:
+        return "TRUE"
+    value, key = anchor
+    op = "<" if descending else ">"
+    if value is None:
+        # NULL sort values come last, ordered by key only
+        return f"({order_by} IS NULL AND {key_column} {op} {_literal(key)})"
+    return (f"({order_by} {op} {_literal(value)}"
+            f" OR ({order_by} = {_literal(value)} AND {key_column} {op} {_literal(key)})"
+            f" OR {order_by} IS NULL)")
+
+
+@st.cache_data(ttl=BROWSER_TTL_SECONDS, show_spinner=False)
+def fetch_page(_session, full_table_name, columns, order_by, key_column, descending, page_size, anchor, version):
+    """
+    Fetch the page of projected columns that follows `anchor` (None for the first page).
+
+    Returns (page, next_anchor), next_anchor being the (sort value, key) of the page's last row.
+    """
+    df = _session.sql(f"""
+        SELECT {", ".join(columns)}, {order_by} AS PAGE_SORT_VALUE, {key_column} AS PAGE_ROW_KEY
+        FROM {full_table_name}
+        WHERE {_after(order_by, key_column, descending, anchor)}
+        ORDER BY {_ordering(order_by, key_column, descending)}
+        LIMIT {int(page_size)}
+    """).to_pandas()
+    next_anchor = None
+    if len(df) > 0:
+        value, key = df['PAGE_SORT_VALUE'].iloc[-1], df['PAGE_ROW_KEY'].iloc[-1]
+        next_anchor = (None if value is None or value != value else value, key)
+    return df.drop(columns=['PAGE_SORT_VALUE', 'PAGE_ROW_KEY']), next_anchor
+
+
+@st.cache_data(ttl=BROWSER_TTL_SECONDS, show_spinner=False)
+def fetch_anchor(_session, full_table_name, order_by, key_column, descending, anchor, skip, version):
+    """
+    (sort value, key) of the `skip`-th row after `anchor`, for jumping to a page
+    never visited. Only the two key columns are read; returns None past the end.
+    """
+    row = _session.sql(f"""
+        SELECT {order_by} AS PAGE_SORT_VALUE, {key_column} AS PAGE_ROW_KEY
+        FROM {full_table_name}
+        WHERE {_after(order_by, key_column, descending, anchor)}
+        ORDER BY {_ordering(order_by, key_column, descending)}
+        LIMIT 1 OFFSET {int(skip) - 1}
+    """).collect()
+    return (row[0]['PAGE_SORT_VALUE'], row[0]['PAGE_ROW_KEY']) if row else None
+
+
+@st.cache_data(ttl=BROWSER_TTL_SECONDS, show_spinner=False)
+def fetch_aggregates(_session, full_table_name, expressions, version):
+    """Table-wide summary values (e.g. SUM(WORD_COUNT)) in a single aggregate query."""
+    row = _session.sql(f"""
+        SELECT {", ".join(f"{expr} AS {alias}" for alias, expr in expressions)}
+        FROM {full_table_name}
+    """).collect()[0]
+    return {alias: row[alias] for alias, _ in expressions}
+
+
+@st.cache_data(ttl=BROWSER_TTL_SECONDS, show_spinner=False)
+def fetch_row(_session, full_table_name, columns, key_column, key_value, version):
+    """Load (heavy) columns for one row, only when the user opens it."""
+    df = _session.sql(f"""
+        SELECT {", ".join(columns)}
+        FROM {full_table_name}
+        WHERE {key_column} = {int(key_value)}
+    """).to_pandas()
+    return df.iloc[0] if len(df) > 0 else None
+
+
+def _page_anchor(session, full_table_name, order_by, key_column, descending, page_size, page, version, anchors):
+    """Anchor (last row of the previous page) for `page`, seeking from the closest page already seen."""
+    if page == 1:
+        return None
+    if page - 1 in anchors:
+        return anchors[page - 1]
+    known = max((p for p in anchors if p < page), default=0)
+    anchor = fetch_anchor(session, full_table_name, order_by, key_column, descending,
+                          anchors.get(known), (page - 1 - known) * page_size, version)
+    if anchor is not None:
+        anchors[page - 1] = anchor
+    return anchor
+
+
+def table_browser(session, full_table_name, columns, sort_columns, key, key_column,
+                  descending=False, default_page_size=50):
+    """
+    Render a paginated, sortable view of `full_table_name` and return the current page.
+
+    `columns` are SQL select expressions (use aliases such as
+    "LEFT(CHUNK_TEXT, 100) AS TEXT_PREVIEW" to keep heavy columns out of the
+    page); `sort_columns` lists the plain columns users may sort by, the first
+    being the default. `key_column` is the table's unique key, used to break
+    ties and to seek between pages. Returns None if the table doesn't exist.
+    """
+    total_rows = table_row_count(session, full_table_name)
+    if total_rows is None:
+        st.info(":material/inbox: Table doesn't exist yet.")
+        return None
+
+    col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+    with col1:
+        order_by = st.selectbox("Sort by", sort_columns, key=f"{key}_sort")
+    with col2:
+        descending = st.toggle("Descending", value=descending, key=f"{key}_desc")
+    with col3:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES,
+                                 index=PAGE_SIZES.index(default_page_size), key=f"{key}_page_size")
+    with col4:
+        page_count = max(1, math.ceil(total_rows / page_size))
+        # Keep the page in range when the page size or row count changes
+        if st.session_state.get(f"{key}_page", 1) > page_count:
+            st.session_state[f"{key}_page"] = page_count
+        page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1,
+                               key=f"{key}_page")
+
+    # Page boundaries seen so far for this ordering, so next/previous pages are a single seek
+    version = table_version(full_table_name)
+    ordering = (full_table_name, order_by, descending, page_size, version)
+    if st.session_state.get(f"{key}_ordering") != ordering:
+        st.session_state[f"{key}_ordering"] = ordering
+        st.session_state[f"{key}_anchors"] = {}
+    anchors = st.session_state[f"{key}_anchors"]
+
+    offset = (page - 1) * page_size
+    anchor = _page_anchor(session, full_table_name, order_by, key_column, descending,
+                          page_size, page, version, anchors)
+    page_df, next_anchor = fetch_page(session, full_table_name, tuple(columns), order_by, key_column,
+                                      descending, page_size, anchor, version)
+    if next_anchor is not None:
+        anchors[page] = next_anchor
+
+    st.dataframe(page_df, use_container_width=True, hide_index=True)
+    if len(page_df) > 0:
+        st.caption(f"Rows {offset + 1:,}-{offset + len(page_df):,} of {total_rows:,} · page {page} of {page_count:,}")
+    return page_df
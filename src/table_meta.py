@@ -0,0 +1,97 @@
+"""
+Cached table metadata for the RAG pipeline pages (Days 16-18).
+
+Instead of probing each table with `SELECT COUNT(*)` on every rerun (and using
+a failing query as an existence check), row counts for a whole schema are read
+from INFORMATION_SCHEMA.TABLES in one query and cached for a short TTL.
+Pages call `invalidate_table()` after writing so the change shows up
+immediately - in every session, since the version counters it bumps are
+shared process-wide.
+"""
+import streamlit as st
+
+TABLE_META_TTL_SECONDS = 30
+
+
+def split_table_name(full_table_name):
+    """Split `DB.SCHEMA.TABLE` into upper-cased (database, schema, table) parts."""
+    parts = [p.strip().strip('"').upper() for p in full_table_name.split(".")]
+    if len(parts) != 3:
+        raise ValueError(f"Table name must be in format: database.schema.table (got {full_table_name})")
+    return tuple(parts)
+
+
+@st.cache_data(ttl=TABLE_META_TTL_SECONDS, show_spinner=False)
+def _schema_row_counts(_session, database, schema, version):
+    """Return {TABLE_NAME: ROW_COUNT} for every table in a schema (one query)."""
+    try:
+        rows = _session.sql(f"""
+            SELECT TABLE_NAME, ROW_COUNT
+            FROM {database}.INFORMATION_SCHEMA.TABLES
+            WHERE TABLE_SCHEMA = '{schema}'
+        """).collect()
+    except Exception:
+        # Database doesn't exist (or isn't visible) - so no tables exist either
+        return {}
+    return {row['TABLE_NAME']: int(row['ROW_COUNT'] or 0) for row in rows}
+
+
+@st.cache_resource(show_spinner=False)
+def _schema_versions():
+    """Process-wide {(database, schema): version}, shared by every session."""
+    return {}
+
+
+def _schema_version(database, schema):
+    # Bumped by invalidate_table(); part of the cache key so a write forces a fresh read
+    return _schema_versions().get((database, schema), 0)
+
+
+def table_version(full_table_name):
+    """
+    Version counter for the schema of `full_table_name`, bumped by invalidate_table().
+
+    Other cached readers (e.g. the table browser) pass it as a cache-key
+    argument so they also refresh after the page writes.
+    """
+    database, schema, _ = split_table_name(full_table_name)
+    return _schema_version(database, schema)
+
+
+def get_row_counts(session, full_table_names):
+    """
+    Row counts for several tables, batched into one metadata query per schema.
+
+    Returns {full_table_name: row_count}, with None for tables that don't exist.
+    """
+    parsed = {}
+    for name in full_table_names:
+        try:
+            parsed[name] = split_table_name(name)
+        except ValueError:
+            # Incomplete name (e.g. while the user is still typing) - can't exist
+            parsed[name] = None
+
+    schema_counts = {}
+    for database, schema, _ in filter(None, parsed.values()):
+        if (database, schema) not in schema_counts:
+            schema_counts[(database, schema)] = _schema_row_counts(
+                session, database, schema, _schema_version(database, schema)
+            )
+
+    return {
+        name: schema_counts[parts[:2]].get(parts[2]) if parts else None
+        for name, parts in parsed.items()
+    }
+
+
+def table_row_count(session, full_table_name):
+    """Row count for one table, or None if the table doesn't exist."""
+    return get_row_counts(session, [full_table_name])[full_table_name]
+
+
+def invalidate_table(full_table_name):
+    """Drop cached metadata for the schema containing `full_table_name` after a write."""
+    database, schema, _ = split_table_name(full_table_name)
+    versions = _schema_versions()
+    versions[(database, schema)] = versions.get((database, schema), 0) + 1
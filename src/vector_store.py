@@ -0,0 +1,294 @@
+"""
+Memory-mapped on-disk store for the Day 18 embeddings.
+
+A store is a directory holding, for the current generation <g>,
+
+    vectors.<g>.f32    raw float32 rows, 768 per row, append-only
+    ids.<g>.i64        the CHUNK_ID of every row, append-only
+    deleted.<g>.i64    row offsets of deleted rows (tombstones), append-only
+    manifest.json      generation, committed row/tombstone counts, CRC32s and the sync watermark
+
+Appends write past the committed end and then atomically replace the
+manifest, so readers (other app processes share the page cache through
+np.memmap) only ever see committed rows. compact() and reset() never touch
+the files of the current generation: they write generation <g+1>, swap the
+manifest to point at it, and only then delete generation <g>. A reader
+holding the old manifest therefore always sees files that match it (or,
+if they were deleted meanwhile, re-reads the manifest). verify() checks
+the CRC32s.
+"""
+import glob
+import json
+import os
+import zlib
+from contextlib import contextmanager
+
+import numpy as np
+
+from embeddings import EMBEDDING_DIMENSIONS, EmbeddingMatrix, embedding_chunk_ids, load_embeddings
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-writer use only
+    fcntl = None
+
+STORE_DIR = ".vector_store"
+DATA_FILES = (("vectors", "f32"), ("ids", "i64"), ("deleted", "i64"))
+
+
+class VectorStore:
+    """Append-only memory-mapped embedding store (see module docstring for the layout)."""
+
+    def __init__(self, path, dimensions=EMBEDDING_DIMENSIONS):
+        self.path = path
+        self.dimensions = dimensions
+        os.makedirs(path, exist_ok=True)
+        if not os.path.exists(self._file("manifest.json")):
+            self._write_manifest(self._empty_manifest())
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _data_file(self, kind, generation):
+        return self._file(f"{kind}.{generation}.{dict(DATA_FILES)[kind]}")
+
+    def _empty_manifest(self, generation=0):
+        return {'dimensions': self.dimensions, 'rows': 0, 'deleted': 0,
+                'vectors_crc32': 0, 'ids_crc32': 0, 'generation': generation, 'watermark': ""}
+
+    @property
+    def manifest(self):
+        with open(self._file("manifest.json")) as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest):
+        tmp = self._file("manifest.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._file("manifest.json"))
+
+    @contextmanager
+    def _writer_lock(self):
+        with open(self._file(".lock"), "w") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _map(self, manifest, kind, dtype, rows, width=None):
+        shape = (rows, width) if width else (rows,)
+        if rows == 0:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(self._data_file(kind, manifest['generation']), dtype=dtype, mode="r", shape=shape)
+
+    def _append_raw(self, manifest, kind, array, committed_bytes):
+        with open(self._data_file(kind, manifest['generation']), "ab") as f:
+            # Drop any uncommitted tail left by an interrupted append
+            f.truncate(committed_bytes)
+            f.write(array.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _write_generation(self, generation, ids, vectors):
+        for kind, array in (("vectors", vectors), ("ids", ids), ("deleted", np.empty(0, dtype=np.int64))):
+            with open(self._data_file(kind, generation), "wb") as f:
+                f.write(array.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _drop_old_generations(self, current):
+        # Readers that still map the old files keep their (unlinked) inodes
+        for kind, suffix in DATA_FILES:
+            for name in glob.glob(self._file(f"{kind}.*.{suffix}")):
+                if name != self._data_file(kind, current):
+                    os.remove(name)
+
+    def _read(self, read):
+        # The files of the manifest we read may be deleted by a concurrent
+        # compact()/reset() before we open them; the new manifest is then in place
+        for _ in range(3):
+            try:
+                return read(self.manifest)
+            except FileNotFoundError:
+                continue
+        return read(self.manifest)
+
+    def __len__(self):
+        manifest = self.manifest
+        return manifest['rows'] - manifest['deleted']
+
+    def _live_mask(self, manifest):
+        mask = np.ones(manifest['rows'], dtype=bool)
+        mask[self._map(manifest, "deleted", np.int64, manifest['deleted'])] = False
+        return mask
+
+    def ids(self):
+        """CHUNK_ID of every committed row, including deleted ones (memory-mapped)."""
+        return self._read(lambda manifest: self._map(manifest, "ids", np.int64, manifest['rows']))
+
+    def live_mask(self):
+        return self._read(self._live_mask)
+
+    def load(self):
+        """
+        Live rows as an EmbeddingMatrix.
+
+        Without tombstones the matrix is the memory map itself (no copy);
+        otherwise the live rows are gathered into memory.
+        """
+        return self._read(self._load)
+
+    def _load(self, manifest):
+        ids = self._map(manifest, "ids", np.int64, manifest['rows'])
+        vectors = self._map(manifest, "vectors", np.float32, manifest['rows'], self.dimensions)
+        if manifest['deleted']:
+            mask = self._live_mask(manifest)
+            ids, vectors = ids[mask], vectors[mask]
+        return EmbeddingMatrix(ids, vectors)
+
+    def append(self, chunk_ids, vectors, watermark=None):
+        """
+        Append embeddings without rewriting existing rows.
+
+        An id that is already live is replaced (its old row is tombstoned); an
+        id repeated within the batch keeps only its last row. Returns the
+        number of rows appended.
+        """
+        chunk_ids = np.ascontiguousarray(chunk_ids, dtype=np.int64)
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dimensions)
+        _, last = np.unique(chunk_ids[::-1], return_index=True)
+        if len(last) < len(chunk_ids):
+            keep = np.sort(len(chunk_ids) - 1 - last)
+            chunk_ids, vectors = chunk_ids[keep], vectors[keep]
+        with self._writer_lock():
+            manifest = self.manifest
+            rows = manifest['rows']
+            if len(chunk_ids):
+                replaced = np.flatnonzero(np.isin(self._map(manifest, "ids", np.int64, rows), chunk_ids)
+                                          & self._live_mask(manifest))
+                self._append_raw(manifest, "vectors", vectors, rows * self.dimensions * 4)
+                self._append_raw(manifest, "ids", chunk_ids, rows * 8)
+                manifest['vectors_crc32'] = zlib.crc32(vectors.tobytes(), manifest['vectors_crc32'])
+                manifest['ids_crc32'] = zlib.crc32(chunk_ids.tobytes(), manifest['ids_crc32'])
+                if len(replaced):
+                    self._append_raw(manifest, "deleted", replaced.astype(np.int64), manifest['deleted'] * 8)
+                    manifest['deleted'] += len(replaced)
+                manifest['rows'] = rows + len(chunk_ids)
+            if watermark is not None:
+                manifest['watermark'] = watermark
+            self._write_manifest(manifest)
+        return len(chunk_ids)
+
+    def delete(self, chunk_ids):
+        """Tombstone the live rows of `chunk_ids`. Returns the number of rows deleted."""
+        with self._writer_lock():
+            manifest = self.manifest
+            rows = np.flatnonzero(np.isin(self._map(manifest, "ids", np.int64, manifest['rows']), chunk_ids)
+                                  & self._live_mask(manifest))
+            if len(rows):
+                self._append_raw(manifest, "deleted", rows.astype(np.int64), manifest['deleted'] * 8)
+                manifest['deleted'] += len(rows)
+                self._write_manifest(manifest)
+        return len(rows)
+
+    def compact(self):
+        """Rewrite only the live rows into a new generation, dropping tombstones. Returns the number reclaimed."""
+        with self._writer_lock():
+            manifest = self.manifest
+            if not manifest['deleted']:
+                return 0
+            live = self._load(manifest)
+            ids = np.ascontiguousarray(live.chunk_ids)
+            vectors = np.ascontiguousarray(live.matrix)
+            generation = manifest['generation'] + 1
+            self._write_generation(generation, ids, vectors)
+
+            reclaimed = manifest['deleted']
+            manifest.update(rows=len(ids), deleted=0,
+                            vectors_crc32=zlib.crc32(vectors.tobytes()),
+                            ids_crc32=zlib.crc32(ids.tobytes()),
+                            generation=generation)
+            self._write_manifest(manifest)
+            self._drop_old_generations(generation)
+        return reclaimed
+
+    def verify(self, block_rows=65536):
+        """Recompute the CRC32s of the committed rows; raises ValueError on a mismatch."""
+        return self._read(lambda manifest: self._verify(manifest, block_rows))
+
+    def _verify(self, manifest, block_rows):
+        rows = manifest['rows']
+        for kind, width, key in [("vectors", self.dimensions * 4, 'vectors_crc32'),
+                                 ("ids", 8, 'ids_crc32')]:
+            name = self._data_file(kind, manifest['generation'])
+            crc = 0
+            if rows:
+                if os.path.getsize(name) < rows * width:
+                    raise ValueError(f"{os.path.basename(name)} is shorter than the {rows:,} committed rows")
+                with open(name, "rb") as f:
+                    remaining = rows * width
+                    while remaining:
+                        data = f.read(min(remaining, block_rows * width))
+                        crc = zlib.crc32(data, crc)
+                        remaining -= len(data)
+            if crc != manifest[key]:
+                raise ValueError(f"Checksum mismatch in {os.path.basename(name)}: the store is corrupted, re-sync it")
+        return True
+
+    def reset(self):
+        """Drop every row (used when the source table was replaced)."""
+        with self._writer_lock():
+            generation = self.manifest['generation'] + 1
+            self._write_generation(generation, np.empty(0, dtype=np.int64),
+                                   np.empty((0, self.dimensions), dtype=np.float32))
+            self._write_manifest(self._empty_manifest(generation))
+            self._drop_old_generations(generation)
+
+    def stats(self):
+        manifest = self.manifest
+        size = sum(os.path.getsize(name) for name in (self._data_file(kind, manifest['generation'])
+                                                       for kind, _ in DATA_FILES)
+                   if os.path.exists(name))
+        return {'rows': manifest['rows'] - manifest['deleted'], 'deleted': manifest['deleted'],
+                'size_mb': size / 1_048_576, 'generation': manifest['generation'],
+                'watermark': manifest['watermark']}
+
+
+def store_path(full_embedding_table, store_dir=STORE_DIR):
+    return os.path.join(store_dir, full_embedding_table.replace('.', '_').upper())
+
+
+def sync_vector_store(session, full_embedding_table, store=None):
+    """
+    Bring the local store up to date with `full_embedding_table`.
+
+    Only rows created after the store's watermark are fetched (re-embedded
+    chunks replace their old rows). If the row counts then disagree, rows
+    whose CHUNK_ID is no longer in the table are tombstoned.
+    Returns (store, rows_appended).
+    """
+    store = store or VectorStore(store_path(full_embedding_table))
+    watermark, table_rows = session.sql(f"""
+    SELECT TO_VARCHAR(MAX(CREATED_TIMESTAMP), 'YYYY-MM-DD HH24:MI:SS.FF9'), COUNT(*)
+    FROM {full_embedding_table}
+    """).collect()[0]
+    watermark = watermark or ""
+
+    previous = store.manifest['watermark']
+    appended = 0
+    if watermark > previous or not len(store):
+        embeddings = load_embeddings(session, full_embedding_table, where=f"""
+        WHERE CREATED_TIMESTAMP > '{previous or "1970-01-01"}'::TIMESTAMP_NTZ
+          AND CREATED_TIMESTAMP <= '{watermark or "1970-01-01"}'::TIMESTAMP_NTZ
+        """)
+        appended = store.append(embeddings.chunk_ids, embeddings.matrix, watermark=watermark)
+
+    if table_rows != len(store):
+        # Chunks deleted or re-chunked away since the last sync
+        store.delete(np.setdiff1d(store.load().chunk_ids, embedding_chunk_ids(session, full_embedding_table)))
+    return store, appended
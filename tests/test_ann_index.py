@@ -0,0 +1,38 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from ann_index import IVFIndex  # noqa: E402
+from embeddings import EMBEDDING_DIMENSIONS  # noqa: E402
+
+
+def test_ivf_add_replaces_and_remove_drops_ids():
+    rng = np.random.default_rng(2)
+    vectors = rng.standard_normal((50, EMBEDDING_DIMENSIONS)).astype(np.float32)
+    index = IVFIndex(n_lists=4)
+    index.add(np.arange(50), vectors)
+
+    index.add([3], vectors[10:11])
+    assert len(index) == 50
+    ids, _ = index.search(vectors[10], k=2, n_probe=4)
+    assert set(ids.tolist()) == {3, 10}
+
+    assert index.remove([3, 4, 999]) == 2
+    assert sorted(index.chunk_ids.tolist()) == [i for i in range(50) if i not in (3, 4)]
+
+
+def test_ivf_retrains_after_outgrowing_its_training_set():
+    rng = np.random.default_rng(3)
+    vectors = rng.standard_normal((400, EMBEDDING_DIMENSIONS)).astype(np.float32)
+    index = IVFIndex()
+    index.add(np.arange(16), vectors[:16])
+    index.add(np.arange(16, 400), vectors[16:])
+    assert index.needs_retrain()
+
+    index.retrain()
+    assert not index.needs_retrain()
+    assert index.n_lists == 20
+    assert sorted(index.chunk_ids.tolist()) == list(range(400))
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chunk_store import CHUNK_TABLE_COLUMNS, identify_chunks, settings_key, source_hash  # noqa: E402
+from chunk_udtf import ChunkReviews  # noqa: E402
+from chunking import assign_chunk_ids, chunk_documents  # noqa: E402
+
+
+def test_udtf_rows_match_local_chunks():
+    text = " ".join(f"word{i}." for i in range(450))
+    docs = pd.DataFrame({'DOC_ID': [7, 9], 'FILE_NAME': ["a.txt", "b.txt"],
+                         'EXTRACTED_TEXT': [text, "Short review."], 'WORD_COUNT': [451, 2]})
+    for strategy in ('full_review', 'word_window', 'token_window'):
+        local = assign_chunk_ids(chunk_documents(docs, strategy, 200, 50))
+        rows = [row for doc_id, doc_text, word_count in zip(docs['DOC_ID'].tolist(), docs['EXTRACTED_TEXT'].tolist(),
+                                                            docs['WORD_COUNT'].tolist())
+                for row in ChunkReviews().process(doc_id, doc_text, word_count, strategy, 200, 50)]
+        assert [row[0] for row in rows] == local['CHUNK_ID'].tolist()
+        assert [row[1] for row in rows] == local['CHUNK_OFFSET'].tolist()
+        assert [row[3] for row in rows] == local['CHUNK_SIZE'].tolist()
+        assert [row[5] for row in rows] == local['TEXT_HASH'].tolist()
+
+
+def test_identified_chunks_keep_their_ids_across_saves():
+    docs = pd.DataFrame({'DOC_ID': [7], 'FILE_NAME': ["a.txt"],
+                         'EXTRACTED_TEXT': [" ".join(f"word{i}" for i in range(300))], 'WORD_COUNT': [300]})
+    key = settings_key('word_window', 200, 50)
+    first = identify_chunks(chunk_documents(docs, 'word_window', 200, 50), docs, key)
+    again = identify_chunks(chunk_documents(docs, 'word_window', 200, 50), docs, key)
+    assert list(first.columns) == CHUNK_TABLE_COLUMNS
+    assert first['CHUNK_ID'].tolist() == again['CHUNK_ID'].tolist()
+    assert set(first['SOURCE_HASH']) == {source_hash(docs['EXTRACTED_TEXT'][0], key)}
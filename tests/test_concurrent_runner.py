@@ -0,0 +1,54 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from concurrent_runner import AdaptiveRunner, SessionPool  # noqa: E402
+
+
+def test_map_keeps_input_order_and_retries_throttled_calls():
+    failed = set()
+
+    def square(x):
+        if x % 3 == 0 and x not in failed:
+            failed.add(x)
+            raise RuntimeError("429 Too Many Requests")
+        return x * x
+
+    runner = AdaptiveRunner(square, max_in_flight=4, base_delay=0.0)
+    assert runner.map(range(10)) == [x * x for x in range(10)]
+    assert runner.stats['retries'] == 4
+    assert runner.stats['throttled'] == 4
+
+
+def test_pool_gives_each_call_in_flight_its_own_session():
+    created = []
+    in_use = set()
+    overlaps = []
+    guard = threading.Lock()
+
+    def create():
+        with guard:
+            created.append(object())
+            return created[-1]
+
+    def call(session, x):
+        with guard:
+            assert session not in in_use
+            in_use.add(session)
+            overlaps.append(len(in_use))
+        time.sleep(0.01)
+        with guard:
+            in_use.discard(session)
+        return x
+
+    runner = AdaptiveRunner(call, max_in_flight=4, initial_in_flight=4, pool=SessionPool(create, max_size=4))
+    assert runner.map(range(12)) == list(range(12))
+    assert 1 < len(created) <= 4
+    assert max(overlaps) > 1
+
+    single = AdaptiveRunner(call, max_in_flight=8, pool=SessionPool.single(object()))
+    assert single.max_in_flight == 1
+    assert single.map(range(3)) == [0, 1, 2]
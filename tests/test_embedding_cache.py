@@ -0,0 +1,23 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from embedding_cache import LocalMirror, text_hash  # noqa: E402
+from embeddings import EMBEDDING_DIMENSIONS  # noqa: E402
+
+
+def test_local_mirror_round_trips_and_ignores_a_torn_append(tmp_path):
+    hashes = [text_hash("a"), text_hash("b")]
+    matrix = np.arange(2 * EMBEDDING_DIMENSIONS, dtype=np.float32).reshape(2, -1)
+    mirror = LocalMirror(str(tmp_path), "snowflake-arctic-embed-m")
+    mirror.append(hashes, matrix)
+    # Vectors written but keys not yet: the row is not trusted
+    with open(mirror.vectors_path, "ab") as f:
+        f.write(np.ones(EMBEDDING_DIMENSIONS, dtype=np.float32).tobytes())
+
+    loaded = LocalMirror(str(tmp_path), "snowflake-arctic-embed-m").load()
+    assert sorted(loaded) == sorted(hashes)
+    np.testing.assert_array_equal(loaded[hashes[1]], matrix[1])
@@ -0,0 +1,40 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from ann_index import IVFIndex  # noqa: E402
+from embeddings import EMBEDDING_DIMENSIONS  # noqa: E402
+from hybrid_search import BM25Index  # noqa: E402
+from search_services import source_table_of  # noqa: E402
+
+
+def test_ivf_search_scores_every_allowed_id():
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((400, EMBEDDING_DIMENSIONS)).astype(np.float32)
+    index = IVFIndex(n_lists=20, n_probe=1)
+    index.add(np.arange(400), vectors)
+
+    # Ids scattered across cells far from the query still fill all k slots
+    allowed = np.arange(0, 400, 37)
+    ids, scores = index.search(vectors[0], k=5, allowed=allowed)
+    assert len(ids) == 5
+    assert set(ids.tolist()) <= set(allowed.tolist())
+    assert ids[0] == 0
+    assert np.all(np.diff(scores) <= 0)
+
+
+def test_bm25_search_skips_ids_outside_the_filter():
+    index = BM25Index()
+    index.add([1, 2, 3], ["great battery", "battery died fast", "great screen"])
+    ids, _ = index.search("battery", k=10, allowed={2, 3})
+    assert ids.tolist() == [2]
+
+
+def test_service_source_table_is_read_from_the_definition():
+    definition = 'SELECT CHUNK_TEXT, FILE_NAME, CHUNK_TYPE FROM rag."Reviews".CHUNKS_V2 WHERE CHUNK_TEXT IS NOT NULL'
+    assert source_table_of(definition, "DB", "SCH") == 'rag."Reviews".CHUNKS_V2'
+    assert source_table_of("select * from my_chunks", "DB", "SCH") == "DB.SCH.my_chunks"
+    assert source_table_of("SELECT 1", "DB", "SCH") is None
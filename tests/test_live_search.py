@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from live_search import LiveSearcher  # noqa: E402
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class RecordingLock:
+    def __init__(self):
+        self.held = False
+
+    def __enter__(self):
+        self.held = True
+
+    def __exit__(self, *exc):
+        self.held = False
+
+
+def test_searches_run_under_the_lock():
+    lock = RecordingLock()
+    held = []
+    searcher = LiveSearcher(lambda q: held.append(lock.held) or [q], debounce=0.01, lock=lock)
+    searcher.submit("gloves")
+    assert _wait_for(lambda: searcher.latest() is not None)
+    assert searcher.latest()[2] == ["gloves"]
+    assert held == [True]
+    searcher.stop()
+
+
+def test_worker_stops_when_nobody_polls_it():
+    searcher = LiveSearcher(lambda q: [q], debounce=0.01, idle_timeout=0.1)
+    searcher.submit("gloves")
+    assert _wait_for(lambda: searcher.stopped)
+    searcher._thread.join(1.0)
+    assert not searcher._thread.is_alive()
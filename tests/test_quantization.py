@@ -0,0 +1,21 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from quantization import ScalarQuantizer  # noqa: E402
+
+
+def test_scalar_quantizer_saturates_outside_fitted_range():
+    quantizer = ScalarQuantizer().fit(np.array([[0.0], [1.0]], dtype=np.float32))
+    codes = quantizer.encode(np.array([[-0.02], [0.0], [1.0], [1.02]], dtype=np.float32))
+    assert codes[:, 0].tolist() == [-128, -128, 127, 127]
+
+
+def test_scalar_quantizer_scores_stay_monotonic_past_the_range():
+    quantizer = ScalarQuantizer().fit(np.array([[0.0], [1.0]], dtype=np.float32))
+    codes = quantizer.encode(np.array([[0.5], [1.0], [1.5]], dtype=np.float32))
+    scores = quantizer.scores(codes, np.array([1.0], dtype=np.float32))
+    assert scores[0] < scores[1] <= scores[2]
@@ -0,0 +1,43 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from embeddings import EMBEDDING_DIMENSIONS  # noqa: E402
+from vector_store import VectorStore  # noqa: E402
+
+
+def test_compact_keeps_files_of_an_older_manifest_consistent(tmp_path):
+    store = VectorStore(str(tmp_path))
+    store.append([1, 2, 3], np.arange(3 * EMBEDDING_DIMENSIONS, dtype=np.float32).reshape(3, -1))
+    store.append([2], np.ones((1, EMBEDDING_DIMENSIONS), dtype=np.float32))
+    before = store.load()
+
+    assert store.compact() == 1
+    # The old generation's memory map still reads the rows it was opened on
+    assert before.chunk_ids.tolist() == [1, 3, 2]
+    after = store.load()
+    assert after.chunk_ids.tolist() == [1, 3, 2]
+    np.testing.assert_array_equal(after.matrix, before.matrix)
+    assert store.verify()
+    assert sorted(os.listdir(tmp_path)) == ['.lock', 'deleted.1.i64', 'ids.1.i64', 'manifest.json', 'vectors.1.f32']
+
+
+def test_reset_starts_a_new_generation(tmp_path):
+    store = VectorStore(str(tmp_path))
+    store.append([1], np.ones((1, EMBEDDING_DIMENSIONS), dtype=np.float32))
+    store.reset()
+    assert len(store) == 0
+    assert store.stats()['generation'] == 1
+    assert store.verify()
+
+
+def test_append_keeps_the_last_row_of_an_id_repeated_in_a_batch(tmp_path):
+    store = VectorStore(str(tmp_path))
+    vectors = np.arange(3, dtype=np.float32)[:, None] * np.ones((1, EMBEDDING_DIMENSIONS), dtype=np.float32)
+    assert store.append([5, 6, 5], vectors) == 2
+    loaded = store.load()
+    assert loaded.chunk_ids.tolist() == [6, 5]
+    assert loaded.matrix[:, 0].tolist() == [1.0, 2.0]